@@ -0,0 +1,179 @@
+import math
+import time
+import numbers
+from threading import Lock
+
+import ironsource.atom.config as config
+
+
+class Histogram:
+    """
+        Mergeable histogram with logarithmic buckets - every value is kept with a bounded relative error,
+        so histograms of different windows (or processes) can be merged by adding the bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=config.AGGREGATE_HISTOGRAM_ACCURACY):
+        """
+        :param relative_accuracy: Max relative error of the quantiles (e.g. 0.01 for 1%)
+        :type relative_accuracy: float
+        """
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        # Bucket index to count, values <= 0 are counted at zero_count
+        self._buckets = {}
+        self._zero_count = 0
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """
+        Add a value to the histogram
+
+        :param value: The value
+        :type value: int | float
+        """
+        if value > 0:
+            index = int(math.ceil(math.log(value) / self._log_gamma))
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+        else:
+            self._zero_count += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Get an approximation of a quantile
+
+        :param q: Quantile between 0 and 1
+        :type q: float
+        :rtype: float
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return self.min
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                # Middle of the bucket (in relative terms), clamped to the real min/max
+                value = 2 * math.pow(self._gamma, index) / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        """
+        Summary of the histogram: count, sum, min, max, p50, p90, p99 and the (mergeable) bucket counts,
+        bucket upper bounds are gamma ** index.
+
+        :rtype: dict
+        """
+        buckets = dict((str(index), count) for index, count in self._buckets.items())
+        if self._zero_count:
+            buckets["zero"] = self._zero_count
+        return {"count": self.count,
+                "sum": self.sum,
+                "min": self.min,
+                "max": self.max,
+                "p50": self.quantile(0.5),
+                "p90": self.quantile(0.9),
+                "p99": self.quantile(0.99),
+                "gamma": self._gamma,
+                "buckets": buckets}
+
+
+class Aggregator:
+    """
+        Client side pre-aggregation of metric-like events, keeps the values of every (stream, key, kind)
+        in memory during a flush window and summarizes them into one event per key.
+
+        Kinds:
+            counter - total of the values (default value: 1)
+            sum - count and total of the values
+            histogram - count, sum, min, max, quantiles and mergeable bucket counts of the values
+    """
+
+    KINDS = ("counter", "sum", "histogram")
+
+    def __init__(self, relative_accuracy=config.AGGREGATE_HISTOGRAM_ACCURACY):
+        """
+        :param relative_accuracy: Max relative error of the histogram quantiles
+        :type relative_accuracy: float
+        """
+        self._lock = Lock()
+        self._relative_accuracy = relative_accuracy
+        # (stream, key, kind) to aggregated value
+        self._values = {}
+        self._window_start = time.time()
+
+    def add(self, stream, key, value=1, kind="counter"):
+        """
+        Aggregate a value
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param key: Metric name
+        :type key: str
+        :param value: The value
+        :type value: int | float
+        :param kind: counter, sum or histogram
+        :type kind: str
+        """
+        if kind not in self.KINDS:
+            raise Exception("Aggregation kind has to be one of: {}".format(", ".join(self.KINDS)))
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            raise TypeError("Aggregated value has to be a number, got: {}".format(type(value).__name__))
+
+        aggregate_key = (stream, key, kind)
+        with self._lock:
+            if kind == "histogram":
+                histogram = self._values.get(aggregate_key)
+                if histogram is None:
+                    histogram = self._values[aggregate_key] = Histogram(self._relative_accuracy)
+                histogram.add(value)
+            elif kind == "sum":
+                count, total = self._values.get(aggregate_key, (0, 0))
+                self._values[aggregate_key] = (count + 1, total + value)
+            else:
+                self._values[aggregate_key] = self._values.get(aggregate_key, 0) + value
+
+    def is_empty(self):
+        """
+        Check if there are values in the current window
+
+        :rtype: bool
+        """
+        return len(self._values) == 0
+
+    def flush(self):
+        """
+        Close the current window and summarize it
+
+        :return: List of (stream, summary) - one summary event for every aggregated key
+        :rtype: list(tuple(str, dict))
+        """
+        with self._lock:
+            values = self._values
+            window_start = self._window_start
+            window_end = self._window_start = time.time()
+            self._values = {}
+
+        summaries = []
+        for (stream, key, kind), value in values.items():
+            summary = {"key": key,
+                       "kind": kind,
+                       "window_start": window_start,
+                       "window_end": window_end}
+            if kind == "histogram":
+                summary.update(value.to_dict())
+            elif kind == "sum":
+                summary["count"], summary["sum"] = value
+            else:
+                summary["value"] = value
+            summaries.append((stream, summary))
+        return summaries
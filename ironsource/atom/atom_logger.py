@@ -1,5 +1,9 @@
+import time
 import logging
 import logging.handlers
+from threading import Lock
+
+import ironsource.atom.config as config
 
 
 def get_logger(name="AtomLogger", debug=False, file_name="atom-raw.json"):
@@ -44,5 +48,100 @@ def get_logger(name="AtomLogger", debug=False, file_name="atom-raw.json"):
             logger.handlers[0].level = new_level
 
         logger.propagate = 0
-        logger.info('Starting Logger: {}, debug: {}'.format(name, debug))
+        logger.info('Starting Logger: %s, debug: %s', name, debug)
     return logger
+
+
+class DataPreview(object):
+    """
+        Lazy preview of the events of a log message - formatted (event count and the start of the first event)
+        only when the message is logged
+    """
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, data, size=50):
+        self.data = data
+        self.size = size
+
+    def __str__(self):
+        if isinstance(self.data, list):
+            first = str(self.data[0])[:self.size] if self.data else ""
+            return "{count} events, first: {first}...".format(count=len(self.data), first=first)
+        return str(self.data)[:self.size] + "..."
+
+
+class RateLimitedLogger:
+    """
+        Logs up to max_count messages of every key (e.g. stream and status) per interval,
+        the following messages of the key in the interval are suppressed and their count is added to
+        the first message of the key in the next interval.
+        The messages use lazy %-style arguments - nothing is formatted unless the level is enabled.
+    """
+
+    def __init__(self, logger, max_count=config.LOG_RATE_LIMIT_COUNT, interval=config.LOG_RATE_LIMIT_INTERVAL):
+        """
+        :param logger: The logger
+        :type logger: logging.Logger
+        :param max_count: Max number of messages of a key per interval
+        :type max_count: int
+        :param interval: Interval in seconds
+        :type interval: float
+        """
+        self.logger = logger
+        self._max_count = max_count
+        self._interval = interval
+        self._lock = Lock()
+        # Key to [interval start time, logged count, suppressed count]
+        self._windows = {}
+        self._suppressed_count = 0
+
+    def after_fork(self):
+        """
+        Re-create the lock in a forked child process (it may be held by a thread of the parent)
+        """
+        self._lock = Lock()
+
+    def log(self, level, key, msg, *args, **kwargs):
+        """
+        Log a message unless its key is over the limit
+
+        :param level: Logging level
+        :type level: int
+        :param key: Rate limit key
+        :type key: object
+        :param msg: %-style message
+        :type msg: str
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.time()
+        suppressed = 0
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self._interval:
+                if window is not None:
+                    suppressed = window[2]
+                window = self._windows[key] = [now, 0, 0]
+            if window[1] >= self._max_count:
+                window[2] += 1
+                self._suppressed_count += 1
+                return
+            window[1] += 1
+        if suppressed:
+            msg += "; %d similar messages were suppressed"
+            args += (suppressed,)
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def error(self, key, msg, *args, **kwargs):
+        self.log(logging.ERROR, key, msg, *args, **kwargs)
+
+    def warning(self, key, msg, *args, **kwargs):
+        self.log(logging.WARNING, key, msg, *args, **kwargs)
+
+    def get_suppressed_count(self):
+        """
+        :return: Total number of suppressed messages
+        :rtype: int
+        """
+        return self._suppressed_count
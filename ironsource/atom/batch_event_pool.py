@@ -1,59 +1,160 @@
+import time
 from threading import Thread
-from Queue import Queue
+from threading import Lock
+from threading import current_thread
+
+try:
+    # python 3
+    from queue import Queue, Empty, Full
+except ImportError:
+    # python 2
+    from Queue import Queue, Empty, Full
+
+import ironsource.atom.config as config
 
 
 class BatchEventPool:
     """
         Batch Event Pool constructor
 
-        :param thread_count: Count of working threads
+        The pool autoscales between thread_count and max_thread_count workers: a worker is added when a task is
+        added while no worker is idle (tasks back up or sending is slow), and a worker that is idle for
+        idle_timeout seconds is retired.
+
+        :param thread_count: Count of working threads (min count when autoscaling)
         :type thread_count: int
         :param max_events: Max count of events in queue
         :type max_events: int
+        :param max_thread_count: Optional, max count of working threads (default: thread_count, no autoscaling)
+        :type max_thread_count: int
+        :param idle_timeout: Optional, idle time in seconds before a worker above thread_count is retired
+        :type idle_timeout: float
     """
 
-    def __init__(self, thread_count, max_events):
+    def __init__(self, thread_count, max_events, max_thread_count=None,
+                 idle_timeout=config.BATCH_WORKER_IDLE_TIMEOUT):
+        # Every task is queued with its enqueue time
         self._events = Queue(maxsize=max_events)
 
         self._is_running = True
         self._max_events = max_events
+        self._min_thread_count = thread_count
+        self._max_thread_count = max(thread_count, max_thread_count or thread_count)
+        self._idle_timeout = idle_timeout
 
+        # Lock of the workers state
+        self._lock = Lock()
         self._workers = []
+        self._idle_count = 0
+        # EWMA of the time tasks wait in the queue, in seconds
+        self._queue_wait = 0.0
 
         for index in range(0, thread_count):
-            thread = Thread(target=self.task_worker)
-            self._workers.append(thread)
-            thread.start()
+            self._add_worker()
 
     def stop(self):
         """
         Stop all working threads
+
+        :return: The tasks that were not started
+        :rtype: list
         """
-        # The put event is here to unblock the task_worker (get() is blocking)
-        self._events.put(lambda: 0)
         self._is_running = False
+        not_started = []
+        try:
+            while True:
+                task = self._events.get_nowait()
+                self._events.task_done()
+                if task is not None:
+                    not_started.append(task[1])
+        except Empty:
+            pass
+
+        # A stop task (None) for every worker, to unblock the ones waiting on get() (busy workers stop on their own)
+        try:
+            for _ in list(self._workers):
+                self._events.put(None, timeout=1)
+        except Full:
+            pass
+        return not_started
+
+    def join(self, timeout):
+        """
+        Wait until all the tasks are done
+
+        :param timeout: timeout in seconds (None waits until all the tasks are done)
+        :type timeout: float
+        :return: True if all the tasks are done, False on timeout
+        :rtype: bool
+        """
+        if timeout is None:
+            self._events.join()
+            return True
+        deadline = time.time() + timeout
+        with self._events.all_tasks_done:
+            while self._events.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._events.all_tasks_done.wait(remaining)
+        return True
 
     def task_worker(self):
         """
         Worker method - for call action lambda
         """
-        while self._is_running:
-            func = self._events.get()
-            func()
+        worker = current_thread()
+        is_autoscaling = self._max_thread_count > self._min_thread_count
+        try:
+            while self._is_running:
+                try:
+                    task = self._events.get(timeout=self._idle_timeout if is_autoscaling else None)
+                except Empty:
+                    with self._lock:
+                        # Retire an idle worker above the min count
+                        if len(self._workers) > self._min_thread_count:
+                            self._workers.remove(worker)
+                            return
+                    continue
 
-    def add_event(self, event_action):
+                if task is None:
+                    self._events.task_done()
+                    break
+                with self._lock:
+                    self._idle_count -= 1
+                try:
+                    enqueue_time, func = task
+                    self._queue_wait += config.BATCH_QUEUE_WAIT_EWMA_WEIGHT * \
+                        (time.time() - enqueue_time - self._queue_wait)
+                    func()
+                finally:
+                    self._events.task_done()
+                    with self._lock:
+                        self._idle_count += 1
+        finally:
+            with self._lock:
+                self._idle_count -= 1
+                if worker in self._workers:
+                    self._workers.remove(worker)
+
+    def add_event(self, event_action, timeout=None, key=None):
         """
         Add event for task pool
 
-        :param timeout: timeout in seconds (Raises Full exception after x seconds)
-        :type timeout: int
-        :param block: put an item if one is available, else raise Full exception (timeout is ignored in that case).
-        :type block: bool
         :param event_action: event lambda
         :type event_action: lambda
-        :raises: EventTaskPoolException
+        :param timeout: Optional, timeout in seconds (Raises Full exception after x seconds), default: block
+        :type timeout: float
+        :param key: Optional, partition key (ignored, see PartitionedEventPool)
+        :type key: str
+        :raises: Queue.Full
         """
-        self._events.put(event_action)
+        with self._lock:
+            # No idle worker - the task would wait, add a worker (up to max_thread_count)
+            if self._is_running and self._idle_count <= self._events.qsize() \
+                    and len(self._workers) < self._max_thread_count:
+                self._add_worker()
+        self._events.put((time.time(), event_action), timeout=timeout)
 
     def is_empty(self):
         """
@@ -61,3 +162,28 @@ class BatchEventPool:
         :return: True if empty, else False
         """
         return self._events.empty()
+
+    def get_stats(self):
+        """
+        Get the pool metrics
+
+        :return: Number of workers, busy workers, queued tasks and the average queue wait time in seconds
+        :rtype: dict
+        """
+        with self._lock:
+            return {"workers": len(self._workers),
+                    "busy_workers": len(self._workers) - self._idle_count,
+                    "queued": self._events.qsize(),
+                    "queue_wait": self._queue_wait}
+
+    def _add_worker(self):
+        """
+        Start a worker (must be called with the lock held, or from the constructor)
+        """
+        # A new worker is idle until it takes a task
+        self._idle_count += 1
+        thread = Thread(target=self.task_worker)
+        # Daemon - a worker that is still sending at the shutdown deadline doesn't keep the process alive
+        thread.daemon = True
+        self._workers.append(thread)
+        thread.start()
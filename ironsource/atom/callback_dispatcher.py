@@ -0,0 +1,168 @@
+import os
+import time
+from threading import Lock
+from threading import Thread
+
+try:
+    # python 3
+    from queue import Queue, Empty, Full
+except ImportError:
+    # python 2
+    from Queue import Queue, Empty, Full
+
+import ironsource.atom.atom_logger as logger
+import ironsource.atom.config as config
+
+
+class CallbackDispatcher:
+    """
+        Calls the error callback from a dispatcher thread, so a slow callback doesn't slow down the sending workers
+        or track(). The queue is bounded - callbacks are dropped (and counted) when it is full.
+
+        With coalescing, the queued errors of the same stream, status and error message are passed to a single call:
+        callback(unix_time, status, error_msg, [sent_data, ...], stream) - the unix_time of the first error and
+        the list of the payloads of all the errors.
+    """
+
+    def __init__(self, callback, queue_size=config.CALLBACK_QUEUE_SIZE, is_coalesced=False):
+        """
+        :param callback: Error callback, convention: callback(unix_time, status, error_msg, sent_data, stream)
+        :type callback: function
+        :param queue_size: Max number of queued callbacks
+        :type queue_size: int
+        :param is_coalesced: Optional, pass the queued errors of the same stream, status and error message
+                             to a single call
+        :type is_coalesced: bool
+        """
+        self._callback = callback
+        self._queue_size = queue_size
+        self._is_coalesced = is_coalesced
+        self._logger = logger.RateLimitedLogger(logger.get_logger())
+
+        self._dispatched_count = 0
+        self._dropped_count = 0
+        self._coalesced_count = 0
+        # Time in seconds from the error to its callback (EWMA and max)
+        self._lag = 0.0
+        self._max_lag = 0.0
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._queue = Queue(maxsize=self._queue_size)
+        self._lock = Lock()
+        self._thread = None
+
+    def after_fork(self):
+        """
+        Re-create the queue and thread in a forked child process, the queued callbacks of the parent are discarded
+        """
+        if self._pid != os.getpid():
+            self._logger.after_fork()
+            self._start()
+
+    def dispatch(self, unix_time, status, error_msg, sent_data, stream):
+        """
+        Queue a callback (never blocks)
+
+        :return: False if the callback was dropped (the queue is full)
+        :rtype: bool
+        """
+        if self._thread is None:
+            with self._lock:
+                # Started on the first error
+                if self._thread is None:
+                    self._thread = Thread(target=self._dispatcher)
+                    self._thread.daemon = True
+                    self._thread.start()
+        try:
+            self._queue.put_nowait((time.time(), (unix_time, status, error_msg, sent_data, stream)))
+            return True
+        except Full:
+            self._dropped_count += 1
+            return False
+
+    def join(self, timeout):
+        """
+        Wait until the queued callbacks are called
+
+        :param timeout: timeout in seconds
+        :type timeout: float
+        :return: True if all the callbacks were called, False on timeout
+        :rtype: bool
+        """
+        deadline = time.time() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def get_stats(self):
+        """
+        Get the dispatcher metrics
+
+        :return: Number of queued, called, dropped and coalesced callbacks,
+                 and the lag in seconds from the error to its callback (average and max)
+        :rtype: dict
+        """
+        return {"queued": self._queue.qsize(),
+                "dispatched": self._dispatched_count,
+                "dropped": self._dropped_count,
+                "coalesced": self._coalesced_count,
+                "lag": self._lag,
+                "max_lag": self._max_lag}
+
+    def _dispatcher(self):
+        """
+        Dispatcher thread - calls the callback of every queued error (or group of errors)
+        """
+        while True:
+            items = [self._queue.get()]
+            if self._is_coalesced:
+                # Everything that is already queued
+                try:
+                    while True:
+                        items.append(self._queue.get_nowait())
+                except Empty:
+                    pass
+
+            try:
+                for enqueue_time, args in self._group(items):
+                    lag = time.time() - enqueue_time
+                    self._lag += config.CALLBACK_LAG_EWMA_WEIGHT * (lag - self._lag)
+                    self._max_lag = max(self._max_lag, lag)
+                    try:
+                        self._callback(*args)
+                    except Exception as e:
+                        self._logger.error("callback", "Error callback failed: %s", e)
+                    self._dispatched_count += 1
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _group(self, items):
+        """
+        Coalesce the errors of the same stream, status and error message (when coalescing)
+
+        :param items: Queued (enqueue time, callback args)
+        :type items: list(tuple)
+        :return: (enqueue time, callback args) for every call
+        :rtype: list(tuple)
+        """
+        if not self._is_coalesced:
+            return items
+        groups = {}
+        order = []
+        for enqueue_time, (unix_time, status, error_msg, sent_data, stream) in items:
+            key = (stream, status, str(error_msg))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = (enqueue_time, (unix_time, status, error_msg, [], stream))
+                order.append(key)
+            else:
+                self._coalesced_count += 1
+            group[1][3].append(sent_data)
+        return [groups[group_key] for group_key in order]
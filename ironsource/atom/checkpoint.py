@@ -0,0 +1,80 @@
+import os
+import json
+import time
+from threading import Lock
+
+
+class Checkpoint:
+    """
+        Byte offsets checkpoint - tracks ranges of files that were processed out of order (by several workers)
+        and persists, for every file, the offset up to which everything was processed
+    """
+
+    def __init__(self, path, save_interval=1):
+        """
+        :param path: Checkpoint file path
+        :type path: str
+        :param save_interval: Min time in seconds between two saves of the checkpoint file
+        :type save_interval: float
+        """
+        self._path = path
+        self._save_interval = save_interval
+        self._lock = Lock()
+        self._last_save = 0
+
+        self._offsets = {}
+        if os.path.isfile(path):
+            with open(path) as checkpoint_file:
+                self._offsets = json.load(checkpoint_file)
+
+        # Per file: start offset -> end offset of the ranges that completed after a still pending range
+        self._completed = {}
+
+    def get_offset(self, file_name):
+        """
+        Get the offset up to which the file was processed
+
+        :param file_name: Processed file name
+        :type file_name: str
+        :return: Byte offset
+        :rtype: int
+        """
+        with self._lock:
+            return self._offsets.get(file_name, 0)
+
+    def complete(self, file_name, start, end):
+        """
+        Mark a range of a file as processed
+
+        :param file_name: Processed file name
+        :type file_name: str
+        :param start: Range start offset
+        :type start: int
+        :param end: Range end offset
+        :type end: int
+        """
+        with self._lock:
+            completed = self._completed.setdefault(file_name, {})
+            completed[start] = end
+            offset = self._offsets.get(file_name, 0)
+            while offset in completed:
+                offset = completed.pop(offset)
+            self._offsets[file_name] = offset
+
+            if time.time() - self._last_save >= self._save_interval:
+                self._save()
+
+    def save(self):
+        """
+        Write the checkpoint file
+        """
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        # Write and rename, so an interrupted save never leaves a broken checkpoint behind
+        temp_path = self._path + ".tmp"
+        with open(temp_path, "w") as checkpoint_file:
+            json.dump(self._offsets, checkpoint_file)
+        os.rename(temp_path, self._path)
+        self._last_save = time.time()
@@ -3,11 +3,21 @@
 SDK_VERSION = "1.5.4"
 ATOM_ENDPOINT = "http://track.atom-data.io/"
 
+# Multiple endpoints conf
+# Weight of a new latency sample in the endpoint EWMA latency (0 to 1)
+ENDPOINT_EWMA_WEIGHT = 0.3
+# Time in seconds to skip an endpoint after its first failure (doubled on every consecutive failure)
+ENDPOINT_FAILURE_BACKOFF = 1
+# Max time in seconds to skip a failing endpoint
+ENDPOINT_FAILURE_BACKOFF_MAX = 60
+
 # Tracker Config
 BATCH_SIZE = 256
 BATCH_SIZE_LIMIT = 2000
 BATCH_BYTES_SIZE = 64 * 1024
 BATCH_BYTES_SIZE_LIMIT = 512 * 1024
+# Batches of at least this size in bytes are sent as a streamed body (no concatenated copy of the body)
+STREAMING_BODY_MIN_SIZE = 128 * 1024
 # Default flush interval in milliseconds
 FLUSH_INTERVAL = 10000
 
@@ -16,11 +26,23 @@ FLUSH_INTERVAL = 10000
 BATCH_WORKER_COUNT = 1
 # Default Number of batch events to hold in BatchEventPool
 BATCH_POOL_SIZE = 1
+# Idle time in seconds before an autoscaled BatchEventPool worker is retired
+BATCH_WORKER_IDLE_TIMEOUT = 30
+# Weight of the last sample in the BatchEventPool queue wait time average (EWMA)
+BATCH_QUEUE_WAIT_EWMA_WEIGHT = 0.3
 
 # EventStorage Config (backlog)
 # Default backlog queue size (per stream)
 BACKLOG_SIZE = 500
 
+# Hybrid EventStorage Config (memory + disk backlog)
+# Size in bytes of the events held in memory before spilling to disk
+BACKLOG_MEMORY_BYTES_SIZE = 16 * 1024 * 1024
+# Number of events in every compressed on-disk segment
+BACKLOG_SEGMENT_SIZE = 1000
+# Directory of the on-disk segments (segments left by a previous process are recovered)
+BACKLOG_SPILL_PATH = "/tmp/atom-backlog/"
+
 # Retry on 500 / Connection error conf
 # Retry max time in seconds
 RETRY_MAX_TIME = 1800
@@ -31,6 +53,58 @@ RETRY_EXPO_BACKOFF_BASE = 3
 # Should the worker in BatchEventPool retry forever on server error (recommended)
 RETRY_FOREVER = True
 
+# Dead-letter spool conf (batches that failed to be sent)
+# Max size in bytes of every dead-letter spool file
+DEAD_LETTER_FILE_BYTES_SIZE = 50 * 1024 * 1024
+# Max number of dead-letter spool files to keep
+DEAD_LETTER_FILE_COUNT = 100
+# Default number of batches sent in parallel when replaying the dead-letter spool
+REPLAY_WORKER_COUNT = 4
+# Max number of attempts on server error when replaying a batch
+REPLAY_RETRY_MAX_COUNT = 5
+
+# Bulk file loader conf (ironsource.atom.load)
+# Default number of bulks sent in parallel
+LOAD_WORKER_COUNT = 4
+# Throughput report interval in seconds
+LOAD_REPORT_INTERVAL = 10
+
+# Max relative error of the tracker.aggregate() histogram quantiles
+AGGREGATE_HISTOGRAM_ACCURACY = 0.01
+
+# Event field that holds the sample rate of the events of a sampled stream (tracker.set_sampling)
+SAMPLE_RATE_FIELD = "_sample_rate"
+
+# Tracker stop() deadline in seconds (flush and send everything until the deadline)
+SHUTDOWN_TIMEOUT = 5
+# Deadline in seconds of a full batch sent by track() in threadless mode (retried until it, then persisted)
+THREADLESS_SEND_TIMEOUT = 5
+
+# Shared sender runtime conf (SenderRuntime)
+# Default number of sending workers shared by the attached trackers
+RUNTIME_WORKER_COUNT = 4
+# Default max number of batches of a single tracker sent at once
+RUNTIME_TRACKER_QUOTA = 2
+
+# Default burst allowance of the tracker rate limits, in seconds of the rate
+RATE_LIMIT_BURST_SECONDS = 1
+
+# Default number of bulks sent at once by IronSourceAtom.put_events_iter
+PUT_EVENTS_ITER_CONCURRENCY = 4
+
+# Rate limit of the repeated error / warning logs: max messages of a key (e.g. stream and status) per interval
+LOG_RATE_LIMIT_COUNT = 10
+# Rate limit interval of the repeated error / warning logs in seconds
+LOG_RATE_LIMIT_INTERVAL = 60
+
+# Number of batches kept by the tracker flight recorder (tracker.dump_flight_recorder)
+FLIGHT_RECORDER_SIZE = 256
+
+# Max number of queued error callbacks of the callback dispatcher (tracker is_callback_async)
+CALLBACK_QUEUE_SIZE = 1000
+# Weight of the last sample in the callback dispatcher lag average (EWMA)
+CALLBACK_LAG_EWMA_WEIGHT = 0.3
+
 # Tracker backlog conf
 # Tracker backlog Queue GET & PUT Block or not.
 BACKLOG_BLOCKING = True
@@ -42,3 +116,9 @@ REQUEST_TIMEOUT = 60
 
 # Debug file path once debug_to_file is enabled
 DEBUG_FILE_PATH = "/tmp/"
+# Capture 1 of every DEBUG_SAMPLE_RATE requests to the debug file
+DEBUG_SAMPLE_RATE = 1
+# Max number of captures waiting to be written to the debug file (captures are dropped when full)
+DEBUG_QUEUE_SIZE = 1000
+# Max number of captures written to the debug file together
+DEBUG_WRITE_BATCH_SIZE = 100
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+from threading import Lock
+
+import ironsource.atom.config as config
+
+
+class DeadLetterSpool:
+    """
+        Dead-letter spool - writes batches that failed to reach Atom to rotating JSON-lines files,
+        so they can be replayed later (see ironsource.atom.replay)
+    """
+
+    FILE_PREFIX = "atom-dead-letter."
+    FILE_SUFFIX = ".json"
+
+    def __init__(self, path,
+                 max_bytes=config.DEAD_LETTER_FILE_BYTES_SIZE,
+                 backup_count=config.DEAD_LETTER_FILE_COUNT):
+        """
+        :param path: Directory of the spool files
+        :type path: str
+        :param max_bytes: Max size in bytes of every spool file
+        :type max_bytes: int
+        :param backup_count: Max number of spool files to keep (oldest are removed first)
+        :type backup_count: int
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._lock = Lock()
+        self._file = None
+        self._file_index = 0
+
+    def write(self, stream, status, error_msg, data, unix_time=None):
+        """
+        Write a failed batch to the spool
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param status: HTTP status
+        :type status: int
+        :param error_msg: Error msg from server / sdk
+        :type error_msg: object
+        :param data: Data that failed to be sent (a single event or a list of events)
+        :type data: object
+        :param unix_time: Unix(epoch) timestamp of the failure
+        :type unix_time: float
+        :raises: TypeError if the data cannot be encoded as JSON
+        """
+        if error_msg is not None and not isinstance(error_msg, (bytes, type(u""))):
+            # Exceptions and other objects
+            error_msg = str(error_msg)
+        if isinstance(error_msg, bytes):
+            error_msg = error_msg.decode("utf-8", "replace")
+        record = json.dumps({"stream": stream,
+                             "status": status,
+                             "error": error_msg,
+                             "timestamp": unix_time if unix_time is not None else time.time(),
+                             "data": data if isinstance(data, list) else [data]})
+
+        with self._lock:
+            if self._file is None or self._file.tell() >= self._max_bytes:
+                self._rotate()
+            self._file.write(record.encode("utf-8") + b"\n")
+            self._file.flush()
+
+    def list_files(self):
+        """
+        List the spool files, oldest first
+
+        :return: Spool file paths
+        :rtype: list(str)
+        """
+        return self.list_spool_files(self._path)
+
+    @classmethod
+    def list_spool_files(cls, path):
+        """
+        List the spool files in a directory, oldest first
+
+        :param path: Directory of the spool files
+        :type path: str
+        :return: Spool file paths
+        :rtype: list(str)
+        """
+        names = [name for name in os.listdir(path)
+                 if name.startswith(cls.FILE_PREFIX) and name.endswith(cls.FILE_SUFFIX)]
+        return [os.path.join(path, name) for name in sorted(names)]
+
+    def close(self):
+        """
+        Close the current spool file
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def after_fork(self):
+        """
+        Re-create the lock in a forked child process, it writes to its own spool files
+        """
+        self._lock = Lock()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        """
+        Open a new spool file and remove the oldest ones above backup_count
+        """
+        if self._file is not None:
+            self._file.close()
+
+        self._file_index += 1
+        file_name = "{prefix}{time}.{pid}.{index:06d}{suffix}".format(prefix=self.FILE_PREFIX,
+                                                                      time=time.strftime("%Y%m%d%H%M%S"),
+                                                                      pid=os.getpid(),
+                                                                      index=self._file_index,
+                                                                      suffix=self.FILE_SUFFIX)
+        self._file = open(os.path.join(self._path, file_name), "ab")
+
+        spool_files = self.list_files()
+        for spool_file in spool_files[:max(0, len(spool_files) - self._backup_count)]:
+            os.remove(spool_file)
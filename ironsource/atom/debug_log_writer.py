@@ -0,0 +1,168 @@
+import json
+import uuid
+import datetime
+import itertools
+from threading import Lock
+from threading import Thread
+
+try:
+    # python 3
+    from queue import Queue, Full, Empty
+except ImportError:
+    # python 2
+    from Queue import Queue, Full, Empty
+
+import ironsource.atom.config as config
+
+
+class DebugLogWriter:
+    """
+        Writes the raw requests and responses (debug_to_file) from a background thread.
+        The sending thread only samples and enqueues, captures are dropped (and counted) when the queue is full.
+    """
+
+    def __init__(self, raw_logger,
+                 queue_size=config.DEBUG_QUEUE_SIZE,
+                 sample_rate=config.DEBUG_SAMPLE_RATE,
+                 errors_only=False,
+                 batch_size=config.DEBUG_WRITE_BATCH_SIZE):
+        """
+        :param raw_logger: Logger of the raw requests file (see atom_logger.get_logger)
+        :type raw_logger: logging.Logger
+        :param queue_size: Max number of captures waiting to be written
+        :type queue_size: int
+        :param sample_rate: Capture 1 of every sample_rate requests
+        :type sample_rate: int
+        :param errors_only: Capture only the requests that failed (status >= 400)
+        :type errors_only: bool
+        :param batch_size: Max number of captures written together
+        :type batch_size: int
+        """
+        self._raw_logger = raw_logger
+        self._sample_rate = max(1, sample_rate)
+        self._errors_only = errors_only
+        self._batch_size = batch_size
+        self._queue = Queue(maxsize=queue_size)
+        self._requests_counter = itertools.count()
+
+        self._counters_lock = Lock()
+        self._captured_count = 0
+        self._dropped_count = 0
+
+        self._start_writer()
+
+    def after_fork(self):
+        """
+        Re-create the queue, lock and writer thread in a forked child process
+        """
+        self._queue = Queue(maxsize=self._queue.maxsize)
+        self._counters_lock = Lock()
+        self._start_writer()
+
+    def _start_writer(self):
+        writer_thread = Thread(target=self._writer)
+        writer_thread.daemon = True
+        writer_thread.start()
+
+    def capture(self, request_data, headers, response, request_time):
+        """
+        Queue a request and its response to be written (if sampled)
+
+        :param request_data: The request data (JSON) that was sent
+        :type request_data: str
+        :param headers: The request headers
+        :type headers: dict
+        :param response: The response object
+        :type response: Response
+        :param request_time: Unix(epoch) timestamp of the request
+        :type request_time: float
+        """
+        if self._errors_only and response.status < 400:
+            return
+        # next() on itertools.count is atomic
+        if self._sample_rate > 1 and next(self._requests_counter) % self._sample_rate != 0:
+            return
+
+        try:
+            self._queue.put_nowait((request_data, headers, response, request_time, datetime.datetime.now()))
+        except Full:
+            with self._counters_lock:
+                self._dropped_count += 1
+
+    def flush(self):
+        """
+        Wait until all the queued captures are written
+        """
+        self._queue.join()
+
+    def get_stats(self):
+        """
+        Get the capture counters
+
+        :return: Number of written captures, dropped captures (queue was full) and queued captures
+        :rtype: dict
+        """
+        with self._counters_lock:
+            return {"captured": self._captured_count,
+                    "dropped": self._dropped_count,
+                    "queued": self._queue.qsize()}
+
+    def _writer(self):
+        """
+        Writer thread - formats the queued captures and writes them in batches
+        """
+        while True:
+            captures = [self._queue.get()]
+            try:
+                while len(captures) < self._batch_size:
+                    captures.append(self._queue.get_nowait())
+            except Empty:
+                pass
+
+            lines = []
+            for capture in captures:
+                try:
+                    lines.extend(self._format(*capture))
+                except Exception:
+                    with self._counters_lock:
+                        self._dropped_count += 1
+            try:
+                # A single log record (one write) for the whole batch
+                if lines:
+                    self._raw_logger.info("\n".join(lines))
+                with self._counters_lock:
+                    self._captured_count += len(lines) // 2
+            finally:
+                for _ in captures:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _format(request_data, headers, response, request_time, response_time):
+        """
+        Format a request and its response in the following format:
+        {"request": {...}}
+        {"response": {...}}
+        """
+        session_id = uuid.uuid4()
+        request_line = '''{"request": {"id": "%s", "requestTime": "%s", "data": %s, "headers": %s}}''' % \
+                       (session_id,
+                        datetime.datetime.fromtimestamp(request_time).isoformat(),
+                        request_data,
+                        json.dumps(str(headers)))
+
+        response_headers = json.dumps(str(response.headers)) if response.headers is not None else "\"None\""
+        response_body = response.data if response.data is not None else response.error
+        try:
+            response_body = json.loads(response_body)
+        except (TypeError, ValueError):
+            pass
+        # There is no consistency at API response on v1
+        if response.status == 401:
+            response_body = str(response_body).replace("\"", "'")
+        response_line = '''{"response": {"id": "%s", "responseTime": "%s", "body": "%s", "code": %s, "headers": %s}}''' % \
+                        (session_id,
+                         response_time.isoformat(),
+                         response_body,
+                         response.status,
+                         response_headers)
+        return request_line, response_line
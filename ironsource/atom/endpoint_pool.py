@@ -0,0 +1,111 @@
+import time
+import random
+from threading import Lock
+
+import ironsource.atom.config as config
+
+
+class EndpointPool:
+    """
+        Pool of Atom endpoints - picks an endpoint by power of two choices on the EWMA latency,
+        endpoints that failed (connection error / server error) are skipped for an exponentially growing time
+    """
+
+    def __init__(self, endpoints,
+                 ewma_weight=config.ENDPOINT_EWMA_WEIGHT,
+                 failure_backoff=config.ENDPOINT_FAILURE_BACKOFF,
+                 failure_backoff_max=config.ENDPOINT_FAILURE_BACKOFF_MAX):
+        """
+        :param endpoints: Atom API endpoints
+        :type endpoints: list(str)
+        :param ewma_weight: Weight of a new latency sample in the EWMA latency (0 to 1)
+        :type ewma_weight: float
+        :param failure_backoff: Time in seconds to skip an endpoint after its first failure
+        :type failure_backoff: float
+        :param failure_backoff_max: Max time in seconds to skip a failing endpoint
+        :type failure_backoff_max: float
+        """
+        if not endpoints:
+            raise Exception("At least one endpoint is required")
+        self._endpoints = list(endpoints)
+        self._ewma_weight = ewma_weight
+        self._failure_backoff = failure_backoff
+        self._failure_backoff_max = failure_backoff_max
+        self._lock = Lock()
+
+        # Endpoints without latency samples are preferred, so every endpoint gets probed
+        self._latency = dict((endpoint, 0.0) for endpoint in self._endpoints)
+        self._failures = dict((endpoint, 0) for endpoint in self._endpoints)
+        self._down_until = dict((endpoint, 0) for endpoint in self._endpoints)
+
+    def __len__(self):
+        return len(self._endpoints)
+
+    def choose(self, exclude=()):
+        """
+        Choose an endpoint, healthy endpoints are preferred over endpoints that failed recently
+
+        :param exclude: Endpoints not to choose (already tried)
+        :type exclude: list(str)
+        :return: Atom API endpoint
+        :rtype: str
+        """
+        now = time.time()
+        with self._lock:
+            candidates = [endpoint for endpoint in self._endpoints if endpoint not in exclude]
+            healthy = [endpoint for endpoint in candidates if self._down_until[endpoint] <= now]
+            if not healthy:
+                # Every endpoint is down, try the one that is expected to be back first
+                return min(candidates, key=lambda endpoint: self._down_until[endpoint])
+            if len(healthy) == 1:
+                return healthy[0]
+            first, second = random.sample(healthy, 2)
+            return first if self._latency[first] <= self._latency[second] else second
+
+    def report_success(self, endpoint, latency):
+        """
+        Report a response from an endpoint
+
+        :param endpoint: Atom API endpoint
+        :type endpoint: str
+        :param latency: Request latency in seconds
+        :type latency: float
+        """
+        with self._lock:
+            previous = self._latency[endpoint]
+            self._latency[endpoint] = latency if not previous else \
+                previous + self._ewma_weight * (latency - previous)
+            self._failures[endpoint] = 0
+            self._down_until[endpoint] = 0
+
+    def report_failure(self, endpoint):
+        """
+        Report a connection error / server error from an endpoint
+
+        :param endpoint: Atom API endpoint
+        :type endpoint: str
+        """
+        with self._lock:
+            self._failures[endpoint] += 1
+            backoff = min(self._failure_backoff_max, self._failure_backoff * pow(2, self._failures[endpoint] - 1))
+            self._down_until[endpoint] = time.time() + backoff
+
+    def after_fork(self):
+        """
+        Re-create the lock in a forked child process
+        """
+        self._lock = Lock()
+
+    def get_stats(self):
+        """
+        Get the health of every endpoint
+
+        :return: Endpoint -> EWMA latency (seconds), consecutive failures and health
+        :rtype: dict
+        """
+        now = time.time()
+        with self._lock:
+            return dict((endpoint, {"latency": self._latency[endpoint],
+                                    "failures": self._failures[endpoint],
+                                    "healthy": self._down_until[endpoint] <= now})
+                        for endpoint in self._endpoints)
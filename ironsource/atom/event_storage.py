@@ -50,3 +50,20 @@ class EventStorage:
         :return: True is empty, else False
         """
         pass
+
+    def get_ready_streams(self):
+        """
+        Optional, get the streams that have events in storage, from an index maintained by add_event / get_event
+        (so the tracker handler only visits the streams with events)
+
+        :return: Stream names, None if not supported (the tracker then visits all the streams)
+        :rtype: list(str)
+        """
+        return None
+
+    def after_fork(self):
+        """
+        Optional, called in a forked child process - re-create the locks and discard the events
+        inherited from the parent process (the parent sends them)
+        """
+        pass
@@ -0,0 +1,67 @@
+import json
+import time
+from collections import deque
+
+import ironsource.atom.config as config
+
+
+class FlightRecorder:
+    """
+        Flight recorder - fixed-size ring buffer of the metadata of the last batches
+        (stream, count, bytes, enqueue/send/ack time, status, attempt and endpoint), dumpable as JSON.
+
+        The records are plain dicts updated in place by the worker sending the batch, without locking
+        (a dump may show a batch in the middle of an update).
+    """
+
+    def __init__(self, size=config.FLIGHT_RECORDER_SIZE):
+        """
+        :param size: Number of batches to keep (0 disables the recorder)
+        :type size: int
+        """
+        self._records = deque(maxlen=max(0, size))
+
+    def record(self, stream, count, bytes_size):
+        """
+        Record a new batch
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param count: Number of events
+        :type count: int
+        :param bytes_size: Size in bytes of the events
+        :type bytes_size: int
+        :return: The batch record, to be updated while the batch is sent
+        :rtype: dict
+        """
+        record = {"stream": stream,
+                  "count": count,
+                  "bytes": bytes_size,
+                  # queued, sending, retrying, sent, failed or persisted (for the next start)
+                  "state": "queued",
+                  "enqueue_time": time.time(),
+                  "send_time": None,
+                  "ack_time": None,
+                  "status": None,
+                  "attempt": 0,
+                  "endpoint": None}
+        self._records.append(record)
+        return record
+
+    def get_records(self):
+        """
+        Get a copy of the records, oldest first
+
+        :return: Batch records
+        :rtype: list(dict)
+        """
+        return [dict(record) for record in list(self._records)]
+
+    def dump(self):
+        """
+        Dump the records as JSON, oldest first
+
+        :return: JSON array of the batch records
+        :rtype: str
+        """
+        return json.dumps(self.get_records())
@@ -0,0 +1,267 @@
+import os
+import json
+import zlib
+import binascii
+from collections import deque
+from threading import Lock
+
+from ironsource.atom.event_storage import EventStorage
+from ironsource.atom.event import Event
+import ironsource.atom.config as config
+
+
+class HybridEventStorage(EventStorage):
+    """
+        Hybrid event storage - in memory backlog that spills its overflow to compressed segment files on disk,
+        implements ABC EventStorage
+
+        Segments left in spill_path by a previous process (or by close()) are recovered on start,
+        so every storage needs its own spill_path.
+    """
+
+    SEGMENT_SUFFIX = ".seg"
+
+    def __init__(self,
+                 memory_bytes_size=config.BACKLOG_MEMORY_BYTES_SIZE,
+                 segment_size=config.BACKLOG_SEGMENT_SIZE,
+                 spill_path=config.BACKLOG_SPILL_PATH):
+        """
+        :param memory_bytes_size: Size in bytes of the events held in memory before spilling to disk
+        :type memory_bytes_size: int
+        :param segment_size: Number of events in every on-disk segment
+        :type segment_size: int
+        :param spill_path: Directory of the segment files
+        :type spill_path: str
+        """
+        super(HybridEventStorage, self).__init__()
+        self._lock = Lock()
+        self._memory_bytes_size = memory_bytes_size
+        # Partial segments are written to disk once their events take more than this size
+        self._spill_bytes_size = max(memory_bytes_size // 8, 1)
+        self._segment_size = segment_size
+        self._spill_dir = spill_path
+        if not os.path.isdir(spill_path):
+            os.makedirs(spill_path)
+
+        # Per stream: events in memory, events waiting to be written to disk and segments (oldest first)
+        self._memory = {}
+        self._spill_buffer = {}
+        self._segments = {}
+        # Per stream number of events (the ready index - streams that have events)
+        self._stream_counts = {}
+
+        # Bytes of the events in memory and of the events waiting to be written to disk
+        self._memory_bytes = 0
+        self._spill_bytes = 0
+        self._count = 0
+        self._segment_index = 0
+
+        self._recover_segments()
+
+    def add_event(self, event_object):
+        """
+        Add event object to memory, or to disk if the memory threshold was crossed
+
+        :param event_object: Event object
+        :type event_object: Event
+        """
+        stream = event_object.stream
+        with self._lock:
+            self._count += 1
+            self._stream_counts[stream] = self._stream_counts.get(stream, 0) + 1
+            # Once a stream has spilled, new events go after the spilled ones in order to keep the stream order
+            if not self._is_spilled(stream) and self._memory_bytes + self._spill_bytes < self._memory_bytes_size:
+                self._memory.setdefault(stream, deque()).append(event_object.data)
+                self._memory_bytes += len(event_object.data)
+                return
+
+            spill_buffer = self._spill_buffer.setdefault(stream, [])
+            spill_buffer.append(event_object.data)
+            self._spill_bytes += len(event_object.data)
+            if len(spill_buffer) >= self._segment_size:
+                self._write_spill_buffer(stream)
+            elif self._spill_bytes >= self._spill_bytes_size:
+                # Many streams with partial segments, write all of them
+                for spilled_stream in list(self._spill_buffer):
+                    self._write_spill_buffer(spilled_stream)
+
+    def get_event(self, stream):
+        """
+        Get & remove event object from storage
+
+        :param stream: Atom stream name
+        :type stream: str
+        :return: Event object from storage
+        :rtype: Event
+        """
+        with self._lock:
+            events = self._memory.get(stream)
+            if not events:
+                events = self._drain_spilled(stream)
+            if not events:
+                return None
+
+            data = events.popleft()
+            self._memory_bytes -= len(data)
+            self._count -= 1
+            self._stream_counts[stream] -= 1
+            if self._stream_counts[stream] <= 0:
+                del self._stream_counts[stream]
+            return Event(stream, data)
+
+    def remove_event(self, stream):
+        """
+        Remove event object from storage
+
+        :param stream: Atom stream name
+        :type stream: str
+        """
+        return self.get_event(stream)
+
+    def is_empty(self):
+        """
+        Check if the storage is empty
+
+        :return: True is empty, else False
+        """
+        return self._count == 0
+
+    def get_streams(self):
+        """
+        Get the streams that have events in storage (including the ones recovered from disk)
+
+        :rtype: list(str)
+        """
+        with self._lock:
+            return [stream for stream in set(self._memory) | set(self._spill_buffer) | set(self._segments)
+                    if self._memory.get(stream) or self._is_spilled(stream)]
+
+    def get_ready_streams(self):
+        """
+        Get the streams that have events in storage
+
+        :rtype: list(str)
+        """
+        with self._lock:
+            return list(self._stream_counts)
+
+    def after_fork(self):
+        """
+        Discard the events inherited from the parent process (the parent sends them), the child process
+        spills to the same spill_path (the segment names have the pid of their process)
+        """
+        self._lock = Lock()
+        self._memory = {}
+        self._spill_buffer = {}
+        self._segments = {}
+        self._stream_counts = {}
+        self._memory_bytes = 0
+        self._spill_bytes = 0
+        self._count = 0
+
+    def close(self):
+        """
+        Write all the events in memory to disk, they are recovered by the next storage created on spill_path
+        """
+        with self._lock:
+            for stream, events in self._memory.items():
+                if not events:
+                    continue
+                # The events in memory are older than the stream segments
+                segments = self._segments.get(stream)
+                first_index = self._segment_index_of(segments[0]) if segments else self._segment_index + 1
+                self._write_segment(stream, list(events), index=first_index - 1)
+                events.clear()
+            for stream in list(self._spill_buffer):
+                self._write_spill_buffer(stream)
+            self._memory_bytes = 0
+
+    def _is_spilled(self, stream):
+        return bool(self._segments.get(stream)) or bool(self._spill_buffer.get(stream))
+
+    def _write_spill_buffer(self, stream):
+        spill_buffer = self._spill_buffer.pop(stream, None)
+        if spill_buffer:
+            self._spill_bytes -= sum(len(event_data) for event_data in spill_buffer)
+            self._write_segment(stream, spill_buffer)
+
+    def _write_segment(self, stream, data, index=None):
+        """
+        Write a list of events to a new compressed segment file
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param data: List of events data
+        :type data: list(str)
+        :param index: Optional, segment order (default: after all the segments)
+        :type index: int
+        """
+        if index is None:
+            self._segment_index += 1
+            index = self._segment_index
+        # Segment file name: {index}.{pid}.{events count}.{hex stream name}.seg
+        # (the pid keeps the segments of forked processes apart)
+        segment_name = "{index}.{pid}.{count}.{stream}{suffix}".format(
+            index=index,
+            pid=os.getpid(),
+            count=len(data),
+            stream=binascii.hexlify(stream.encode("utf-8")).decode("ascii"),
+            suffix=self.SEGMENT_SUFFIX)
+        segment_path = os.path.join(self._spill_dir, segment_name)
+        with open(segment_path, "wb") as segment_file:
+            segment_file.write(zlib.compress(json.dumps(data).encode("utf-8")))
+
+        segments = self._segments.setdefault(stream, deque())
+        if segments and index < self._segment_index_of(segments[0]):
+            segments.appendleft(segment_path)
+        else:
+            segments.append(segment_path)
+
+    @staticmethod
+    def _segment_index_of(segment_path):
+        return int(os.path.basename(segment_path).split(".")[0])
+
+    def _recover_segments(self):
+        """
+        Load the segments index of spill_path (left by a previous storage)
+        """
+        recovered = []
+        for name in os.listdir(self._spill_dir):
+            if not name.endswith(self.SEGMENT_SUFFIX):
+                continue
+            parts = name[:-len(self.SEGMENT_SUFFIX)].split(".")
+            # {index}.{pid}.{count}.{stream}, or {index}.{count}.{stream} (written before the pid was added)
+            index, pid, count, stream = parts if len(parts) == 4 else [parts[0], 0] + parts[1:]
+            recovered.append((int(index), int(pid), int(count), binascii.unhexlify(stream).decode("utf-8"), name))
+
+        for index, _, count, stream, name in sorted(recovered):
+            self._segments.setdefault(stream, deque()).append(os.path.join(self._spill_dir, name))
+            self._count += count
+            self._stream_counts[stream] = self._stream_counts.get(stream, 0) + count
+            self._segment_index = max(self._segment_index, index)
+
+    def _drain_spilled(self, stream):
+        """
+        Move the oldest spilled events of a stream back to memory
+
+        :param stream: Atom stream name
+        :type stream: str
+        :return: The stream events in memory
+        :rtype: deque
+        """
+        segments = self._segments.get(stream)
+        if segments:
+            segment_path = segments.popleft()
+            with open(segment_path, "rb") as segment_file:
+                data = json.loads(zlib.decompress(segment_file.read()).decode("utf-8"))
+            os.remove(segment_path)
+        elif self._spill_buffer.get(stream):
+            data = self._spill_buffer.pop(stream)
+            self._spill_bytes -= sum(len(event_data) for event_data in data)
+        else:
+            return None
+
+        events = self._memory.setdefault(stream, deque())
+        events.extend(data)
+        self._memory_bytes += sum(len(event_data) for event_data in data)
+        return events
@@ -1,12 +1,17 @@
 import json
 import hmac
 import datetime
-import requests
 import hashlib
+import time
+import functools
+from threading import Lock
 import ironsource.atom.atom_logger as logger
-from ironsource.atom.request import Request
+from ironsource.atom.endpoint_pool import EndpointPool
+from ironsource.atom.transport import RequestsTransport
+from ironsource.atom.debug_log_writer import DebugLogWriter
+from ironsource.atom.prepared_request import PreparedRequest
+from ironsource.atom.batch_event_pool import BatchEventPool
 import ironsource.atom.config as config
-import uuid
 import os
 
 
@@ -19,14 +24,17 @@ class IronSourceAtom:
 
     def __init__(self, is_debug=False, endpoint=config.ATOM_ENDPOINT, auth_key="", request_timeout=60,
                  debug_to_file=False,
-                 debug_file_path=config.DEBUG_FILE_PATH):
+                 debug_file_path=config.DEBUG_FILE_PATH,
+                 transport=None,
+                 debug_sample_rate=config.DEBUG_SAMPLE_RATE,
+                 debug_errors_only=False):
         """
         Atom class init function
 
         :param is_debug:            Optional, Enable/Disable debug
         :type  is_debug:            bool
-        :param endpoint:            Optional, Atom API Endpoint
-        :type  endpoint:            str
+        :param endpoint:            Optional, Atom API Endpoint, or a list of endpoints to balance and fail over
+        :type  endpoint:            str | list(str)
         :param auth_key:            Optional, Atom auth key
         :type  auth_key:            str
         :param request_timeout:     Optional, request timeout (default: 60)
@@ -35,13 +43,27 @@ class IronSourceAtom:
         :type  debug_to_file:       bool
         :param debug_file_path:     Optional, the path to the debug file (debug_to_file must be True) (default: /tmp)
         :type  debug_file_path:     str
+        :param transport:           Optional, HTTP Transport implementation (default: RequestsTransport)
+        :type  transport:           Transport
+        :param debug_sample_rate:   Optional, write 1 of every debug_sample_rate requests to the debug file
+        :type  debug_sample_rate:   int
+        :param debug_errors_only:   Optional, write only the failed requests (status >= 400) to the debug file
+        :type  debug_errors_only:   bool
 
         """
 
+        # Several endpoints are balanced by EWMA latency, with failover on connection error / server error
+        self._endpoint_pool = None
+        if isinstance(endpoint, (list, tuple)):
+            if not endpoint:
+                raise Exception("Endpoint list has to be non-empty")
+            self._endpoint_pool = EndpointPool(endpoint) if len(endpoint) > 1 else None
+            endpoint = endpoint[0]
         self._endpoint = endpoint
         self._auth_key = auth_key
         self._is_debug = is_debug
         self._timeout = request_timeout
+        self._transport = transport if transport is not None else RequestsTransport()
 
         self._headers = {
             'x-ironsource-atom-sdk-type': 'python',
@@ -51,6 +73,8 @@ class IronSourceAtom:
 
         # init logger
         self._logger = logger.get_logger(debug=self._is_debug)
+        # Repeated errors and warnings are rate limited
+        self._error_logger = logger.RateLimitedLogger(self._logger)
 
         self._debug_to_file = debug_to_file
         if self._debug_to_file:
@@ -58,11 +82,14 @@ class IronSourceAtom:
                 self._debug_file_path = debug_file_path
             else:
                 self._debug_file_path = config.DEBUG_FILE_PATH
-                self._logger.error("No Read & Write access to the supplied log file path, setting default: {}"
-                                   .format(config.DEBUG_FILE_PATH))
+                self._logger.error("No Read & Write access to the supplied log file path, setting default: %s",
+                                   config.DEBUG_FILE_PATH)
             now = datetime.datetime.now()
             log_file_name = self._debug_file_path + "atom-raw.{day}-{month}.json".format(day=now.day, month=now.month)
-            self._raw_logger = logger.get_logger(name="AtomRawLogger", file_name=log_file_name)
+            # The requests are formatted and written from a background thread
+            self._debug_log_writer = DebugLogWriter(logger.get_logger(name="AtomRawLogger", file_name=log_file_name),
+                                                    sample_rate=debug_sample_rate,
+                                                    errors_only=debug_errors_only)
 
     def set_debug(self, is_debug):  # pragma: no cover
         """
@@ -73,6 +100,7 @@ class IronSourceAtom:
         """
         self._is_debug = is_debug if isinstance(is_debug, bool) else False
         self._logger = logger.get_logger(debug=self._is_debug)
+        self._error_logger.logger = self._logger
 
     def get_auth(self):
         """
@@ -82,6 +110,22 @@ class IronSourceAtom:
         """
         return self._auth_key
 
+    def get_headers(self):
+        """
+        Get the HTTP headers sent with every request
+
+        :rtype: dict
+        """
+        return self._headers
+
+    def get_transport(self):
+        """
+        Get the HTTP transport
+
+        :rtype: Transport
+        """
+        return self._transport
+
     def put_event(self, stream, data, method="POST", auth_key=""):
         """Send a single event to Atom API
 
@@ -103,12 +147,11 @@ class IronSourceAtom:
         if len(auth_key) == 0:
             auth_key = self._auth_key
 
-        request_time = datetime.datetime.now().isoformat()
+        request_time = time.time()
         request_data = self.create_request_data(stream, auth_key, data)
-        response = self.send_data(url=self._endpoint, data=request_data, method=method, headers=self._headers,
-                                  timeout=self._timeout)
+        response = self._send(path="", data=request_data, method=method)
         if self._debug_to_file:
-            self._session_to_file(response, request_time)
+            self._debug_log_writer.capture(request_data, self._headers, response, request_time)
         return response
 
     def put_events(self, stream, data, auth_key=""):
@@ -126,6 +169,109 @@ class IronSourceAtom:
 
         :return: requests response object
         """
+        return self.put_prepared(self.prepare_events(stream, data, auth_key))
+
+    def put_events_iter(self, stream, events, auth_key="", bulk_size=config.BATCH_SIZE,
+                        bulk_bytes_size=config.BATCH_BYTES_SIZE, concurrency=config.PUT_EVENTS_ITER_CONCURRENCY,
+                        callback=None):
+        """Send the events of an iterable (e.g. a generator) to Atom API
+
+        The events are consumed lazily and cut into bulks of up to bulk_size events and bulk_bytes_size bytes,
+        up to concurrency bulks are sent at once (every worker thread keeps its connection of the transport).
+        At most 2 * concurrency bulks are held in memory, whatever the size of the input.
+
+        :param stream: Atom Stream name
+        :type stream: str
+        :param events: Iterable of strings or dictionaries that will be sent to Atom
+        :type events: iterable(object)
+        :param auth_key: Optional, Hmac auth key
+        :type auth_key: str
+        :param bulk_size: Optional, Max number of events in every bulk
+        :type bulk_size: int
+        :param bulk_bytes_size: Optional, Max size of every bulk in bytes
+        :type bulk_bytes_size: int
+        :param concurrency: Optional, Number of bulks sent at once
+        :type concurrency: int
+        :param callback: Optional, called for every bulk that failed to be sent (no retries),
+                         convention: callback(status, error_msg, data)
+        :type callback: function
+
+        :return: Number of sent / failed bulks and events
+        :rtype: dict
+        """
+        if not stream:
+            raise Exception("Stream is required")
+        result = {"sent_bulks": 0, "sent_events": 0, "failed_bulks": 0, "failed_events": 0}
+        result_lock = Lock()
+        pool = BatchEventPool(thread_count=max(1, concurrency), max_events=max(1, concurrency))
+        try:
+            bulk = []
+            bulk_bytes = 0
+            for event in events:
+                if not isinstance(event, str):
+                    event = json.dumps(event)
+                event_bytes = len(event)
+                if bulk and (len(bulk) >= bulk_size or bulk_bytes + event_bytes > bulk_bytes_size):
+                    pool.add_event(functools.partial(self._put_bulk, stream, bulk, bulk_bytes, auth_key, callback,
+                                                     result, result_lock))
+                    bulk = []
+                    bulk_bytes = 0
+                bulk.append(event)
+                bulk_bytes += event_bytes
+            if bulk:
+                pool.add_event(functools.partial(self._put_bulk, stream, bulk, bulk_bytes, auth_key, callback,
+                                                 result, result_lock))
+            pool.join(None)
+        finally:
+            pool.stop()
+        return result
+
+    def _put_bulk(self, stream, bulk, bulk_bytes, auth_key, callback, result, result_lock):
+        """
+        Send a bulk of put_events_iter and count the result
+        """
+        try:
+            response = self.put_prepared(self.prepare_events(
+                stream, bulk, auth_key, streaming=bulk_bytes >= config.STREAMING_BODY_MIN_SIZE))
+            status, error = response.status, response.error
+        except Exception as e:
+            status, error = 400, str(e)
+
+        is_sent = 200 <= status < 400
+        with result_lock:
+            kind = "sent" if is_sent else "failed"
+            result[kind + "_bulks"] += 1
+            result[kind + "_events"] += len(bulk)
+        if not is_sent:
+            self._error_logger.error((stream, status), "Failed to send bulk of %s events; Stream: %s; Status: %s; Error: %s",
+                                     len(bulk), stream, status, error,
+                                     extra={"atom_stream": stream, "atom_status": status})
+            if callback is not None:
+                try:
+                    callback(status, error, bulk)
+                except Exception as e:
+                    self._error_logger.error("callback", "put_events_iter callback failed: %s", e)
+
+    def prepare_events(self, stream, data, auth_key="", compress=False, streaming=False):
+        """Serialize and sign multiple events (batch) once
+
+        The returned request is immutable and can be sent (and resent on retry) with put_prepared.
+
+        :param stream: Atom Stream name
+        :type stream: str
+        :param data: List of strings or dictionaries that will be sent to Atom
+        :type data: list(object)
+        :param auth_key: Optional, Hmac auth key
+        :type auth_key: str
+        :param compress: Optional, send the body compressed with gzip
+        :type compress: bool
+        :param streaming: Optional, keep the body as one chunk per event (signed incrementally) and send it
+                          block by block, without building the concatenated body (for large batches)
+        :type streaming: bool
+
+        :return: Prepared bulk request
+        :rtype: PreparedRequest
+        """
         if not isinstance(data, list) or not data:
             raise Exception("Data has to be of a non-empty list")
         if not stream:
@@ -133,16 +279,64 @@ class IronSourceAtom:
         if len(auth_key) == 0:
             auth_key = self._auth_key
 
-        data = json.dumps(data)
-        request_data = self.create_request_data(stream, auth_key, data, batch=True)
+        if streaming:
+            return self._prepare_streamed_events(stream, data, auth_key, compress)
+
+        events = json.dumps(data)
+        request_data = {"table": stream, "data": events, "bulk": True}
+        signature = self._sign(auth_key, events)
+        if signature is not None:
+            request_data["auth"] = signature
+
+        return PreparedRequest(stream, json.dumps(request_data).encode("utf-8"), signature, len(data), compress)
+
+    def put_prepared(self, prepared_request):
+        """Send a prepared bulk request (see prepare_events) to Atom API
+
+        :param prepared_request: Prepared bulk request
+        :type prepared_request: PreparedRequest
 
-        request_time = datetime.datetime.now().isoformat()
-        response = self.send_data(url=self._endpoint + "bulk", data=request_data, method="post", headers=self._headers,
-                                  timeout=self._timeout)
+        :return: requests response object
+        """
+        headers = self._headers
+        if prepared_request.compressed_body is not None:
+            headers = dict(self._headers)
+            headers["Content-Encoding"] = "gzip"
+        elif prepared_request.is_streamed():
+            headers = dict(self._headers)
+            headers["Content-Length"] = str(prepared_request.size)
+
+        request_time = time.time()
+        response = self._send(path="bulk", data=prepared_request.open_body(), method="post", headers=headers)
         if self._debug_to_file:
-            self._session_to_file(response, request_time)
+            self._debug_log_writer.capture(prepared_request.get_body().decode("utf-8"), headers, response,
+                                           request_time)
         return response
 
+    def _prepare_streamed_events(self, stream, data, auth_key, compress):
+        """
+        Serialize the events of a streamed request - the "data" field is the JSON string of the events list,
+        every event is serialized and escaped into its own chunk, and the HMAC is updated chunk by chunk
+        """
+        mac = hmac.new(bytes(auth_key.encode("utf-8")), digestmod=hashlib.sha256) if len(auth_key) else None
+        event_chunks = []
+        for index, event in enumerate(data):
+            # Same separators as json.dumps(data)
+            events_part = ("[" if index == 0 else ", ") + json.dumps(event)
+            if index == len(data) - 1:
+                events_part += "]"
+            if mac is not None:
+                mac.update(events_part.encode("utf-8"))
+            # JSON escaping is per character, so the escaped parts concatenate to the escaped events string
+            event_chunks.append(json.dumps(events_part)[1:-1].encode("utf-8"))
+
+        signature = mac.hexdigest() if mac is not None else None
+        prefix = '{{"table": {stream}, "bulk": true, {auth}"data": "'.format(
+            stream=json.dumps(stream),
+            auth='"auth": "{}", '.format(signature) if signature is not None else "")
+        return PreparedRequest(stream, [prefix.encode("utf-8")] + event_chunks + [b'"}'], signature, len(data),
+                               compress)
+
     @staticmethod
     def create_request_data(stream, auth_key, data, batch=False):
         """
@@ -167,10 +361,9 @@ class IronSourceAtom:
 
         request_data = {"table": stream, "data": data}
 
-        if len(auth_key) != 0:
-            request_data["auth"] = hmac.new(bytes(auth_key.encode("utf-8")),
-                                            msg=data.encode("utf-8"),
-                                            digestmod=hashlib.sha256).hexdigest()
+        signature = IronSourceAtom._sign(auth_key, data)
+        if signature is not None:
+            request_data["auth"] = signature
 
         if batch:
             request_data["bulk"] = True
@@ -178,8 +371,104 @@ class IronSourceAtom:
         return json.dumps(request_data)
 
     @staticmethod
-    def send_data(url, data, method, headers, timeout):
+    def _sign(auth_key, data):
+        """
+        HMAC signature of the data
+
+        :param auth_key: Hmac auth key
+        :type auth_key: str
+        :param data: Serialized data
+        :type data: str
+        :return: Hex signature, None when there is no auth key
+        :rtype: str
+        """
+        if len(auth_key) == 0:
+            return None
+        return hmac.new(bytes(auth_key.encode("utf-8")),
+                        msg=data.encode("utf-8"),
+                        digestmod=hashlib.sha256).hexdigest()
+
+    def after_fork(self):
+        """
+        Re-create the connection pools, locks and threads in a forked child process
+        """
+        self._transport.after_fork()
+        self._error_logger.after_fork()
+        if self._endpoint_pool is not None:
+            self._endpoint_pool.after_fork()
+        if self._debug_to_file:
+            self._debug_log_writer.after_fork()
+
+    def get_debug_stats(self):
+        """
+        Get the debug file capture counters (when debug_to_file is enabled)
+
+        :return: Number of written captures, dropped captures (queue was full) and queued captures
+        :rtype: dict
+        """
+        return self._debug_log_writer.get_stats() if self._debug_to_file else {}
+
+    def get_endpoint_stats(self):
+        """
+        Get the health of every endpoint (when several endpoints are used)
+
+        :return: Endpoint -> EWMA latency (seconds), consecutive failures and health
+        :rtype: dict
+        """
+        return self._endpoint_pool.get_stats() if self._endpoint_pool is not None else {}
+
+    def _send(self, path, data, method, headers=None):
+        """
+        Send data to the endpoint (or pick one of the endpoints and fail over to the others)
+
+        :param path: Atom API path
+        :type path: str
+        :param data: Data that will be sent to Atom
+        :type data: str | bytes
+        :param method: Type of HTTP request
+        :type method: str
+        :param headers: Optional, HTTP request headers (default: the SDK headers)
+        :type headers: dict
+
+        :return: response from server
+        :rtype: Response
+        """
+        if headers is None:
+            headers = self._headers
+        if self._endpoint_pool is None:
+            response = self.send_data(url=self._endpoint + path, data=data, method=method, headers=headers,
+                                      timeout=self._timeout, transport=self._transport)
+            response.endpoint = self._endpoint
+            return response
+
+        tried = []
+        while True:
+            # A streamed body is read again on failover
+            if hasattr(data, "seek"):
+                data.seek(0)
+            endpoint = self._endpoint_pool.choose(exclude=tried)
+            start_time = time.time()
+            response = self.send_data(url=endpoint + path, data=data, method=method, headers=headers,
+                                      timeout=self._timeout, transport=self._transport)
+            response.endpoint = endpoint
+            # Connection errors are returned as 500
+            if response.status < 500:
+                self._endpoint_pool.report_success(endpoint, time.time() - start_time)
+                return response
+
+            self._endpoint_pool.report_failure(endpoint)
+            tried.append(endpoint)
+            if len(tried) == len(self._endpoint_pool):
+                return response
+            self._error_logger.warning((endpoint, response.status), "Got code: %s from endpoint: %s, failing over",
+                                       response.status, endpoint,
+                                       extra={"atom_endpoint": endpoint, "atom_status": response.status})
+
+    @staticmethod
+    def send_data(url, data, method, headers, timeout, transport=None):
         """
+        Send data with the HTTP transport
+
         :param url: Atom API endpoint
         :type url: str
         :param data: Data that will be sent to Atom
@@ -189,50 +478,20 @@ class IronSourceAtom:
         :param headers: HTTP request headers
         :type headers: dict
         :param timeout: request timeout
+        :param transport: Optional, HTTP Transport (default: a RequestsTransport for this call only)
+        :type transport: Transport
 
         :return: response from server
         :rtype: Response
         """
-        with requests.Session() as session:
-            session.headers.update(headers)
-            request = Request(url, data, session, timeout)
-            if method.lower() == "get":
-                return request.get()
-            else:
-                return request.post()
-
-    def _session_to_file(self, response, request_time):
-        """
-        Writes SDK request and response to JSON file in the following format:
-        [{req},{res}...]
-        :param request_time: request time
-        :param response: The 'requests' lib response object (including the original request)
-        """
-        raw_request = response.raw_response.request
-        request_data = raw_request.body if raw_request.body is not None else '"{}"'.format(raw_request.path_url)
-        session_id = uuid.uuid4()
-        # self._raw_logger.emit("hi")
-        self._raw_logger.info('''{"request": {"id": "%s", "requestTime": "%s", "data": %s, "headers": %s}}''' %
-                              (session_id,
-                               request_time,
-                               request_data,
-                               json.dumps(str(raw_request.headers))
-                               ))
-        # Format response
-        response_headers = json.dumps(str(response.raw_response.headers)) \
-            if hasattr(response.raw_response, "headers") else "\"None\""
-        response_body = response.data if response.data is not None else response.error
-        try:
-            response_body = json.loads(response_body)
-        except ValueError:
-            pass
-        # There is no consistency at API response on v1
-        if response.status == 401:
-            response_body = str(response_body).replace("\"", "'")
-        self._raw_logger.info(
-            '''{"response": {"id": "%s", "responseTime": "%s", "body": "%s", "code": %s, "headers": %s}}''' %
-            (session_id,
-             datetime.datetime.now().isoformat(),
-             response_body,
-             response.status,
-             response_headers))
+        if transport is None:
+            transport = RequestsTransport()
+            try:
+                return IronSourceAtom.send_data(url, data, method, headers, timeout, transport)
+            finally:
+                transport.close()
+
+        if method.lower() == "get":
+            return transport.get(url, data, headers, timeout)
+        else:
+            return transport.post(url, data, headers, timeout)
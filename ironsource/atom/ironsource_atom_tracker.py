@@ -1,9 +1,21 @@
+import os
+import sys
 import json
 import signal
+import atexit
+import functools
 import Queue
 from ironsource.atom.ironsource_atom import IronSourceAtom
 from ironsource.atom.queue_event_storage import QueueEventStorage
 from ironsource.atom.batch_event_pool import BatchEventPool
+from ironsource.atom.partitioned_event_pool import PartitionedEventPool
+from ironsource.atom.dead_letter_spool import DeadLetterSpool
+from ironsource.atom.aggregator import Aggregator
+from ironsource.atom.sampler import Sampler
+from ironsource.atom.schema import Schema, infer_field_type, to_columns
+from ironsource.atom.rate_limiter import RateLimiter
+from ironsource.atom.flight_recorder import FlightRecorder
+from ironsource.atom.callback_dispatcher import CallbackDispatcher
 from ironsource.atom.event import Event
 import ironsource.atom.atom_logger as logger
 import ironsource.atom.config as config
@@ -12,6 +24,8 @@ import random
 
 from threading import Lock
 from threading import Thread
+from threading import Event as ThreadEvent
+from threading import current_thread
 
 
 class IronSourceAtomTracker:
@@ -39,7 +53,23 @@ class IronSourceAtomTracker:
                  retry_forever=config.RETRY_FOREVER,
                  is_blocking=config.BACKLOG_BLOCKING,
                  backlog_timeout=config.BACKLOG_TIMEOUT,
-                 request_timeout=config.REQUEST_TIMEOUT):
+                 request_timeout=config.REQUEST_TIMEOUT,
+                 dead_letter_path=None,
+                 transport=None,
+                 debug_sample_rate=config.DEBUG_SAMPLE_RATE,
+                 debug_errors_only=False,
+                 shutdown_spool_path=None,
+                 runtime=None,
+                 runtime_quota=config.RUNTIME_TRACKER_QUOTA,
+                 on_fork=None,
+                 batch_worker_max_count=None,
+                 is_partitioned=False,
+                 flight_recorder_size=config.FLIGHT_RECORDER_SIZE,
+                 flight_recorder_signal=None,
+                 is_threadless=False,
+                 is_callback_async=False,
+                 is_callback_coalesced=False,
+                 callback_queue_size=config.CALLBACK_QUEUE_SIZE):
         """
         Tracker init function
 
@@ -67,8 +97,8 @@ class IronSourceAtomTracker:
         :type  debug_to_file:      bool
         :param debug_file_path:    Optional, the path to the debug file (debug_to_file must be True) (default: /tmp)
         :type  debug_file_path:    str
-        :param endpoint:           Optional, Atom endpoint
-        :type  endpoint:           str
+        :param endpoint:           Optional, Atom endpoint, or a list of endpoints to balance and fail over
+        :type  endpoint:           str | list(str)
         :param auth_key:           Optional, Default auth key to use (when none is provided in .track)
         :type  auth_key:           str
         :param callback:           Optional, callback to be called on error (Client 400/ Server 500)
@@ -81,6 +111,48 @@ class IronSourceAtomTracker:
         :type  backlog_timeout:    bool
         :param request_timeout:    Optional, HTTP requests lib session GET/POST timeout in seconds (default: 60 seconds)
         :type  request_timeout:    int
+        :param dead_letter_path:   Optional, directory of the dead-letter spool for batches that failed to be sent
+        :type  dead_letter_path:   str
+        :param transport:          Optional, HTTP Transport implementation (default: RequestsTransport)
+        :type  transport:          Transport
+        :param debug_sample_rate:  Optional, write 1 of every debug_sample_rate requests to the debug file
+        :type  debug_sample_rate:  int
+        :param debug_errors_only:  Optional, write only the failed requests (status >= 400) to the debug file
+        :type  debug_errors_only:  bool
+        :param shutdown_spool_path: Optional, directory for the events still unsent at the stop() deadline,
+                                    they are sent by the next tracker started with the same path
+        :type  shutdown_spool_path: str
+        :param runtime:            Optional, SenderRuntime shared with other trackers (threads, workers and transport),
+                                   batch_worker_count and batch_pool_size are ignored when it is set
+        :type  runtime:            SenderRuntime
+        :param runtime_quota:      Optional, max number of batches of this tracker sent at once by the runtime
+        :type  runtime_quota:      int
+        :param on_fork:            Optional, called in a forked child process after the tracker was re-created,
+                                   convention: on_fork(tracker)
+        :type  on_fork:            function
+        :param batch_worker_max_count: Optional, autoscale the BatchEventPool workers between batch_worker_count
+                                       and batch_worker_max_count (default: no autoscaling)
+        :type  batch_worker_max_count: int
+        :param is_partitioned:     Optional, pin every stream to one of batch_worker_count workers, so the batches of
+                                   a stream are sent in order (batch_pool_size batches wait in every worker, not used with runtime)
+        :type  is_partitioned:     bool
+        :param flight_recorder_size: Optional, number of batches kept by the flight recorder (0 disables it)
+        :type  flight_recorder_size: int
+        :param flight_recorder_signal: Optional, signal (e.g. signal.SIGUSR1) that dumps the flight recorder to stderr
+        :type  flight_recorder_signal: int
+        :param is_threadless:      Optional, no background threads (serverless / batch jobs): full batches are sent
+                                   by track() and the rest by flush_sync(), no flush interval and no signal handlers
+        :type  is_threadless:      bool
+        :param is_callback_async:  Optional, call the error callback from a dispatcher thread (bounded queue)
+                                   instead of the sending worker / track() caller
+        :type  is_callback_async:  bool
+        :param is_callback_coalesced: Optional, pass the queued errors of the same stream, status and error message
+                                      to a single callback, with the list of their payloads as data
+                                      (implies is_callback_async)
+        :type  is_callback_coalesced: bool
+        :param callback_queue_size: Optional, max number of queued callbacks (is_callback_async),
+                                    callbacks are dropped when it is full
+        :type  callback_queue_size: int
         """
 
         # Init Atom basic SDK
@@ -92,15 +164,40 @@ class IronSourceAtomTracker:
                                     auth_key=auth_key,
                                     request_timeout=request_timeout,
                                     debug_to_file=debug_to_file,
-                                    debug_file_path=debug_file_path)
+                                    debug_file_path=debug_file_path,
+                                    transport=transport if transport is not None or runtime is None
+                                    else runtime.transport,
+                                    debug_sample_rate=debug_sample_rate,
+                                    debug_errors_only=debug_errors_only)
         self._logger = logger.get_logger(debug=self._is_debug)
+        # Repeated errors and warnings (per stream and status) are rate limited
+        self._error_logger = logger.RateLimitedLogger(self._logger)
 
         # Optional callback to be called on error, convention: time, status, error_msg, data
         self._callback = callback if callable(callback) else lambda timestamp, status, error_msg, data, stream: None
+        # Optional dispatcher thread of the callback calls (a slow callback doesn't slow down sending)
+        self._callback_dispatcher = CallbackDispatcher(self._callback, callback_queue_size, is_callback_coalesced) \
+            if callable(callback) and (is_callback_async or is_callback_coalesced) else None
+
+        # Optional spool of the batches that failed to be sent (can be replayed with ironsource.atom.replay)
+        self._dead_letter_spool = DeadLetterSpool(dead_letter_path) if dead_letter_path else None
+
+        # Optional spool of the events that are still unsent at the shutdown deadline (reloaded on start)
+        self._shutdown_spool = DeadLetterSpool(shutdown_spool_path) if shutdown_spool_path else None
 
         self._is_run_worker = True
         self._flush_all = False
         self._alive = True
+        self._is_stopped = False
+        # Lock of the stopped flag only - stop() takes no other tracker lock, it may run while the main thread
+        # is interrupted by a signal inside track() (see _graceful_kill)
+        self._stop_lock = Lock()
+        # Process that runs the tracker threads
+        self._pid = os.getpid()
+        # Wakes up the handler (flush / stop)
+        self._wakeup = ThreadEvent()
+        # Set on stop - wakes up the batches waiting to retry, so they are persisted by the deadline
+        self._stopping = ThreadEvent()
 
         # Lock of accessing the stream_keys dict
         self._data_lock = Lock()
@@ -108,25 +205,38 @@ class IronSourceAtomTracker:
         # Streams to keys map
         self._stream_keys = {}
 
+        # Metric-like values of tracker.aggregate(), summarized into events on every flush interval
+        self._aggregator = Aggregator()
+
+        # Per stream sampling of the tracked events
+        self._sampler = Sampler()
+
+        # Stream to Schema (compiled encoder) map
+        self._schemas = {}
+
+        # Outbound rate limits (per stream and global), reserved when a batch is scheduled
+        self._rate_limiter = RateLimiter()
+
+        # Metadata of the last batches (always on), dumped on demand
+        self._flight_recorder = FlightRecorder(flight_recorder_size)
+
         # Retry with exponential backoff config
         # Retry max time
         if not isinstance(retry_max_time, int) or retry_max_time < 120:
-            self._logger.warning("Retry Max Time must be 120 or greater! Setting default: {}"
-                                 .format(config.RETRY_MAX_TIME))
+            self._logger.warning("Retry Max Time must be 120 or greater! Setting default: %s", config.RETRY_MAX_TIME)
             retry_max_time = config.RETRY_MAX_TIME
         self._retry_max_time = retry_max_time
 
         # Retry max count
         if not isinstance(retry_max_count, int) or retry_max_count < 1:
-            self._logger.warning("Retry Max Count must be 1 or greater! Setting default: {}"
-                                 .format(config.RETRY_MAX_COUNT))
+            self._logger.warning("Retry Max Count must be 1 or greater! Setting default: %s", config.RETRY_MAX_COUNT)
             retry_max_count = config.RETRY_MAX_COUNT
         self._retry_max_count = retry_max_count
 
         # Batch size
         if not isinstance(batch_size, int) or batch_size < 1 or batch_size > config.BATCH_SIZE_LIMIT:
-            self._logger.warning("Invalid Bulk size, must between 1 to {max}, setting it to {default}"
-                                 .format(max=config.BATCH_SIZE_LIMIT, default=config.BATCH_SIZE))
+            self._logger.warning("Invalid Bulk size, must between 1 to %s, setting it to %s",
+                                 config.BATCH_SIZE_LIMIT, config.BATCH_SIZE)
             batch_size = config.BATCH_SIZE
         self._batch_size = batch_size
 
@@ -134,16 +244,14 @@ class IronSourceAtomTracker:
         if not isinstance(batch_bytes_size, int) \
                 or batch_bytes_size < 1024 \
                 or batch_bytes_size > config.BATCH_BYTES_SIZE_LIMIT:
-            self._logger.warning("Invalid Bulk byte size, must between 1KB to {max}KB, setting it to {default}KB"
-                                 .format(max=config.BATCH_BYTES_SIZE_LIMIT / 1024,
-                                         default=config.BATCH_BYTES_SIZE / 1024))
+            self._logger.warning("Invalid Bulk byte size, must between 1KB to %sKB, setting it to %sKB",
+                                 config.BATCH_BYTES_SIZE_LIMIT / 1024, config.BATCH_BYTES_SIZE / 1024)
             batch_bytes_size = config.BATCH_BYTES_SIZE
         self._batch_bytes_size = batch_bytes_size
 
         # Flush Interval
         if not isinstance(flush_interval, int) or flush_interval < 1000:
-            self._logger.warning("Flush Interval must be 1000ms or greater! Setting default: {}"
-                                 .format(config.FLUSH_INTERVAL))
+            self._logger.warning("Flush Interval must be 1000ms or greater! Setting default: %s", config.FLUSH_INTERVAL)
             flush_interval = config.FLUSH_INTERVAL
         self._flush_interval = flush_interval
 
@@ -151,45 +259,239 @@ class IronSourceAtomTracker:
         self._event_backlog = event_backlog if event_backlog else QueueEventStorage(queue_size=backlog_size,
                                                                                     block=is_blocking,
                                                                                     timeout=backlog_timeout)
+        # Streams recovered from disk by a persistent backlog (HybridEventStorage) are sent with the default auth key
+        if hasattr(self._event_backlog, "get_streams"):
+            for stream in self._event_backlog.get_streams():
+                self._stream_keys[stream] = auth_key
 
         # Retry forever on server error (500) - When False and no callback is provided it may cause data loss
         self._retry_forever = retry_forever
 
+        # Buffer between backlog and batch pool
+        self._events_buffer = {}
+        # Dict to hold events size for every stream
+        self._events_buffer_bytes = {}
+
+        self._runtime = runtime
+        self._batch_worker_count = batch_worker_count
+        self._batch_pool_size = batch_pool_size
+        self._batch_worker_max_count = batch_worker_max_count
+        self._is_partitioned = is_partitioned
+        self._is_threadless = is_threadless
+        self._batch_event_pool = None
+        self._handler_thread = None
+        self._runtime_quota = runtime_quota
+        self._on_fork = on_fork
+        self._flight_recorder_signal = flight_recorder_signal
+        self._default_auth_key = auth_key
+        self._leftover_thread = None
+        # Threadless mode - shutdown spool files of a previous tracker, sent by the next flush_sync()
+        self._leftover_files = []
+        self._previous_signal_handlers = {}
+
+        # The threads, exit hooks and signal handlers are started on the first call (track, aggregate, flush),
+        # so short-lived processes that never track don't pay for them.
+        # Started right away when there are events to send: leftovers of a previous tracker or a persistent backlog
+        self._start_lock = Lock()
+        self._is_started = False
+        if self._stream_keys or (self._shutdown_spool is not None and self._shutdown_spool.list_files()):
+            self._start()
+
+    def _start(self):
+        """
+        Start the tracker threads (or attach to the runtime), the exit hooks and the signal handlers
+        """
+        with self._start_lock:
+            if self._is_started or self._is_stopped:
+                return
+
+            if self._runtime is not None:
+                # The handler, timer and sending workers of the shared runtime are used
+                self._runtime.attach(self, self._flush_interval, self._runtime_quota)
+            elif not self._is_threadless:
+                self._start_threads()
+
+            # Fork safety - the threads, locks and connection pools are re-created in a forked child process,
+            # right after the fork when supported (python 3.7+), else on the first call in the child
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=self.after_fork)
+
+            # Events left by a previous tracker - loaded in the background since the backlog may block
+            # (threadless mode: by the next flush_sync)
+            if self._shutdown_spool is not None and self._is_threadless:
+                self._leftover_files = self._shutdown_spool.list_files()
+            elif self._shutdown_spool is not None:
+                self._leftover_thread = Thread(target=self._load_leftovers,
+                                               args=(self._shutdown_spool.list_files(), self._default_auth_key))
+                self._leftover_thread.daemon = True
+                self._leftover_thread.start()
+
+            # Stop (with the default deadline) on interpreter exit
+            atexit.register(self.stop)
+
+            # Intercept exit signals - only from the main thread (signal.signal fails on other threads)
+            # and only when the application didn't set its own handler
+            if current_thread().name == "MainThread" and not self._is_threadless:
+                for sig in (signal.SIGTERM, signal.SIGINT):
+                    previous_handler = signal.getsignal(sig)
+                    if previous_handler in (signal.SIG_DFL, signal.default_int_handler) \
+                            or isinstance(getattr(previous_handler, "__self__", None), IronSourceAtomTracker):
+                        self._previous_signal_handlers[sig] = previous_handler
+                        signal.signal(sig, self._graceful_kill)
+                if self._flight_recorder_signal is not None:
+                    signal.signal(self._flight_recorder_signal, self._dump_flight_recorder_handler)
+            self._is_started = True
+
+    def _ensure_started(self):
+        """
+        Re-create the tracker after a fork, start it on the first call
+        """
+        if self._pid != os.getpid():
+            self.after_fork()
+        if not self._is_started:
+            self._start()
+
+    def _start_threads(self):
+        """
+        Start the BatchEventPool, handler and timer threads (when not attached to a SenderRuntime)
+        """
         # Holds batch of events for each stream and sends them using {thread_count} workers
-        self._batch_event_pool = BatchEventPool(thread_count=batch_worker_count,
-                                                max_events=batch_pool_size)
+        if self._is_partitioned:
+            self._batch_event_pool = PartitionedEventPool(lane_count=self._batch_worker_count,
+                                                          lane_size=self._batch_pool_size)
+        else:
+            self._batch_event_pool = BatchEventPool(thread_count=self._batch_worker_count,
+                                                    max_events=self._batch_pool_size,
+                                                    max_thread_count=self._batch_worker_max_count)
 
         # Start the handler thread - daemon since we want to exit even if it didn't stop yet
-        handler_thread = Thread(target=self._tracker_handler)
-        handler_thread.daemon = True
-        handler_thread.start()
+        self._handler_thread = Thread(target=self._tracker_handler)
+        self._handler_thread.daemon = True
+        self._handler_thread.start()
 
         # Start the thread that handles periodic flushing
         timer_thread = Thread(target=self._flush_peroidcly)
         timer_thread.daemon = True
         timer_thread.start()
 
-        # Intercept exit signals
-        signal.signal(signal.SIGTERM, self._graceful_kill)
-        signal.signal(signal.SIGINT, self._graceful_kill)
+    def after_fork(self):
+        """
+        Re-create the threads, locks and connection pools in a forked child process (pre-fork servers).
+        The events inherited from the parent process (backlog, batches and aggregated values) are discarded,
+        since the parent process sends them.
 
-    def stop(self):
+        Called automatically (right after the fork on python 3.7+, else on the first call in the child),
+        it can also be called from a post-fork hook of the server (e.g. gunicorn post_fork)
         """
-        Stop worker thread and event_pool thread's
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+
+        self._start_lock = Lock()
+        self._stop_lock = Lock()
+        self._data_lock = Lock()
+        self._wakeup = ThreadEvent()
+        self._stopping = ThreadEvent()
+        self._events_buffer = {}
+        self._events_buffer_bytes = {}
+        self._aggregator = Aggregator()
+        self._rate_limiter.after_fork()
+        self._error_logger.after_fork()
+        if hasattr(self._event_backlog, "after_fork"):
+            self._event_backlog.after_fork()
+        self._atom.after_fork()
+        if self._callback_dispatcher is not None:
+            self._callback_dispatcher.after_fork()
+        for spool in (self._dead_letter_spool, self._shutdown_spool):
+            if spool is not None:
+                spool.after_fork()
+        # The leftovers of the previous run are loaded by the parent process
+        self._leftover_thread = None
+        self._leftover_files = []
+
+        if self._is_started and not self._is_stopped and not self._is_threadless:
+            if self._runtime is not None:
+                self._runtime.after_fork()
+            else:
+                self._start_threads()
+
+        if callable(self._on_fork):
+            self._on_fork(self)
+
+    def stop(self, timeout=config.SHUTDOWN_TIMEOUT):
         """
-        self._logger.info("Flushing all data and killing the tracker in 5 seconds...")
-        self._flush_all = True
+        Stop the tracker - flush all the partial batches at once and send them with all the workers in parallel
+        until the deadline, events that are still unsent at the deadline are written to the shutdown spool
+        (when shutdown_spool_path is set, else passed to the callback)
+
+        :param timeout: Shutdown deadline in seconds (default: 5)
+        :type timeout: float
+        """
+        if self._pid != os.getpid():
+            self.after_fork()
+        with self._stop_lock:
+            if self._is_stopped:
+                return
+            self._is_stopped = True
+        if not self._is_started:
+            # Never started - nothing was tracked
+            return
+        if self._is_threadless:
+            self._logger.info("Flushing all data and stopping the tracker in %s seconds...", timeout)
+            deadline = time.time() + timeout
+            self._flush_sync(timeout)
+            self._join_callbacks(deadline)
+            self._logger.info("Tracker stopped")
+            return
+        deadline = time.time() + timeout
+        self._logger.info("Flushing all data and stopping the tracker in %s seconds...", timeout)
         self._alive = False
-        i = 0
-        while True:
-            # Check if everything is empty or 5 seconds has passed
-            if self._batch_event_pool.is_empty() and self._event_backlog.is_empty() or i == 5:
-                self._logger.warning("BatchPool and Backlog are empty or 5 seconds have passed, killing the tracker")
-                self._is_run_worker = False
-                self._batch_event_pool.stop()
-                break
-            i += 1
-            time.sleep(1)
+        self._is_run_worker = False
+        self._stopping.set()
+        if self._runtime is not None:
+            self._runtime.pause(self)
+        else:
+            self._wakeup.set()
+            self._handler_thread.join(max(0, deadline - time.time()))
+        self._buffer_aggregates(deadline)
+
+        # Move the whole backlog to batches and send all of them
+        for stream, auth_key in list(self._stream_keys.items()):
+            while True:
+                try:
+                    event_object = self._event_backlog.get_event(stream)
+                except Queue.Empty:
+                    break
+                if event_object is None:
+                    break
+                self._buffer_event(stream, auth_key, event_object.data, deadline)
+            self._submit_batch(stream, auth_key, deadline)
+
+        if self._runtime is not None:
+            is_done, not_started = self._runtime.detach(self, max(0, deadline - time.time()))
+        else:
+            is_done = self._batch_event_pool.join(max(0, deadline - time.time()))
+            not_started = self._batch_event_pool.stop()
+        if not is_done:
+            self._logger.warning("Shutdown deadline has passed, persisting the unsent events")
+        for task in not_started:
+            # Batches that were not started - functools.partial(self._flush_data, stream, auth_key, data)
+            stream, _, data = task.args
+            self._persist_leftover(stream, data, "Unsent on shutdown")
+        self._join_callbacks(deadline)
+        self._logger.info("Tracker stopped")
+
+    def _join_callbacks(self, deadline):
+        """
+        Wait until the queued error callbacks are called (is_callback_async), until the deadline
+
+        :param deadline: Unix time of the shutdown deadline
+        :type deadline: float
+        """
+        if self._callback_dispatcher is not None \
+                and not self._callback_dispatcher.join(max(0, deadline - time.time())):
+            self._logger.warning("Shutdown deadline has passed, %s error callbacks were not called",
+                                 self._callback_dispatcher.get_stats()["queued"])
 
     def set_debug(self, is_debug):  # pragma: no cover
         """
@@ -200,6 +502,7 @@ class IronSourceAtomTracker:
         """
         self._is_debug = is_debug if isinstance(is_debug, bool) else False
         self._logger = logger.get_logger(debug=self._is_debug)
+        self._error_logger.logger = self._logger
         self._atom.set_debug(self._is_debug)
 
     def track(self, stream, data, auth_key=""):
@@ -208,35 +511,403 @@ class IronSourceAtomTracker:
 
         :param stream: Atom stream name
         :type stream: str
-        :param data: Data to send (payload) (dict or string)
+        :param data: Data to send (payload) (dict or string, or tuple for a schema registered stream)
         :type data: object
         :param auth_key: HMAC auth key for stream
         :type auth_key: str
         """
+        self._ensure_started()
         if len(auth_key) == 0:
             auth_key = self._atom.get_auth()
 
+        # Sampled out events are dropped before they are serialized
+        data = self._sampler.sample(stream, data)
+        if data is None:
+            return
+
         if not isinstance(data, str):
+            schema = self._schemas.get(stream)
             try:
-                data = json.dumps(data)
-            except TypeError as e:
+                data = schema.encode(data) if schema is not None else json.dumps(data)
+            except (TypeError, ValueError) as e:
+                # Invalid events fail here, before they are batched
                 self._error_log(0, time.time(), 400, str(e), data, stream)
                 return
 
+        if self._is_threadless:
+            self._track_sync(stream, auth_key, data)
+            return
+
         with self._data_lock:
             if stream not in self._stream_keys:
                 self._stream_keys[stream] = auth_key
             try:
                 self._event_backlog.add_event(Event(stream, data))
                 self._debug_counter += 1
+                return
             except Queue.Full:
-                self._error_log(0, time.time(), 400, "Tracker backlog is full, can't enqueue events", data, stream)
+                pass
+        # Outside of the lock - the callback and the dead-letter spool may be slow
+        self._error_log(0, time.time(), 400, "Tracker backlog is full, can't enqueue events", data, stream)
+
+    def track_many(self, stream, records, auth_key=""):
+        """
+        Track many events at once - a list of dicts, a NumPy structured array or a dict of columns
+        (lists or NumPy arrays). Columnar records are encoded a column at a time (by the registered schema
+        of the stream, else by the inferred column types) and the events are split to batches that are
+        passed to the BatchEventPool directly, without going through the backlog (so they are not ordered
+        with the events of track())
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param records: Events
+        :type records: list(dict) | numpy.ndarray | dict
+        :param auth_key: HMAC auth key for stream
+        :type auth_key: str
+        """
+        self._ensure_started()
+        if len(auth_key) == 0:
+            auth_key = self._atom.get_auth()
+
+        try:
+            events = self._encode_records(stream, records)
+        except (TypeError, ValueError) as e:
+            # Invalid records fail here, before they are batched
+            self._error_log(0, time.time(), 400, str(e), records, stream)
+            return
+        if not events:
+            return
+
+        with self._data_lock:
+            if stream not in self._stream_keys:
+                self._stream_keys[stream] = auth_key
+            self._debug_counter += len(events)
+
+        batch = []
+        batch_bytes = 0
+        for data in events:
+            batch.append(data)
+            batch_bytes += len(data.encode("utf8"))
+            if batch_bytes >= self._batch_bytes_size or len(batch) >= self._batch_size:
+                if self._is_threadless:
+                    self._make_batch_task(stream, auth_key, batch, batch_bytes,
+                                          time.time() + config.THREADLESS_SEND_TIMEOUT)()
+                else:
+                    self._submit_task(stream, self._make_batch_task(stream, auth_key, batch, batch_bytes))
+                batch = []
+                batch_bytes = 0
+        if not batch:
+            return
+
+        if self._is_threadless:
+            # The rest waits in the stream batch for the next track() or flush_sync()
+            with self._data_lock:
+                self._events_buffer.setdefault(stream, []).extend(batch)
+                self._events_buffer_bytes[stream] = self._events_buffer_bytes.get(stream, 0) + batch_bytes
+                task = None
+                if self._events_buffer_bytes[stream] >= self._batch_bytes_size \
+                        or len(self._events_buffer[stream]) >= self._batch_size:
+                    task = self._take_batch(stream, self._stream_keys[stream],
+                                            time.time() + config.THREADLESS_SEND_TIMEOUT)
+            if task is not None:
+                task()
+            return
+        self._submit_task(stream, self._make_batch_task(stream, auth_key, batch, batch_bytes))
+
+    def _encode_records(self, stream, records):
+        """
+        Sample and encode the records of track_many
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param records: Events
+        :type records: list(dict) | numpy.ndarray | dict
+        :return: JSON string of every (kept) event
+        :rtype: list(str)
+        """
+        schema = self._schemas.get(stream)
+        columns = to_columns(records)
+        is_sampled = self._sampler.get_sampling(stream)[0] != 1
+        if columns is not None and not is_sampled:
+            names, columns, count = columns
+            if schema is None:
+                schema = Schema([(name, infer_field_type(column)) for name, column in zip(names, columns)])
+            return schema.encode_columns(names, columns, count)
+
+        if columns is not None:
+            # Sampled stream - the rows are sampled one by one
+            names, columns, count = columns
+            records = [dict(zip(names, row)) for row in zip(*columns)]
+        elif not isinstance(records, (list, tuple)):
+            raise TypeError("Records have to be a list of dicts, a NumPy structured array or a dict of columns, "
+                            "got: {}".format(type(records).__name__))
+        encode = schema.encode if schema is not None else json.dumps
+        events = []
+        for data in records:
+            data = self._sampler.sample(stream, data)
+            if data is not None:
+                events.append(data if isinstance(data, str) else encode(data))
+        return events
+
+    def track_values(self, stream, *values, **kwargs):
+        """
+        Track event of a schema registered stream (see register_schema) by its values
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param values: Field values in the schema order
+        :param auth_key: Optional (keyword), HMAC auth key for stream
+        :type auth_key: str
+        """
+        self.track(stream, values, kwargs.get("auth_key", ""))
+
+    def register_schema(self, stream, fields):
+        """
+        Register the fixed schema of a stream - its events are encoded by a specialized encoder and validated
+        on track(), which also accepts tuples (values in the schema order) for this stream
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param fields: Ordered list of (field name, field type), types: int, float, bool, str, object
+        :type fields: list(tuple(str, type))
+        """
+        schemas = dict(self._schemas)
+        schemas[stream] = Schema(fields)
+        self._schemas = schemas
+
+    def set_rate_limit(self, stream=None, events_per_second=None, bytes_per_second=None,
+                       burst_seconds=config.RATE_LIMIT_BURST_SECONDS):
+        """
+        Limit the outbound rate of a stream, or of all the streams together (can be changed at runtime),
+        the batches are sent at a smooth rate (token buckets) after a burst allowance
+
+        :param stream: Optional, Atom stream name (default: global limits of all the streams)
+        :type stream: str
+        :param events_per_second: Optional, max events per second (None removes the limit)
+        :type events_per_second: float
+        :param bytes_per_second: Optional, max bytes per second (None removes the limit)
+        :type bytes_per_second: float
+        :param burst_seconds: Optional, burst allowance in seconds of the rate (default: 1)
+        :type burst_seconds: float
+        """
+        self._rate_limiter.set_limit(stream, events_per_second, bytes_per_second, burst_seconds)
+
+    def get_batch_pool_stats(self):
+        """
+        Get the BatchEventPool metrics (when not attached to a SenderRuntime)
+
+        :return: Number of workers, busy workers, queued batches and the average queue wait time in seconds
+        :rtype: dict
+        """
+        return self._batch_event_pool.get_stats() if self._batch_event_pool is not None else {}
+
+    def get_rate_limit_stats(self):
+        """
+        Get the rate limit metrics
+
+        :return: Number of throttled batches and time in seconds spent throttled (total and per stream)
+        :rtype: dict
+        """
+        return self._rate_limiter.get_stats()
+
+    def get_callback_stats(self):
+        """
+        Get the error callback dispatcher metrics (is_callback_async)
+
+        :return: Number of queued, called, dropped and coalesced callbacks,
+                 and the lag in seconds from the error to its callback (average and max)
+        :rtype: dict
+        """
+        return self._callback_dispatcher.get_stats() if self._callback_dispatcher is not None else {}
+
+    def dump_flight_recorder(self):
+        """
+        Dump the flight recorder - metadata of the last batches (stream, count, bytes, enqueue/send/ack time,
+        state, HTTP status, attempt and endpoint), oldest first
+
+        :return: JSON array of the batch records
+        :rtype: str
+        """
+        return self._flight_recorder.dump()
+
+    def set_sampling(self, stream, rate, key_field=None):
+        """
+        Sample the events of a stream (can be changed at runtime), the rate is recorded in the kept events
+        (dict data) at the "_sample_rate" field
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param rate: Fraction of the events to keep, between 0 and 1 (1 disables sampling)
+        :type rate: float
+        :param key_field: Optional, keep all or none of the events by the hash of this field (e.g. user id),
+                          default: random sampling
+        :type key_field: str
+        """
+        self._sampler.set_sampling(stream, rate, key_field)
+
+    def aggregate(self, stream, key, value=1, kind="counter", auth_key=""):
+        """
+        Aggregate a metric-like value in memory, one summary event per key is tracked every flush interval
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param key: Metric name
+        :type key: str
+        :param value: The value (default: 1)
+        :type value: int | float
+        :param kind: counter (total), sum (count and total) or histogram (count, sum, min, max, quantiles and buckets)
+        :type kind: str
+        :param auth_key: HMAC auth key for stream
+        :type auth_key: str
+        """
+        self._ensure_started()
+        self._aggregator.add(stream, key, value, kind)
+        with self._data_lock:
+            if stream not in self._stream_keys:
+                self._stream_keys[stream] = auth_key if len(auth_key) > 0 else self._atom.get_auth()
 
     def flush(self):
         """
-        Flush data from all streams
+        Flush data from all streams (threadless mode: same as flush_sync with the default deadline)
         """
+        self._ensure_started()
+        if self._is_threadless:
+            self.flush_sync()
+            return
         self._flush_all = True
+        self._wakeup.set()
+        if self._runtime is not None:
+            self._runtime.wakeup()
+
+    def flush_sync(self, timeout=config.SHUTDOWN_TIMEOUT):
+        """
+        Threadless mode - send all the partial batches concurrently and return by the deadline
+        (e.g. at the end of every serverless invocation), batches that are still unsent at the deadline
+        are written to the shutdown spool (when shutdown_spool_path is set, else passed to the callback).
+
+        NOTE: a request that was sent keeps running after the deadline, set request_timeout accordingly
+
+        :param timeout: Deadline in seconds (default: 5)
+        :type timeout: float
+        :return: True if all the batches were sent by the deadline (False when a batch failed or was persisted)
+        :rtype: bool
+        """
+        if not self._is_threadless:
+            raise Exception("flush_sync() is only supported by a threadless tracker (is_threadless=True)")
+        self._ensure_started()
+        return self._flush_sync(timeout)
+
+    def _flush_sync(self, timeout):
+        deadline = time.time() + timeout
+        self._flush_aggregates()
+        leftovers = []
+        for spool_file in self._leftover_files:
+            try:
+                leftovers.extend(self._read_spool_file(spool_file))
+                os.remove(spool_file)
+            except (IOError, OSError, KeyError, ValueError) as e:
+                self._logger.error("Failed to load the shutdown spool file %s: %s", spool_file, e)
+        self._leftover_files = []
+
+        tasks = []
+        with self._data_lock:
+            # Leftovers of a previous tracker and the events in the backlog (recovered by a persistent backlog)
+            for stream, events in leftovers:
+                auth_key = self._stream_keys.setdefault(stream, self._default_auth_key)
+                for data in events:
+                    tasks.append(self._buffer_event_sync(stream, auth_key, data, deadline))
+            for stream, auth_key in list(self._stream_keys.items()):
+                while True:
+                    try:
+                        event_object = self._event_backlog.get_event(stream)
+                    except Queue.Empty:
+                        break
+                    if event_object is None:
+                        break
+                    tasks.append(self._buffer_event_sync(stream, auth_key, event_object.data, deadline))
+                tasks.append(self._take_batch(stream, auth_key, deadline))
+        tasks = [task for task in tasks if task is not None]
+        if not tasks:
+            return True
+
+        # Workers of this call only, nothing is left running between the calls (except requests past the deadline)
+        pool = BatchEventPool(thread_count=min(self._batch_worker_count, len(tasks)), max_events=len(tasks))
+        try:
+            for task in tasks:
+                pool.add_event(task)
+            is_done = pool.join(max(0, deadline - time.time()))
+        finally:
+            not_started = pool.stop()
+        for task in not_started:
+            stream, _, data = task.args
+            task.keywords["record"]["state"] = "persisted"
+            self._persist_leftover(stream, data, "Unsent at the flush_sync deadline")
+        # Batches that failed, or were persisted since their retry would pass the deadline, are not sent
+        return is_done and all(task.keywords["record"]["state"] == "sent" for task in tasks)
+
+    def _track_sync(self, stream, auth_key, data):
+        """
+        Threadless mode - add an event to the stream batch, a full batch is sent by the calling thread
+        (retried until config.THREADLESS_SEND_TIMEOUT, then persisted)
+        """
+        with self._data_lock:
+            if stream not in self._stream_keys:
+                self._stream_keys[stream] = auth_key
+            task = self._buffer_event_sync(stream, self._stream_keys[stream], data,
+                                           time.time() + config.THREADLESS_SEND_TIMEOUT)
+        if task is not None:
+            task()
+
+    def _buffer_event_sync(self, stream, auth_key, data, deadline):
+        """
+        Threadless mode - add an event to the stream batch (with the data lock held)
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param auth_key: HMAC auth key for stream
+        :type auth_key: str
+        :param data: Event data
+        :type data: str
+        :param deadline: Unix time to give up sending the batch
+        :type deadline: float
+        :return: The sending task of the batch once it is full, else None
+        :rtype: functools.partial
+        """
+        events = self._events_buffer.setdefault(stream, [])
+        events.append(data)
+        self._events_buffer_bytes[stream] = self._events_buffer_bytes.get(stream, 0) + len(data.encode("utf8"))
+        if self._events_buffer_bytes[stream] >= self._batch_bytes_size or len(events) >= self._batch_size:
+            return self._take_batch(stream, auth_key, deadline)
+        return None
+
+    def _flush_aggregates(self):
+        """
+        Track the summaries of the aggregated values of the current window
+        """
+        if self._aggregator.is_empty():
+            return
+        for stream, summary in self._aggregator.flush():
+            self.track(stream, summary, self._stream_keys.get(stream, ""))
+
+    def _buffer_aggregates(self, deadline):
+        """
+        Stop - add the summaries of the aggregated values straight to the stream batches
+        (not with track(), which takes the tracker lock)
+
+        :param deadline: Unix time of the shutdown deadline
+        :type deadline: float
+        """
+        if self._aggregator.is_empty():
+            return
+        for stream, summary in self._aggregator.flush():
+            auth_key = self._stream_keys.setdefault(stream, self._atom.get_auth())
+            schema = self._schemas.get(stream)
+            try:
+                data = schema.encode(summary) if schema is not None else json.dumps(summary)
+            except (TypeError, ValueError) as e:
+                self._error_log(0, time.time(), 400, str(e), summary, stream)
+                continue
+            self._buffer_event(stream, auth_key, data, deadline)
 
     def _flush_peroidcly(self):
         """
@@ -254,125 +925,337 @@ class IronSourceAtomTracker:
             next_call += self._flush_interval / 1000
             # This part is here only for better debugging
             if i % 2 == 0:
-                self._logger.debug("Flushing In {} Seconds".format(next_call - time.time()))
+                self._logger.debug("Flushing In %s Seconds", next_call - time.time())
             i += 1
             try:
                 time.sleep(next_call - time.time())
-                self.flush()
+                self._on_flush_interval()
             except (IOError, ValueError) as e:
                 # Can happen after sleep
-                self._logger.error("Timer error: {}".format(str(e.args)))
+                self._logger.error("Timer error: %s", e.args)
                 next_call = time.time()
 
+    def _on_flush_interval(self):
+        """
+        Periodic flush - track the aggregated values and flush all the streams
+        """
+        self._flush_aggregates()
+        self.flush()
+
     def _tracker_handler(self):
         """
         Main tracker function, handles flushing based on given conditions
         """
-        # Buffer between backlog and batch pool
-        events_buffer = {}
-        # Dict to hold events size for every stream
-        batch_bytes_size = {}
         self._logger.info("Tracker Handler Started")
 
-        def flush_data(stream, auth_key):
-            # This 'if' is needed for the flush_all case
-            if stream in events_buffer and len(events_buffer[stream]) > 0:
-                temp_buffer = list(events_buffer[stream])
-                del events_buffer[stream][:]
-                batch_bytes_size[stream] = 0
-                self._batch_event_pool.add_event(lambda: self._flush_data(stream, auth_key, temp_buffer))
-
         while self._is_run_worker:
             if self._event_backlog.is_empty():
-                time.sleep(2)
+                self._wakeup.wait(2)
+                self._wakeup.clear()
+                if not self._is_run_worker:
+                    break
+            self._handler_step()
+        self._logger.info("Tracker handler stopped")
 
-            if self._flush_all:
-                for stream_name, stream_key in self._stream_keys.items():
-                    flush_data(stream_name, stream_key)
-                if self._alive:
-                    self._flush_all = False
-            else:
-                for stream_name, stream_key in self._stream_keys.items():
-                    # Get one event from the backlog
-                    try:
-                        event_object = self._event_backlog.get_event(stream_name)
-                    except Queue.Empty:
-                        continue
+    def _handler_step(self):
+        """
+        A single handler round (also run by a shared SenderRuntime): flush all the streams when requested,
+        else move one event of every stream from the backlog to its batch
 
-                    if event_object is None:
-                        continue
+        :return: True if events were moved
+        :rtype: bool
+        """
+        if self._flush_all:
+            for stream_name, stream_key in list(self._stream_keys.items()):
+                self._submit_batch(stream_name, stream_key)
+            if self._alive:
+                self._flush_all = False
+            return False
+
+        has_events = False
+        # Only the streams with events in the backlog, when the backlog keeps a ready index
+        ready_streams = self._event_backlog.get_ready_streams() \
+            if hasattr(self._event_backlog, "get_ready_streams") else None
+        if ready_streams is None:
+            stream_items = list(self._stream_keys.items())
+        else:
+            stream_items = [(stream, self._stream_keys[stream]) for stream in ready_streams
+                            if stream in self._stream_keys]
+        for stream_name, stream_key in stream_items:
+            # Get one event from the backlog
+            try:
+                event_object = self._event_backlog.get_event(stream_name)
+            except Queue.Empty:
+                continue
 
-                    if stream_name not in batch_bytes_size:
-                        batch_bytes_size[stream_name] = 0
+            if event_object is None:
+                continue
 
-                    if stream_name not in events_buffer:
-                        events_buffer[stream_name] = []
-                    batch_bytes_size[stream_name] += len(event_object.data.encode("utf8"))
-                    events_buffer[stream_name].append(event_object.data)
+            has_events = True
+            self._buffer_event(stream_name, stream_key, event_object.data)
+        return has_events
 
-                    if batch_bytes_size[stream_name] >= self._batch_bytes_size:
-                        flush_data(stream_name, auth_key=stream_key)
+    def _buffer_event(self, stream, auth_key, data, deadline=None):
+        """
+        Add an event to the stream batch, the batch is submitted once it is full
 
-                    if len(events_buffer[stream_name]) >= self._batch_size:
-                        flush_data(stream_name, auth_key=stream_key)
-        self._logger.info("Tracker handler stopped")
+        :param stream: Atom stream name
+        :type stream: str
+        :param auth_key: HMAC auth key for stream
+        :type auth_key: str
+        :param data: Event data
+        :type data: str
+        :param deadline: Optional, unix time to give up waiting for the batch pool (default: block)
+        :type deadline: float
+        """
+        events = self._events_buffer.setdefault(stream, [])
+        events.append(data)
+        self._events_buffer_bytes[stream] = self._events_buffer_bytes.get(stream, 0) + len(data.encode("utf8"))
+
+        if self._events_buffer_bytes[stream] >= self._batch_bytes_size or len(events) >= self._batch_size:
+            self._submit_batch(stream, auth_key, deadline)
 
-    def _flush_data(self, stream, auth_key, data):
+    def _submit_batch(self, stream, auth_key, deadline=None):
+        """
+        Pass the stream batch to the BatchEventPool
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param auth_key: HMAC auth key for stream
+        :type auth_key: str
+        :param deadline: Optional, unix time to give up waiting for the batch pool (default: block)
+        :type deadline: float
+        """
+        task = self._take_batch(stream, auth_key)
+        # This 'if' is needed for the flush_all case
+        if task is None:
+            return
+        self._submit_task(stream, task, deadline)
+
+    def _submit_task(self, stream, task, deadline=None):
+        """
+        Pass a batch sending task to the BatchEventPool (or the runtime)
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param task: functools.partial(self._flush_data, stream, auth_key, events, ...)
+        :type task: functools.partial
+        :param deadline: Optional, unix time to give up waiting for the batch pool (default: block)
+        :type deadline: float
+        """
+        if self._runtime is not None:
+            self._runtime.submit(self, task)
+            return
+        if deadline is None:
+            self._batch_event_pool.add_event(task, key=stream)
+            return
+        try:
+            self._batch_event_pool.add_event(task, timeout=max(0.001, deadline - time.time()), key=stream)
+        except Queue.Full:
+            task.keywords["record"]["state"] = "persisted"
+            self._persist_leftover(stream, task.args[2], "Unsent on shutdown")
+
+    def _take_batch(self, stream, auth_key, deadline=None):
+        """
+        Take the stream batch as a sending task
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param auth_key: HMAC auth key for stream
+        :type auth_key: str
+        :param deadline: Optional, unix time to give up sending (threadless flush_sync)
+        :type deadline: float
+        :return: functools.partial(self._flush_data, stream, auth_key, events, ...), None if the batch is empty
+        :rtype: functools.partial
+        """
+        events = self._events_buffer.get(stream)
+        if not events:
+            return None
+        bytes_size = self._events_buffer_bytes[stream]
+        self._events_buffer[stream] = []
+        self._events_buffer_bytes[stream] = 0
+        return self._make_batch_task(stream, auth_key, events, bytes_size, deadline)
+
+    def _make_batch_task(self, stream, auth_key, events, bytes_size, deadline=None):
+        """
+        Make the sending task of a batch - reserves the rate limit and records the batch
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param auth_key: HMAC auth key for stream
+        :type auth_key: str
+        :param events: Events data
+        :type events: list(str)
+        :param bytes_size: Size in bytes of the events
+        :type bytes_size: int
+        :param deadline: Optional, unix time to give up sending (threadless flush_sync)
+        :type deadline: float
+        :rtype: functools.partial
+        """
+        # The worker waits for the rate limit before sending, the pool and backlog fill up meanwhile
+        not_before = time.time() + self._rate_limiter.reserve(stream, len(events), bytes_size)
+        record = self._flight_recorder.record(stream, len(events), bytes_size)
+        return functools.partial(self._flush_data, stream, auth_key, events, not_before=not_before, record=record,
+                                 deadline=deadline)
+
+    def _persist_leftover(self, stream, data, error_msg):
+        """
+        Write events that couldn't be sent before the shutdown to the shutdown spool
+        (or pass them to the callback / dead-letter spool when there is no shutdown spool)
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param data: Events data
+        :type data: list(str)
+        :param error_msg: Reason
+        :type error_msg: str
+        """
+        if self._shutdown_spool is None:
+            self._error_log(0, time.time(), 500, error_msg, data, stream)
+            return
+        try:
+            self._shutdown_spool.write(stream, None, error_msg, data)
+        except (IOError, OSError, TypeError, ValueError) as e:
+            self._error_logger.error("shutdown_spool", "Failed to write to the shutdown spool: %s", e)
+            self._error_log(0, time.time(), 500, error_msg, data, stream)
+
+    def _load_leftovers(self, spool_files, auth_key):
+        """
+        Move the events left by a previous tracker (in the shutdown spool) to the backlog
+
+        :param spool_files: Shutdown spool files, oldest first
+        :type spool_files: list(str)
+        :param auth_key: Default auth key (the auth keys are not written to disk)
+        :type auth_key: str
+        """
+        for spool_file in spool_files:
+            try:
+                for stream, events in self._read_spool_file(spool_file):
+                    with self._data_lock:
+                        if stream not in self._stream_keys:
+                            self._stream_keys[stream] = auth_key
+                    for data in events:
+                        self._event_backlog.add_event(Event(stream, data))
+                os.remove(spool_file)
+            except (IOError, OSError, KeyError, ValueError, Queue.Full) as e:
+                self._logger.error("Failed to load the shutdown spool file %s: %s", spool_file, e)
+
+    @staticmethod
+    def _read_spool_file(spool_file):
+        """
+        Read a shutdown spool file
+
+        :param spool_file: Shutdown spool file
+        :type spool_file: str
+        :return: (stream, events data) of every record
+        :rtype: list(tuple(str, list(str)))
+        """
+        with open(spool_file, "rb") as leftover_file:
+            records = [json.loads(line.decode("utf-8")) for line in leftover_file]
+        return [(record["stream"], record["data"]) for record in records]
+
+    def _flush_data(self, stream, auth_key, data, not_before=0, record=None, deadline=None):
         """
         Send data to server using IronSource Atom Low-level API
 
-        NOTE: this function is passed a lambda to the BatchEventPool so it might continue running if it was
+        NOTE: this function is passed (functools.partial) to the BatchEventPool so it might continue running if it was
         triggered already even after a graceful killing for at least (retry_max_count) times
+
+        :param not_before: Optional, unix time to send the data at (rate limit)
+        :type not_before: float
+        :param record: Optional, flight recorder record of the batch
+        :type record: dict
+        :param deadline: Optional, unix time to give up sending - the batch is persisted instead of waiting past it
+        :type deadline: float
         """
         attempt = 1
+        if record is None:
+            record = {}
+
+        wait = not_before - time.time()
+        while wait > 0:
+            # Rate limited batches are persisted for the next start instead of delaying the shutdown
+            if not self._is_run_worker or (deadline is not None and not_before > deadline):
+                record["state"] = "persisted"
+                self._persist_leftover(stream, data, "Rate limited while on graceful shutdown")
+                return
+            time.sleep(min(wait, 1))
+            wait = not_before - time.time()
+
+        # Serialized and signed once, the same request is resent on every retry
+        is_streaming = sum(len(event) for event in data) >= config.STREAMING_BODY_MIN_SIZE
+        try:
+            prepared_request = self._atom.prepare_events(stream, data=data, auth_key=auth_key, streaming=is_streaming)
+        except Exception as e:
+            record["state"] = "failed"
+            self._error_log(attempt, time.time(), 400, str(e), data, stream)
+            return
+        record["bytes"] = prepared_request.size
+        # Only the encoded copy is kept while retrying, the events are decoded back for error reporting
+        del data[:]
 
         while True:
+            record["state"] = "sending"
+            record["attempt"] = attempt
+            record["send_time"] = time.time()
             try:
-                response = self._atom.put_events(stream, data=data, auth_key=auth_key)
+                response = self._atom.put_prepared(prepared_request)
             except Exception as e:
-                self._error_log(attempt, time.time(), 400, str(e), data, stream)
+                record["state"] = "failed"
+                self._error_log(attempt, time.time(), 400, str(e), prepared_request.get_events(), stream)
                 return
+            record["ack_time"] = time.time()
+            record["status"] = response.status
+            record["endpoint"] = getattr(response, "endpoint", None)
 
             # Response on first try
             if attempt == 1:
-                self._logger.debug('Got Status: {}; Data: {}'.format(str(response.status), str(data)))
+                self._logger.debug("Got Status: %s; Stream: %s; Events: %s; Bytes: %s",
+                                   response.status, stream, prepared_request.count, prepared_request.size)
 
             # Status 200 - OK or 400 - Client Error
             if 200 <= response.status < 500:
+                record["state"] = "sent" if response.status < 400 else "failed"
                 if 200 <= response.status < 400:
                     if self._debug_counter >= 1000:
-                        self._logger.info('Tracked 1000 events to Atom')
-                        self._logger.info('Status: {}; Response: {}; Error: {}'.format(str(response.status),
-                                                                                       str(response.data),
-                                                                                       str(response.error)))
+                        self._logger.info("Tracked 1000 events to Atom")
+                        self._logger.info("Status: %s; Response: %s; Error: %s",
+                                          response.status, response.data, response.error)
                         self._debug_counter = 0
                 else:
                     # 400
-                    self._error_log(attempt, time.time(), response.status, response.error, data, stream)
+                    self._error_log(attempt, time.time(), response.status, response.error,
+                                    prepared_request.get_events(), stream)
                 return
 
             # Server Error >= 500:
             # This should run forever (when we get a 500) unless retry_forever is False
             # In this case we call error_log() function and data will be lost (you can save it with the callback)
             if not self._retry_forever and attempt == self._retry_max_count:
-                self._error_log(attempt, time.time(), 500, "Retry Max Count has been reached, discarding data", data,
-                                stream)
-                break
-            # In Case we are in a graceful shutdown and we get a 500 > Call the error_log func
-            if not self._is_run_worker:
-                self._error_log(attempt, time.time(), 500, "Server error while on graceful shutdown", data,
-                                stream)
+                record["state"] = "failed"
+                self._error_log(attempt, time.time(), 500, "Retry Max Count has been reached, discarding data",
+                                prepared_request.get_events(), stream)
                 break
             # Retry with exponential backoff
             duration = self._get_duration(attempt)
-            self._logger.warn(
-                "Got code: {status} from server, error: {error}. stream: {stream}, retry duration: {duration}".format(
-                    status=response.status,
-                    error=response.error,
-                    stream=stream,
-                    duration=duration))
+            # In Case we are in a graceful shutdown (or the retry is past the deadline) and we get a 500
+            # > Persist the events for the next start
+            if not self._is_run_worker or (deadline is not None and time.time() + duration > deadline):
+                record["state"] = "persisted"
+                self._persist_leftover(stream, prepared_request.get_events(), "Server error while on graceful shutdown")
+                break
+            self._error_logger.warning((stream, response.status),
+                                       "Got code: %s from server, error: %s. stream: %s, retry duration: %s",
+                                       response.status, response.error, stream, duration,
+                                       extra={"atom_stream": stream, "atom_status": response.status,
+                                              "atom_attempt": attempt})
+            record["state"] = "retrying"
             attempt += 1
-            time.sleep(duration)
+            # Interrupted by stop()
+            if self._stopping.wait(duration) or not self._is_run_worker:
+                record["state"] = "persisted"
+                self._persist_leftover(stream, prepared_request.get_events(), "Server error while on graceful shutdown")
+                break
 
     def _get_duration(self, attempt):
         """
@@ -392,10 +1275,33 @@ class IronSourceAtomTracker:
         :param sig: integer
         :type sig: OS signal number
         """
-        self._logger.info('Intercepted signal %s' % sig)
-        if not self._is_run_worker:
-            return
-        self.stop()
+        self._logger.info("Intercepted signal %s", sig)
+        if not self._is_stopped:
+            # Stopped by a thread that doesn't wait for this one - the signal may interrupt the main thread
+            # inside track() with the tracker lock held (e.g. blocked on a full backlog)
+            stopper = Thread(target=self.stop)
+            stopper.daemon = True
+            stopper.start()
+            stopper.join(config.SHUTDOWN_TIMEOUT + 1)
+
+        # Chain to the previous handler (another tracker, or the default behavior of the signal)
+        previous_handler = self._previous_signal_handlers.get(sig, signal.SIG_DFL)
+        if callable(previous_handler):
+            previous_handler(sig, frame)
+        else:
+            signal.signal(sig, signal.SIG_DFL)
+            os.kill(os.getpid(), sig)
+
+    def _dump_flight_recorder_handler(self, sig, frame):
+        """
+        Flight recorder signal handler - writes the dump to stderr
+        :param frame: current stack frame
+        :type frame: frame
+        :param sig: integer
+        :type sig: OS signal number
+        """
+        sys.stderr.write(self.dump_flight_recorder() + "\n")
+        sys.stderr.flush()
 
     def _error_log(self, attempt, unix_time=None, status=None, error_msg=None, sent_data=None, stream=None):
         """
@@ -413,12 +1319,21 @@ class IronSourceAtomTracker:
         :param stream: Atom Stream name
         :type stream: str
         """
-        try:
-            self._callback(unix_time, status, error_msg, sent_data, stream)
-        except TypeError as e:
-            self._logger.error('Wrong arguments given to callback function: {}'.format(e))
-
-        self._logger.error("Error: {}; Status: {}; Attempt: {}; For Data: {:.50}...".format(error_msg,
-                                                                                            status,
-                                                                                            attempt,
-                                                                                            sent_data))
+        if self._callback_dispatcher is not None:
+            if not self._callback_dispatcher.dispatch(unix_time, status, error_msg, sent_data, stream):
+                self._error_logger.error("callback_queue", "Error callback queue is full, dropping the callback")
+        else:
+            try:
+                self._callback(unix_time, status, error_msg, sent_data, stream)
+            except TypeError as e:
+                self._error_logger.error("callback", "Wrong arguments given to callback function: %s", e)
+
+        if self._dead_letter_spool is not None:
+            try:
+                self._dead_letter_spool.write(stream, status, error_msg, sent_data, unix_time)
+            except (IOError, OSError, TypeError, ValueError) as e:
+                self._error_logger.error("dead_letter_spool", "Failed to write to the dead-letter spool: %s", e)
+
+        self._error_logger.error((stream, status), "Error: %s; Stream: %s; Status: %s; Attempt: %s; For Data: %s",
+                                 error_msg, stream, status, attempt, logger.DataPreview(sent_data),
+                                 extra={"atom_stream": stream, "atom_status": status, "atom_attempt": attempt})
@@ -0,0 +1,300 @@
+"""
+Load JSON-lines files to an Atom stream:
+
+    python -m ironsource.atom.load --stream STREAM --auth-key KEY --workers 8 events-1.json events-2.json
+"""
+import os
+import sys
+import mmap
+import time
+import random
+import argparse
+from threading import Lock
+from threading import Thread
+
+try:
+    # python 3
+    from queue import Queue
+except ImportError:
+    # python 2
+    from Queue import Queue
+
+from ironsource.atom.ironsource_atom import IronSourceAtom
+from ironsource.atom.transport import RequestsTransport, HttpClientTransport
+from ironsource.atom.dead_letter_spool import DeadLetterSpool
+from ironsource.atom.checkpoint import Checkpoint
+import ironsource.atom.atom_logger as logger
+import ironsource.atom.config as config
+
+
+class BulkLoader:
+    """
+        Bulk file loader - slices memory-mapped JSON-lines files into bulks (without decoding the events)
+        and sends them to Atom with several workers, checkpointing the byte offset of every file
+    """
+
+    def __init__(self, atom, stream, checkpoint_path, auth_key="",
+                 endpoint=None,
+                 worker_count=config.LOAD_WORKER_COUNT,
+                 bulk_size=config.BATCH_SIZE_LIMIT,
+                 bulk_bytes_size=config.BATCH_BYTES_SIZE_LIMIT,
+                 retry_max_count=config.RETRY_MAX_COUNT,
+                 dead_letter_path=None,
+                 report_interval=config.LOAD_REPORT_INTERVAL):
+        """
+        :param atom: Atom low level API object
+        :type atom: IronSourceAtom
+        :param stream: Atom stream name
+        :type stream: str
+        :param checkpoint_path: Checkpoint file path
+        :type checkpoint_path: str
+        :param auth_key: Optional, Hmac auth key (the Atom object default is used if empty)
+        :type auth_key: str
+        :param endpoint: Deprecated, ignored - the bulks are sent to the endpoints of the atom
+                         (with its failover and request_timeout)
+        :type endpoint: str
+        :param worker_count: Optional, Number of bulks sent in parallel
+        :type worker_count: int
+        :param bulk_size: Optional, Max number of events in every bulk
+        :type bulk_size: int
+        :param bulk_bytes_size: Optional, Max size of every bulk in bytes
+        :type bulk_bytes_size: int
+        :param retry_max_count: Optional, Max number of attempts on server error
+        :type retry_max_count: int
+        :param dead_letter_path: Optional, directory of the dead-letter spool for bulks that failed to be sent
+        :type dead_letter_path: str
+        :param report_interval: Optional, Throughput report interval in seconds
+        :type report_interval: float
+        """
+        self._atom = atom
+        self._stream = stream
+        self._auth_key = auth_key if auth_key else atom.get_auth()
+        self._worker_count = worker_count
+        self._bulk_size = bulk_size
+        self._bulk_bytes_size = bulk_bytes_size
+        self._retry_max_count = retry_max_count
+        self._report_interval = report_interval
+        self._logger = logger.get_logger()
+
+        self._checkpoint = Checkpoint(checkpoint_path)
+        self._dead_letter_spool = DeadLetterSpool(dead_letter_path) if dead_letter_path else None
+        self._queue = Queue(maxsize=worker_count * 2)
+
+        self._counters_lock = Lock()
+        self._sent_events = 0
+        self._sent_bytes = 0
+        self._failed_events = 0
+        self._start_time = 0
+        self._last_report = 0
+
+    def load(self, paths):
+        """
+        Load files to Atom, every file is resumed from its checkpoint
+
+        :param paths: JSON-lines files paths
+        :type paths: list(str)
+        :return: Number of sent events and number of failed events
+        :rtype: tuple(int, int)
+        """
+        self._start_time = self._last_report = time.time()
+
+        workers = []
+        for index in range(0, self._worker_count):
+            worker = Thread(target=self._worker)
+            worker.daemon = True
+            workers.append(worker)
+            worker.start()
+
+        for path in paths:
+            self._load_file(os.path.abspath(path))
+
+        for worker in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join()
+
+        self._checkpoint.save()
+        self._report()
+        return self._sent_events, self._failed_events
+
+    def _load_file(self, path):
+        """
+        Slice a file into bulks and queue them, starting at its checkpoint
+
+        :param path: JSON-lines file path
+        :type path: str
+        """
+        offset = self._checkpoint.get_offset(path)
+        size = os.path.getsize(path)
+        if offset >= size:
+            self._logger.info("Skipping {}, already loaded".format(path))
+            return
+
+        with open(path, "rb") as input_file:
+            input_map = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                while offset < size:
+                    end, bulk = self._slice(input_map, offset, size)
+                    self._queue.put((path, offset, end, bulk))
+                    offset = end
+
+                    if time.time() - self._last_report >= self._report_interval:
+                        self._report()
+            finally:
+                input_map.close()
+
+    def _slice(self, input_map, start, size):
+        """
+        Cut the next bulk of lines, up to bulk_bytes_size bytes and bulk_size lines
+
+        :param input_map: Memory-mapped file
+        :type input_map: mmap.mmap
+        :param start: Bulk start offset
+        :type start: int
+        :param size: File size
+        :type size: int
+        :return: Bulk end offset and the bulk lines
+        :rtype: tuple(int, bytes)
+        """
+        limit = min(start + self._bulk_bytes_size, size)
+        end = size if limit == size else input_map.rfind(b"\n", start, limit) + 1
+        if end == 0:
+            # A single line longer than bulk_bytes_size
+            end = input_map.find(b"\n", limit) + 1 or size
+
+        bulk = input_map[start:end]
+        if bulk.count(b"\n") + (not bulk.endswith(b"\n")) > self._bulk_size:
+            cut = -1
+            for index in range(0, self._bulk_size):
+                cut = bulk.find(b"\n", cut + 1)
+            bulk = bulk[:cut + 1]
+            end = start + cut + 1
+        return end, bulk
+
+    def _worker(self):
+        """
+        Worker method - sends queued bulks until a None is received
+        """
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            path, start, end, bulk = task
+            try:
+                self._send(bulk)
+            except Exception as e:
+                # e.g. a line that is not UTF-8, the worker keeps running
+                self._fail(bulk, 400, str(e))
+            self._checkpoint.complete(path, start, end)
+
+    def _send(self, bulk):
+        """
+        Send a bulk of JSON lines as a JSON array, retry on server error
+
+        :param bulk: JSON lines
+        :type bulk: bytes
+        """
+        lines = bulk.strip()
+        if b"\r" in lines:
+            lines = lines.replace(b"\r\n", b"\n")
+        if b"\n\n" in lines:
+            lines = b"\n".join(line for line in lines.split(b"\n") if line.strip())
+        if not lines:
+            return
+        events_count = lines.count(b"\n") + 1
+        data = b"[" + lines.replace(b"\n", b",") + b"]"
+        # create_request_data() expects the native str type
+        data = data if isinstance(data, str) else data.decode("utf-8")
+        request_data = self._atom.create_request_data(self._stream, self._auth_key, data, batch=True)
+
+        attempt = 1
+        while True:
+            # Sent to the atom endpoints (failover) with its request timeout,
+            # the transport keeps a persistent connection for every worker thread
+            response = self._atom._send("bulk", request_data, "post")
+            if 200 <= response.status < 400:
+                with self._counters_lock:
+                    self._sent_events += events_count
+                    self._sent_bytes += len(bulk)
+                return
+
+            if response.status < 500 or attempt == self._retry_max_count:
+                self._fail(bulk, response.status, response.error)
+                return
+
+            attempt += 1
+            time.sleep(random.uniform(0, min(60, pow(2, attempt) * config.RETRY_EXPO_BACKOFF_BASE)))
+
+    def _fail(self, bulk, status, error_msg):
+        """
+        Count a bulk as failed and write it to the dead-letter spool (if defined)
+
+        :param bulk: JSON lines
+        :type bulk: bytes
+        :param status: HTTP status
+        :type status: int
+        :param error_msg: Error msg from server / sdk
+        :type error_msg: object
+        """
+        events = [event for event in bulk.decode("utf-8", "replace").splitlines() if event.strip()]
+        self._logger.error("Failed to send bulk of {count} events; Status: {status}; Error: {error}"
+                           .format(count=len(events), status=status, error=error_msg))
+        with self._counters_lock:
+            self._failed_events += len(events)
+        if self._dead_letter_spool is not None and events:
+            try:
+                self._dead_letter_spool.write(self._stream, status, error_msg, events)
+            except (IOError, OSError, TypeError, ValueError) as e:
+                self._logger.error("Failed to write to the dead-letter spool: {}".format(e))
+
+    def _report(self):
+        """
+        Log the load throughput
+        """
+        now = time.time()
+        self._last_report = now
+        duration = max(now - self._start_time, 0.001)
+        self._logger.info("Sent {events} events ({mb:.2f} MB) in {duration:.1f}s: {eps:.0f} events/s, "
+                          "{mbps:.2f} MB/s; failed: {failed} events"
+                          .format(events=self._sent_events,
+                                  mb=self._sent_bytes / 1048576.0,
+                                  duration=duration,
+                                  eps=self._sent_events / duration,
+                                  mbps=self._sent_bytes / 1048576.0 / duration,
+                                  failed=self._failed_events))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ironsource.atom.load",
+                                     description="Load JSON-lines files to an Atom stream")
+    parser.add_argument("files", nargs="+", help="JSON-lines files (one event per line)")
+    parser.add_argument("--stream", required=True, help="Atom stream name")
+    parser.add_argument("--auth-key", default="", help="Hmac auth key")
+    parser.add_argument("--endpoint", default=config.ATOM_ENDPOINT, help="Atom endpoint")
+    parser.add_argument("--workers", type=int, default=config.LOAD_WORKER_COUNT,
+                        help="Number of bulks sent in parallel")
+    parser.add_argument("--bulk-size", type=int, default=config.BATCH_SIZE_LIMIT,
+                        help="Max number of events in every bulk")
+    parser.add_argument("--bulk-bytes-size", type=int, default=config.BATCH_BYTES_SIZE_LIMIT,
+                        help="Max size of every bulk in bytes")
+    parser.add_argument("--checkpoint", default="atom-load.checkpoint.json", help="Checkpoint file path")
+    parser.add_argument("--dead-letter-path", default=None,
+                        help="Directory of the dead-letter spool for bulks that failed to be sent")
+    parser.add_argument("--transport", choices=["requests", "http-client"], default="requests",
+                        help="HTTP transport")
+    parser.add_argument("--debug", action="store_true", help="Enable printing of debug information")
+    args = parser.parse_args(argv)
+
+    transport = HttpClientTransport() if args.transport == "http-client" else RequestsTransport()
+    atom = IronSourceAtom(is_debug=args.debug, endpoint=args.endpoint, auth_key=args.auth_key, transport=transport)
+    loader = BulkLoader(atom, args.stream, args.checkpoint,
+                        worker_count=args.workers,
+                        bulk_size=args.bulk_size,
+                        bulk_bytes_size=args.bulk_bytes_size,
+                        dead_letter_path=args.dead_letter_path)
+    sent_events, failed_events = loader.load(args.files)
+    return 1 if failed_events else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import time
+import zlib
+
+from ironsource.atom.batch_event_pool import BatchEventPool
+
+
+class PartitionedEventPool:
+    """
+        Partitioned Event Pool - every stream is pinned to one of lane_count lanes (single worker each),
+        so the batches of a stream are sent (and retried) in order, while different streams are sent in parallel.
+
+        :param lane_count: Count of lanes (working threads)
+        :type lane_count: int
+        :param lane_size: Max count of batches waiting in every lane (bound of the batches in flight per lane)
+        :type lane_size: int
+    """
+
+    def __init__(self, lane_count, lane_size):
+        self._lanes = [BatchEventPool(thread_count=1, max_events=lane_size) for _ in range(max(1, lane_count))]
+
+    def stop(self):
+        """
+        Stop all working threads
+
+        :return: The tasks that were not started
+        :rtype: list
+        """
+        not_started = []
+        for lane in self._lanes:
+            not_started.extend(lane.stop())
+        return not_started
+
+    def join(self, timeout):
+        """
+        Wait until all the tasks are done
+
+        :param timeout: timeout in seconds
+        :type timeout: float
+        :return: True if all the tasks are done, False on timeout
+        :rtype: bool
+        """
+        deadline = time.time() + timeout
+        for lane in self._lanes:
+            if not lane.join(max(0, deadline - time.time())):
+                return False
+        return True
+
+    def add_event(self, event_action, timeout=None, key=None):
+        """
+        Add event to the lane of its key
+
+        :param event_action: event lambda
+        :type event_action: lambda
+        :param timeout: Optional, timeout in seconds (Raises Full exception after x seconds), default: block
+        :type timeout: float
+        :param key: Partition key (stream name), tasks of the same key are run in order
+        :type key: str
+        :raises: Queue.Full
+        """
+        self._get_lane(key).add_event(event_action, timeout=timeout)
+
+    def is_empty(self):
+        """
+        Check if the event pool is empty
+        :return: True if empty, else False
+        """
+        return all(lane.is_empty() for lane in self._lanes)
+
+    def get_stats(self):
+        """
+        Get the pool metrics
+
+        :return: Number of workers (lanes), busy workers, queued tasks and the average queue wait time in seconds
+        :rtype: dict
+        """
+        lanes = [lane.get_stats() for lane in self._lanes]
+        return {"workers": sum(stats["workers"] for stats in lanes),
+                "busy_workers": sum(stats["busy_workers"] for stats in lanes),
+                "queued": sum(stats["queued"] for stats in lanes),
+                "queue_wait": sum(stats["queue_wait"] for stats in lanes) / len(lanes),
+                "lanes": lanes}
+
+    def _get_lane(self, key):
+        if key is None:
+            return self._lanes[0]
+        if not isinstance(key, bytes):
+            key = key.encode("utf-8")
+        return self._lanes[(zlib.crc32(key) & 0xffffffff) % len(self._lanes)]
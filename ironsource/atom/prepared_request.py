@@ -0,0 +1,141 @@
+import json
+import zlib
+
+
+class PreparedRequest(object):
+    """
+        Immutable bulk request, serialized and signed once (see IronSourceAtom.prepare_events)
+        so it can be resent as is on every retry.
+
+        A streamed request keeps its body as chunks (envelope prefix, one chunk per event and suffix)
+        that are sent one block at a time (StreamingBody), the concatenated body is never built.
+    """
+
+    __slots__ = ("stream", "body", "chunks", "compressed_body", "signature", "count", "size")
+
+    def __init__(self, stream, body, signature, count, compress=False):
+        """
+        :param stream: Atom stream name
+        :type stream: str
+        :param body: Request body (JSON), or a list of the body chunks (streamed request)
+        :type body: bytes | list(bytes)
+        :param signature: HMAC signature of the events (None when there is no auth key)
+        :type signature: str
+        :param count: Number of events
+        :type count: int
+        :param compress: Optional, also keep the body compressed with gzip (sent instead of the body)
+        :type compress: bool
+        """
+        chunks = tuple(body) if isinstance(body, list) else (body,)
+        compressed_body = None
+        if compress:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compressed_body = b"".join([compressor.compress(chunk) for chunk in chunks]) + compressor.flush()
+        object.__setattr__(self, "stream", stream)
+        # None for a streamed request
+        object.__setattr__(self, "body", None if isinstance(body, list) else body)
+        object.__setattr__(self, "chunks", chunks)
+        object.__setattr__(self, "compressed_body", compressed_body)
+        object.__setattr__(self, "signature", signature)
+        object.__setattr__(self, "count", count)
+        # Size in bytes of what is sent
+        object.__setattr__(self, "size", len(compressed_body) if compress else sum(len(chunk) for chunk in chunks))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PreparedRequest is immutable")
+
+    def is_streamed(self):
+        """
+        :return: True if the body is sent as chunks (StreamingBody)
+        :rtype: bool
+        """
+        return self.body is None and self.compressed_body is None
+
+    def open_body(self):
+        """
+        Get the body to send - the compressed body, the body or a new StreamingBody over the chunks
+
+        :rtype: bytes | StreamingBody
+        """
+        if self.compressed_body is not None:
+            return self.compressed_body
+        if self.body is not None:
+            return self.body
+        return StreamingBody(self.chunks)
+
+    def get_body(self):
+        """
+        Get the (uncompressed) body, concatenated for a streamed request
+
+        :rtype: bytes
+        """
+        return self.body if self.body is not None else b"".join(self.chunks)
+
+    def get_events(self):
+        """
+        Decode the events of the request (for error reporting, only the encoded body is kept)
+
+        :return: List of the events data
+        :rtype: list(str)
+        """
+        return json.loads(json.loads(self.get_body().decode("utf-8"))["data"])
+
+
+class StreamingBody(object):
+    """
+        Read-only file-like request body over a list of chunks, read one block at a time by the HTTP client
+        (Content-Length is known, len(body))
+    """
+
+    def __init__(self, chunks):
+        """
+        :param chunks: Body chunks
+        :type chunks: tuple(bytes)
+        """
+        self._chunks = chunks
+        self._size = sum(len(chunk) for chunk in chunks)
+        # Current chunk and offset in it
+        self._index = 0
+        self._offset = 0
+        self._position = 0
+
+    def __len__(self):
+        return self._size
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes (all the rest when size < 0)
+
+        :rtype: bytes
+        """
+        if size is None or size < 0:
+            size = self._size - self._position
+        blocks = []
+        while size > 0 and self._index < len(self._chunks):
+            chunk = self._chunks[self._index]
+            block = chunk[self._offset:self._offset + size]
+            blocks.append(block)
+            size -= len(block)
+            self._position += len(block)
+            self._offset += len(block)
+            if self._offset >= len(chunk):
+                self._index += 1
+                self._offset = 0
+        return b"".join(blocks)
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=0):
+        """
+        Move to a position - only rewinding to the start and seeking to the end are supported
+        (used by the HTTP clients to find the length and to rewind on resend)
+        """
+        position = offset if whence == 0 else (self._size + offset if whence == 2 else self._position + offset)
+        if position == 0:
+            self._index = self._offset = self._position = 0
+        elif position == self._size:
+            self._index, self._offset, self._position = len(self._chunks), 0, self._size
+        else:
+            raise IOError("StreamingBody can only seek to the start or the end")
+        return self._position
@@ -18,6 +18,9 @@ class QueueEventStorage(EventStorage):
         self._dictionary_lock = Lock()
         self._queue_size = queue_size
         self._events = {}
+        # Streams whose queue has events (the ready index), under its own lock - never held while blocking
+        self._ready_streams = set()
+        self._ready_lock = Lock()
         self._block = block
         self._timeout = timeout if not block else None
 
@@ -29,9 +32,13 @@ class QueueEventStorage(EventStorage):
         :type event_object: Event
         """
         with self._dictionary_lock:
-            if event_object.stream not in self._events:
-                self._events[event_object.stream] = Queue(maxsize=self._queue_size)
-            self._events[event_object.stream].put(event_object, block=self._block, timeout=self._timeout)
+            queue = self._events.get(event_object.stream)
+            if queue is None:
+                queue = self._events[event_object.stream] = Queue(maxsize=self._queue_size)
+        # Outside of the locks - a blocking put waits for the handler, which reads the ready index
+        queue.put(event_object, block=self._block, timeout=self._timeout)
+        with self._ready_lock:
+            self._ready_streams.add(event_object.stream)
 
     def get_event(self, stream):
         """
@@ -41,8 +48,16 @@ class QueueEventStorage(EventStorage):
         :return: Event object from queue
         :rtype: Event
         """
-        if stream in self._events and not self._events[stream].empty():
-            return self._events[stream].get(block=self._block, timeout=self._timeout)
+        queue = self._events.get(stream)
+        if queue is None:
+            return None
+        event_object = None if queue.empty() else queue.get(block=self._block, timeout=self._timeout)
+        if queue.empty():
+            # Checked again under the lock - add_event marks the stream ready (again) after its put
+            with self._ready_lock:
+                if queue.empty():
+                    self._ready_streams.discard(stream)
+        return event_object
 
     def remove_event(self, stream):
         """
@@ -53,13 +68,28 @@ class QueueEventStorage(EventStorage):
         """
         return self.get_event(stream)
 
+    def after_fork(self):
+        """
+        Re-create the lock and discard the events inherited from the parent process
+        """
+        self._dictionary_lock = Lock()
+        self._ready_lock = Lock()
+        self._events = {}
+        self._ready_streams = set()
+
     def is_empty(self):
         """
         Check if the storage is empty
 
         :return: True is empty, else False
         """
-        for stream in self._events:
-            if not self._events[stream].empty():
-                return False
-        return True
+        return not self._ready_streams
+
+    def get_ready_streams(self):
+        """
+        Get the streams that have events in storage
+
+        :rtype: list(str)
+        """
+        with self._ready_lock:
+            return list(self._ready_streams)
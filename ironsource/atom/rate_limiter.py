@@ -0,0 +1,120 @@
+import time
+from threading import Lock
+
+import ironsource.atom.config as config
+
+
+class TokenBucket:
+    """
+        Token bucket - refills at rate tokens per second up to burst tokens.
+        A reservation may take the bucket below zero, the following reservations wait for the debt to be refilled.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        :param rate: Tokens per second
+        :type rate: float
+        :param burst: Max number of tokens (burst allowance)
+        :type burst: float
+        """
+        self._rate = float(rate)
+        self._burst = float(burst)
+        self._tokens = self._burst
+        self._time = time.time()
+
+    def reserve(self, amount, now):
+        """
+        Take tokens from the bucket
+
+        :param amount: Number of tokens
+        :type amount: float
+        :param now: Unix(epoch) time
+        :type now: float
+        :return: Time in seconds to wait before using the tokens
+        :rtype: float
+        """
+        self._tokens = min(self._burst, self._tokens + (now - self._time) * self._rate)
+        self._time = now
+        self._tokens -= amount
+        return max(0.0, -self._tokens / self._rate)
+
+
+class RateLimiter:
+    """
+        Outbound rate limits - token buckets of events/sec and bytes/sec per stream and globally
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        # (stream, "events" | "bytes") to TokenBucket, stream is None for the global limits
+        self._buckets = {}
+        self._throttled_seconds = {}
+        self._throttled_batches = 0
+
+    def after_fork(self):
+        """
+        Re-create the lock in a forked child process (it may be held by a thread of the parent), the limits are kept
+        """
+        self._lock = Lock()
+
+    def set_limit(self, stream=None, events_per_second=None, bytes_per_second=None,
+                  burst_seconds=config.RATE_LIMIT_BURST_SECONDS):
+        """
+        Set (or remove) the rate limits of a stream, or the global limits
+
+        :param stream: Optional, Atom stream name (default: global limits of all the streams)
+        :type stream: str
+        :param events_per_second: Optional, max events per second (None removes the limit)
+        :type events_per_second: float
+        :param bytes_per_second: Optional, max bytes per second (None removes the limit)
+        :type bytes_per_second: float
+        :param burst_seconds: Optional, burst allowance in seconds of the rate
+        :type burst_seconds: float
+        """
+        with self._lock:
+            for kind, rate in (("events", events_per_second), ("bytes", bytes_per_second)):
+                if rate is None:
+                    self._buckets.pop((stream, kind), None)
+                elif rate <= 0:
+                    raise Exception("Rate limit has to be greater than 0")
+                else:
+                    self._buckets[(stream, kind)] = TokenBucket(rate, rate * burst_seconds)
+
+    def reserve(self, stream, events_count, bytes_size):
+        """
+        Reserve the sending of a batch
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param events_count: Number of events in the batch
+        :type events_count: int
+        :param bytes_size: Size in bytes of the batch
+        :type bytes_size: int
+        :return: Time in seconds to wait before sending the batch
+        :rtype: float
+        """
+        if not self._buckets:
+            return 0.0
+        with self._lock:
+            now = time.time()
+            wait = 0.0
+            for key in ((stream, "events"), (stream, "bytes"), (None, "events"), (None, "bytes")):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    wait = max(wait, bucket.reserve(events_count if key[1] == "events" else bytes_size, now))
+            if wait > 0:
+                self._throttled_batches += 1
+                self._throttled_seconds[stream] = self._throttled_seconds.get(stream, 0.0) + wait
+            return wait
+
+    def get_stats(self):
+        """
+        Get the throttling metrics
+
+        :return: Number of throttled batches and time in seconds spent throttled (total and per stream)
+        :rtype: dict
+        """
+        with self._lock:
+            return {"throttled_batches": self._throttled_batches,
+                    "throttled_seconds": sum(self._throttled_seconds.values()),
+                    "throttled_seconds_per_stream": dict(self._throttled_seconds)}
@@ -0,0 +1,226 @@
+"""
+Replay a dead-letter spool to Atom:
+
+    python -m ironsource.atom.replay --path /var/spool/atom --auth-key KEY --workers 4 --rate 10
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from threading import Lock
+from threading import Thread
+
+try:
+    # python 3
+    from queue import Queue
+except ImportError:
+    # python 2
+    from Queue import Queue
+
+from ironsource.atom.ironsource_atom import IronSourceAtom
+from ironsource.atom.dead_letter_spool import DeadLetterSpool
+from ironsource.atom.checkpoint import Checkpoint
+import ironsource.atom.atom_logger as logger
+import ironsource.atom.config as config
+
+
+class DeadLetterReplay:
+    """
+        Resends the batches of a dead-letter spool to Atom with several workers,
+        resuming from where the previous replay stopped
+    """
+
+    CHECKPOINT_FILE = "replay.checkpoint.json"
+    REJECTED_DIR = "rejected"
+
+    def __init__(self, spool_path, atom, auth_key="",
+                 worker_count=config.REPLAY_WORKER_COUNT,
+                 batches_per_second=0,
+                 retry_max_count=config.REPLAY_RETRY_MAX_COUNT):
+        """
+        :param spool_path: Directory of the dead-letter spool files
+        :type spool_path: str
+        :param atom: Atom low level API object
+        :type atom: IronSourceAtom
+        :param auth_key: Optional, Hmac auth key (the Atom object default is used if empty)
+        :type auth_key: str
+        :param worker_count: Optional, Number of batches sent in parallel
+        :type worker_count: int
+        :param batches_per_second: Optional, Max number of batches to send every second (0 for no limit)
+        :type batches_per_second: float
+        :param retry_max_count: Optional, Max number of attempts on server error before rejecting a batch
+        :type retry_max_count: int
+        """
+        self._spool_path = spool_path
+        self._atom = atom
+        self._auth_key = auth_key
+        self._worker_count = worker_count
+        self._batch_interval = 1.0 / batches_per_second if batches_per_second > 0 else 0
+        self._retry_max_count = retry_max_count
+        self._logger = logger.get_logger()
+
+        self._checkpoint = Checkpoint(os.path.join(spool_path, self.CHECKPOINT_FILE))
+        self._rejected_spool = None
+        self._queue = Queue(maxsize=worker_count * 2)
+        self._next_send_time = 0
+
+        self._counters_lock = Lock()
+        self._sent_count = 0
+        self._rejected_count = 0
+
+    def run(self):
+        """
+        Replay all spool files, oldest first
+
+        :return: Number of sent batches and number of rejected batches
+        :rtype: tuple(int, int)
+        """
+        workers = []
+        for index in range(0, self._worker_count):
+            worker = Thread(target=self._worker)
+            worker.daemon = True
+            workers.append(worker)
+            worker.start()
+
+        for spool_file in DeadLetterSpool.list_spool_files(self._spool_path):
+            self._read_spool_file(spool_file)
+
+        for worker in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join()
+
+        self._checkpoint.save()
+        if self._rejected_spool is not None:
+            self._rejected_spool.close()
+        self._logger.info("Replay finished, sent: {sent} batches, rejected: {rejected} batches"
+                          .format(sent=self._sent_count, rejected=self._rejected_count))
+        return self._sent_count, self._rejected_count
+
+    def _read_spool_file(self, spool_file):
+        """
+        Queue the batches of a spool file, starting at its checkpoint
+
+        :param spool_file: Spool file path
+        :type spool_file: str
+        """
+        file_name = os.path.basename(spool_file)
+        offset = self._checkpoint.get_offset(file_name)
+        with open(spool_file, "rb") as spool:
+            spool.seek(offset)
+            for line in iter(spool.readline, b""):
+                # The last line may still be written by a tracker
+                if not line.endswith(b"\n"):
+                    break
+                start = offset
+                offset += len(line)
+                self._throttle()
+                self._queue.put((file_name, start, offset, line))
+
+    def _throttle(self):
+        """
+        Wait for the next send slot (batches_per_second)
+        """
+        if not self._batch_interval:
+            return
+        now = time.time()
+        if self._next_send_time > now:
+            time.sleep(self._next_send_time - now)
+        self._next_send_time = max(self._next_send_time, now) + self._batch_interval
+
+    def _worker(self):
+        """
+        Worker method - sends queued batches until a None is received
+        """
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            file_name, start, end, line = task
+            try:
+                self._send(json.loads(line.decode("utf-8")))
+            except Exception as e:
+                # Malformed spool line / rejected spool write error, the worker keeps running
+                self._logger.error("Failed to replay {file} at offset {offset}: {error}"
+                                   .format(file=file_name, offset=start, error=e))
+                with self._counters_lock:
+                    self._rejected_count += 1
+            self._checkpoint.complete(file_name, start, end)
+
+    def _send(self, record):
+        """
+        Send a spooled batch, retry on server error and reject it on client error or after retry_max_count attempts
+
+        :param record: Spooled batch
+        :type record: dict
+        """
+        attempt = 1
+        while True:
+            try:
+                response = self._atom.put_events(record["stream"], data=record["data"], auth_key=self._auth_key)
+            except Exception as e:
+                self._reject(record, 400, str(e))
+                return
+
+            if 200 <= response.status < 400:
+                with self._counters_lock:
+                    self._sent_count += 1
+                return
+
+            if response.status < 500 or attempt == self._retry_max_count:
+                self._reject(record, response.status, response.error)
+                return
+
+            duration = random.uniform(0, min(60, pow(2, attempt) * config.RETRY_EXPO_BACKOFF_BASE))
+            self._logger.warning("Got code: {status} from server, stream: {stream}, retry duration: {duration}"
+                                 .format(status=response.status, stream=record["stream"], duration=duration))
+            attempt += 1
+            time.sleep(duration)
+
+    def _reject(self, record, status, error_msg):
+        """
+        Write a batch that could not be replayed to the rejected spool
+
+        :param record: Spooled batch
+        :type record: dict
+        :param status: HTTP status
+        :type status: int
+        :param error_msg: Error msg from server / sdk
+        :type error_msg: object
+        """
+        self._logger.error("Rejected batch of stream: {stream}; Status: {status}; Error: {error}"
+                           .format(stream=record["stream"], status=status, error=error_msg))
+        with self._counters_lock:
+            self._rejected_count += 1
+            if self._rejected_spool is None:
+                self._rejected_spool = DeadLetterSpool(os.path.join(self._spool_path, self.REJECTED_DIR))
+        self._rejected_spool.write(record["stream"], status, error_msg, record["data"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ironsource.atom.replay",
+                                     description="Replay an Atom dead-letter spool")
+    parser.add_argument("--path", required=True, help="Directory of the dead-letter spool files")
+    parser.add_argument("--auth-key", default="", help="Hmac auth key")
+    parser.add_argument("--endpoint", default=config.ATOM_ENDPOINT, help="Atom endpoint")
+    parser.add_argument("--workers", type=int, default=config.REPLAY_WORKER_COUNT,
+                        help="Number of batches sent in parallel")
+    parser.add_argument("--rate", type=float, default=0, help="Max batches per second (0 for no limit)")
+    parser.add_argument("--retry-max-count", type=int, default=config.REPLAY_RETRY_MAX_COUNT,
+                        help="Max number of attempts on server error")
+    parser.add_argument("--debug", action="store_true", help="Enable printing of debug information")
+    args = parser.parse_args(argv)
+
+    atom = IronSourceAtom(is_debug=args.debug, endpoint=args.endpoint, auth_key=args.auth_key)
+    replay = DeadLetterReplay(args.path, atom,
+                              worker_count=args.workers,
+                              batches_per_second=args.rate,
+                              retry_max_count=args.retry_max_count)
+    sent_count, rejected_count = replay.run()
+    return 1 if rejected_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,7 @@ class Request:
         Wrapper for HTTP requests to Atom API
     """
 
-    def __init__(self, endpoint, data, session, timeout):
+    def __init__(self, endpoint, data, session, timeout, headers=None, keep_raw_response=True):
         """
         :param endpoint: Atom API endpoint
         :type endpoint: str
@@ -17,11 +17,17 @@ class Request:
         :param session: requests.Session object
         :type session: function
         :param timeout: request timeout
+        :param headers: Optional, HTTP request headers (merged with the session headers)
+        :type headers: dict
+        :param keep_raw_response: Optional, keep the 'requests' response object in Response.raw_response
+        :type keep_raw_response: bool
         """
         self._url = endpoint
         self._data = data
         self._session = session
         self._timeout = timeout
+        self._headers = headers
+        self._keep_raw_response = keep_raw_response
 
     def get(self):
         """
@@ -38,17 +44,17 @@ class Request:
         params = {'data': base64_str}
 
         try:
-            response = self._session.get(self._url, params=params, timeout=self._timeout)
+            response = self._session.get(self._url, params=params, headers=self._headers, timeout=self._timeout)
         except requests.exceptions.ConnectionError as ex:  # pragma: no cover
             response = ex
-            return Response("No connection to server", None, 500, response)
+            return Response("No connection to server", None, 500, self._raw(response))
         except requests.exceptions.RequestException as ex:  # pragma: no cover
             response = ex
-            return Response(ex, None, 400, response)
+            return Response(ex, None, 400, self._raw(response))
         if 200 <= response.status_code < 400:
-            return Response(None, response.content, response.status_code, response)
+            return Response(None, response.content, response.status_code, self._raw(response), response.headers)
         else:
-            return Response(response.content, None, response.status_code, response)
+            return Response(response.content, None, response.status_code, self._raw(response), response.headers)
 
     def post(self):
         """
@@ -61,15 +67,19 @@ class Request:
         :rtype: Response
         """
         try:
-            response = self._session.post(url=self._url, data=self._data, timeout=self._timeout)
+            response = self._session.post(url=self._url, data=self._data, headers=self._headers,
+                                          timeout=self._timeout)
         except requests.exceptions.ConnectionError as ex:  # pragma: no cover
             response = ex
-            return Response("No connection to server", None, 500, response)
+            return Response("No connection to server", None, 500, self._raw(response))
         except requests.exceptions.RequestException as ex:  # pragma: no cover
             response = ex
-            return Response(ex, None, 400, response)
+            return Response(ex, None, 400, self._raw(response))
 
         if 200 <= response.status_code < 400:
-            return Response(None, response.content, response.status_code, response)
+            return Response(None, response.content, response.status_code, self._raw(response), response.headers)
         else:
-            return Response(response.content, None, response.status_code, response)
+            return Response(response.content, None, response.status_code, self._raw(response), response.headers)
+
+    def _raw(self, response):
+        return response if self._keep_raw_response else None
@@ -1,9 +1,11 @@
-class Response:
+class Response(object):
     """
         Response information from Atom server
     """
 
-    def __init__(self, error, data, status, raw_response):
+    __slots__ = ("error", "data", "status", "raw_response", "headers", "endpoint")
+
+    def __init__(self, error, data, status, raw_response=None, headers=None, endpoint=None):
         """
         :param error: Error information
         :type error: object
@@ -11,10 +13,16 @@ class Response:
         :type data: object
         :param status: Response status from server
         :type status: int
-        :param raw_response: Original response object
+        :param raw_response: Optional, Original response object (depends on the transport)
         :type raw_response: object
+        :param headers: Optional, Response headers
+        :type headers: dict
+        :param endpoint: Optional, Atom endpoint that answered (set by IronSourceAtom)
+        :type endpoint: str
         """
         self.error = error
         self.data = data
         self.status = status
         self.raw_response = raw_response
+        self.headers = headers
+        self.endpoint = endpoint
@@ -0,0 +1,80 @@
+import zlib
+import random
+
+import ironsource.atom.config as config
+
+
+class Sampler:
+    """
+        Per stream sampling of the tracked events - a fixed rate, or deterministic by the hash of an event field
+        (e.g. user id) so all the events of a sampled key are kept.
+    """
+
+    def __init__(self):
+        # Stream to (rate, key_field, hash threshold), replaced as a whole so it can be changed at runtime
+        self._streams = {}
+
+    def set_sampling(self, stream, rate, key_field=None):
+        """
+        Set (or change) the sampling of a stream
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param rate: Fraction of the events to keep, between 0 and 1 (1 disables sampling)
+        :type rate: float
+        :param key_field: Optional, event field to sample by (deterministic), default: random sampling
+        :type key_field: str
+        """
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not 0 <= rate <= 1:
+            raise Exception("Sample rate has to be a number between 0 and 1")
+
+        streams = dict(self._streams)
+        if rate == 1:
+            streams.pop(stream, None)
+        else:
+            # Keys with crc32 below the threshold are kept
+            streams[stream] = (rate, key_field, int(rate * 0x100000000))
+        self._streams = streams
+
+    def get_sampling(self, stream):
+        """
+        Get the sampling of a stream
+
+        :param stream: Atom stream name
+        :type stream: str
+        :return: (rate, key_field), rate is 1 when the stream is not sampled
+        :rtype: tuple
+        """
+        rate, key_field, _ = self._streams.get(stream, (1, None, None))
+        return rate, key_field
+
+    def sample(self, stream, data):
+        """
+        Sample an event (before it is serialized)
+
+        :param stream: Atom stream name
+        :type stream: str
+        :param data: Event data (dict or string)
+        :type data: object
+        :return: None if the event is dropped, else the data - dicts are copied with the sample rate
+                 (at config.SAMPLE_RATE_FIELD), strings are returned as is
+        :rtype: object
+        """
+        sampling = self._streams.get(stream)
+        if sampling is None:
+            return data
+        rate, key_field, threshold = sampling
+
+        if key_field is not None and isinstance(data, dict) and key_field in data:
+            key = data[key_field]
+            if not isinstance(key, bytes):
+                key = u"{}".format(key).encode("utf-8")
+            if zlib.crc32(key) & 0xffffffff >= threshold:
+                return None
+        elif random.random() >= rate:
+            return None
+
+        if isinstance(data, dict):
+            data = dict(data)
+            data[config.SAMPLE_RATE_FIELD] = rate
+        return data
@@ -0,0 +1,208 @@
+import json
+import math
+import numbers
+
+import ironsource.atom.config as config
+
+try:
+    # python 2
+    text_type = basestring
+except NameError:
+    # python 3
+    text_type = str
+
+
+def _format_int(name):
+    def format_int(value):
+        if value is None:
+            return "null"
+        if isinstance(value, bool) or not isinstance(value, numbers.Integral):
+            raise TypeError("Field '{}' has to be int, got: {}".format(name, type(value).__name__))
+        return "%d" % value
+    return format_int
+
+
+def _format_float(name):
+    def format_float(value):
+        if value is None:
+            return "null"
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            raise TypeError("Field '{}' has to be float, got: {}".format(name, type(value).__name__))
+        value = float(value)
+        if math.isnan(value) or math.isinf(value):
+            raise ValueError("Field '{}' has to be a finite number, got: {}".format(name, value))
+        return repr(value)
+    return format_float
+
+
+def _format_bool(name):
+    def format_bool(value):
+        if value is None:
+            return "null"
+        if not isinstance(value, bool):
+            raise TypeError("Field '{}' has to be bool, got: {}".format(name, type(value).__name__))
+        return "true" if value else "false"
+    return format_bool
+
+
+def _format_str(name):
+    encode = json.JSONEncoder().encode
+
+    def format_str(value):
+        if value is None:
+            return "null"
+        if not isinstance(value, text_type):
+            raise TypeError("Field '{}' has to be str, got: {}".format(name, type(value).__name__))
+        return encode(value)
+    return format_str
+
+
+def _format_json(name):
+    def format_json(value):
+        return json.dumps(value)
+    return format_json
+
+
+def infer_field_type(column):
+    """
+    Infer the field type of a column (None values are ignored)
+
+    :param column: Column values
+    :type column: list
+    :return: int, float, bool, str or object (mixed or other types, encoded with json.dumps)
+    :rtype: type
+    """
+    types = set(map(type, column))
+    types.discard(type(None))
+    if not types:
+        return object
+    if all(issubclass(value_type, bool) for value_type in types):
+        return bool
+    if all(issubclass(value_type, numbers.Integral) and not issubclass(value_type, bool) for value_type in types):
+        return int
+    if all(issubclass(value_type, float) for value_type in types):
+        return float
+    if all(issubclass(value_type, text_type) for value_type in types):
+        return str
+    return object
+
+
+def to_columns(records):
+    """
+    Get the columns of columnar records - a NumPy structured array or a dict of columns (lists or NumPy arrays).
+    NumPy is not imported, the arrays are converted with tolist() (python values)
+
+    :param records: Records
+    :type records: numpy.ndarray | dict | list
+    :return: (names, columns, count), None if the records are not columnar (a list of rows)
+    :rtype: tuple
+    """
+    names = getattr(getattr(records, "dtype", None), "names", None)
+    if names:
+        # NumPy structured array
+        return list(names), [records[name].tolist() for name in names], len(records)
+    if not isinstance(records, dict):
+        return None
+    names = list(records)
+    columns = [column.tolist() if hasattr(column, "tolist") else list(column) for column in records.values()]
+    count = len(columns[0]) if columns else 0
+    for name, column in zip(names, columns):
+        if len(column) != count:
+            raise ValueError("Column '{}' has {} values, expected: {}".format(name, len(column), count))
+    return names, columns, count
+
+
+class Schema:
+    """
+        Fixed schema of a stream, compiles a specialized JSON encoder for its events:
+        the key fragments are escaped once and every value is validated and formatted by its field type.
+
+        Supported field types: int, float, bool, str and object (any JSON serializable value),
+        every field may be None (null).
+    """
+
+    _FORMATTERS = {int: _format_int,
+                   float: _format_float,
+                   bool: _format_bool,
+                   str: _format_str,
+                   object: _format_json}
+
+    def __init__(self, fields):
+        """
+        :param fields: Ordered list of (field name, field type)
+        :type fields: list(tuple(str, type))
+        """
+        self.names = []
+        formatters = []
+        template = []
+        for name, field_type in fields:
+            if field_type in (dict, list):
+                field_type = object
+            if field_type is text_type:
+                field_type = str
+            if field_type not in self._FORMATTERS:
+                raise Exception("Unsupported type of field '{}': {}".format(name, field_type))
+            self.names.append(name)
+            formatters.append(self._FORMATTERS[field_type](name))
+            # Escaped once - '%' is escaped for the % formatting below
+            template.append(json.dumps(name).replace("%", "%%") + ": %s")
+        self._names_set = frozenset(self.names)
+        self._formatters = formatters
+        self._template = "{" + ", ".join(template) + "}"
+
+        # Generate: lambda values: template % (f0(values[0]), f1(values[1]), ...)
+        namespace = dict(("f{}".format(index), formatter) for index, formatter in enumerate(formatters))
+        namespace["template"] = self._template
+        source = "lambda values: template % ({},)".format(
+            ", ".join("f{index}(values[{index}])".format(index=index) for index in range(len(formatters))))
+        self._encode = eval(source, namespace) if formatters else lambda values: "{}"
+
+    def encode(self, values):
+        """
+        Encode the values of an event to JSON
+
+        :param values: Field values in the schema order (tuple / list), or a dict (missing fields are null)
+        :type values: tuple | list | dict
+        :return: JSON string
+        :rtype: str
+        """
+        if isinstance(values, dict):
+            if config.SAMPLE_RATE_FIELD in values:
+                # Added by the tracker sampling, not a part of the schema
+                values = dict(values)
+                sample_rate = values.pop(config.SAMPLE_RATE_FIELD)
+                data = self.encode(values)[:-1]
+                return "{}{}{}: {}}}".format(data, ", " if len(data) > 1 else "", json.dumps(config.SAMPLE_RATE_FIELD), json.dumps(sample_rate))
+            if not self._names_set.issuperset(values):
+                raise TypeError("Unknown fields: {}".format(", ".join(sorted(set(values) - self._names_set))))
+            values = [values.get(name) for name in self.names]
+        elif len(values) != len(self.names):
+            raise TypeError("Expected {} values, got: {}".format(len(self.names), len(values)))
+        return self._encode(values)
+
+    def encode_columns(self, names, columns, count):
+        """
+        Encode columnar events to JSON - every column is formatted at once by its field formatter,
+        then the rows are joined with the (escaped once) key fragments
+
+        :param names: Column names (missing fields are null)
+        :type names: list(str)
+        :param columns: Column values
+        :type columns: list(list)
+        :param count: Number of events
+        :type count: int
+        :return: JSON string of every event
+        :rtype: list(str)
+        """
+        unknown = set(names) - self._names_set
+        if unknown:
+            raise TypeError("Unknown fields: {}".format(", ".join(sorted(unknown))))
+        columns_by_name = dict(zip(names, columns))
+        formatted = []
+        for name, formatter in zip(self.names, self._formatters):
+            column = columns_by_name.get(name)
+            formatted.append(list(map(formatter, column)) if column is not None else ["null"] * count)
+        if not formatted:
+            return ["{}"] * count
+        template = self._template
+        return [template % row for row in zip(*formatted)]
@@ -0,0 +1,243 @@
+import os
+import time
+import functools
+from collections import deque
+from threading import Lock
+from threading import Thread
+from threading import Condition
+from threading import Event as ThreadEvent
+
+from ironsource.atom.batch_event_pool import BatchEventPool
+from ironsource.atom.transport import RequestsTransport
+import ironsource.atom.config as config
+
+
+class _Attachment:
+    """
+        State of a tracker attached to the runtime
+    """
+
+    def __init__(self, quota, flush_interval):
+        # Max number of batches of the tracker that are sent (or waiting for a worker) at once
+        self.quota = quota
+        self.in_flight = 0
+        # Batches waiting for the quota
+        self.ready = deque()
+        self.flush_interval = flush_interval
+        self.next_flush = time.time() + flush_interval
+        self.is_active = True
+        # Held while the tracker handler step runs
+        self.step_lock = Lock()
+
+
+class SenderRuntime:
+    """
+        Process-wide sender runtime that several trackers can share (IronSourceAtomTracker(runtime=...)):
+        one handler thread, one timer thread, one pool of sending workers and one HTTP transport
+        (connection pools) for all the attached trackers, with a per tracker quota of batches in flight.
+    """
+
+    def __init__(self, worker_count=config.RUNTIME_WORKER_COUNT, transport=None, max_worker_count=None):
+        """
+        :param worker_count: Number of sending workers (threads)
+        :type worker_count: int
+        :param transport: Optional, HTTP Transport shared by the trackers (default: RequestsTransport)
+        :type transport: Transport
+        :param max_worker_count: Optional, autoscale the workers up to this count (default: no autoscaling)
+        :type max_worker_count: int
+        """
+        self.transport = transport if transport is not None else RequestsTransport()
+        self._worker_count = worker_count
+        self._max_worker_count = max_worker_count
+        self._batch_event_pool = self._create_pool()
+
+        self._trackers = {}
+        self._is_running = True
+        self._start()
+
+    def after_fork(self):
+        """
+        Re-create the threads, locks and workers in a forked child process (once, for all the attached trackers),
+        the batches of the parent process are discarded
+        """
+        if self._pid == os.getpid():
+            return
+        self.transport.after_fork()
+        self._batch_event_pool = self._create_pool()
+        for attachment in self._trackers.values():
+            attachment.ready.clear()
+            attachment.in_flight = 0
+            attachment.step_lock = Lock()
+        self._start()
+
+    def get_stats(self):
+        """
+        Get the worker pool metrics
+
+        :return: Number of workers, busy workers, queued batches and the average queue wait time in seconds
+        :rtype: dict
+        """
+        return self._batch_event_pool.get_stats()
+
+    def _create_pool(self):
+        return BatchEventPool(thread_count=self._worker_count, max_events=self._worker_count,
+                              max_thread_count=self._max_worker_count)
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._lock = Lock()
+        # Notified when a batch is done
+        self._batch_done = Condition(self._lock)
+        self._wakeup = ThreadEvent()
+        self._timer_wakeup = ThreadEvent()
+
+        handler_thread = Thread(target=self._handler)
+        handler_thread.daemon = True
+        handler_thread.start()
+
+        timer_thread = Thread(target=self._timer)
+        timer_thread.daemon = True
+        timer_thread.start()
+
+    def attach(self, tracker, flush_interval, quota=config.RUNTIME_TRACKER_QUOTA):
+        """
+        Attach a tracker - its handler and flush timer run on the runtime threads
+
+        :param tracker: The tracker
+        :type tracker: IronSourceAtomTracker
+        :param flush_interval: Tracker flush interval in milliseconds
+        :type flush_interval: int
+        :param quota: Max number of batches of the tracker that are sent at once
+        :type quota: int
+        """
+        with self._lock:
+            self._trackers[tracker] = _Attachment(max(1, quota), flush_interval / 1000.0)
+        self._timer_wakeup.set()
+        self._wakeup.set()
+
+    def pause(self, tracker):
+        """
+        Stop running the handler and flush timer of a tracker (its batches are still sent)
+
+        :param tracker: The tracker
+        :type tracker: IronSourceAtomTracker
+        """
+        attachment = self._trackers.get(tracker)
+        if attachment is None:
+            return
+        attachment.is_active = False
+        # Wait for a running handler step
+        with attachment.step_lock:
+            pass
+
+    def detach(self, tracker, timeout):
+        """
+        Wait until the batches of a tracker are sent (or timeout) and detach it
+
+        :param tracker: The tracker
+        :type tracker: IronSourceAtomTracker
+        :param timeout: timeout in seconds
+        :type timeout: float
+        :return: True if all the batches were sent, and the batches that were not started
+        :rtype: tuple(bool, list)
+        """
+        self.pause(tracker)
+        deadline = time.time() + timeout
+        with self._lock:
+            attachment = self._trackers.get(tracker)
+            if attachment is None:
+                return True, []
+            while attachment.ready or attachment.in_flight:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._batch_done.wait(remaining)
+            is_done = not attachment.ready and not attachment.in_flight
+            not_started = list(attachment.ready)
+            attachment.ready.clear()
+            del self._trackers[tracker]
+        return is_done, not_started
+
+    def submit(self, tracker, task):
+        """
+        Submit a batch of a tracker, it is passed to the workers within the tracker quota
+
+        :param tracker: The tracker
+        :type tracker: IronSourceAtomTracker
+        :param task: Sending task
+        :type task: function
+        """
+        with self._lock:
+            self._trackers[tracker].ready.append(task)
+        self._wakeup.set()
+
+    def wakeup(self):
+        """
+        Wake up the handler thread (new events / flush)
+        """
+        self._wakeup.set()
+
+    def stop(self):
+        """
+        Stop the runtime threads (the attached trackers should be stopped first)
+        """
+        self._is_running = False
+        self._wakeup.set()
+        self._timer_wakeup.set()
+        self._batch_event_pool.stop()
+
+    def _handler(self):
+        """
+        Handler thread - runs a handler step of every active tracker in turn and passes their batches to the workers
+        """
+        while self._is_running:
+            has_events = False
+            for tracker, attachment in list(self._trackers.items()):
+                # Backpressure - no new batches while the tracker has a full quota of batches waiting
+                if attachment.is_active and len(attachment.ready) < attachment.quota:
+                    with attachment.step_lock:
+                        if attachment.is_active:
+                            has_events = tracker._handler_step() or has_events
+                self._dispatch(attachment)
+
+            if not has_events:
+                self._wakeup.wait(1)
+                self._wakeup.clear()
+
+    def _dispatch(self, attachment):
+        """
+        Pass the ready batches of a tracker to the workers, up to its quota
+        """
+        while True:
+            with self._lock:
+                if not attachment.ready or attachment.in_flight >= attachment.quota:
+                    return
+                task = attachment.ready.popleft()
+                attachment.in_flight += 1
+            self._batch_event_pool.add_event(functools.partial(self._run_task, attachment, task))
+
+    def _run_task(self, attachment, task):
+        try:
+            task()
+        finally:
+            with self._lock:
+                attachment.in_flight -= 1
+                self._batch_done.notify_all()
+            self._wakeup.set()
+
+    def _timer(self):
+        """
+        Timer thread - runs the periodic flush of every active tracker
+        """
+        while self._is_running:
+            now = time.time()
+            next_call = now + 1
+            for tracker, attachment in list(self._trackers.items()):
+                if not attachment.is_active:
+                    continue
+                if attachment.next_flush <= now:
+                    attachment.next_flush += attachment.flush_interval
+                    tracker._on_flush_interval()
+                next_call = min(next_call, attachment.next_flush)
+            self._timer_wakeup.wait(max(0, next_call - time.time()))
+            self._timer_wakeup.clear()
@@ -0,0 +1,207 @@
+import abc
+import errno
+import base64
+import socket
+import threading
+
+from ironsource.atom.response import Response
+
+try:
+    # python 3
+    import http.client as http_client
+    from urllib.parse import urlsplit, urlencode
+except ImportError:
+    # python 2
+    import httplib as http_client
+    from urlparse import urlsplit
+    from urllib import urlencode
+
+
+class Transport:
+    """
+        Abstract Base Class for the HTTP layer used by IronSourceAtom to send requests to Atom.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self):
+        pass
+
+    @abc.abstractmethod
+    def get(self, url, data, headers, timeout):
+        """
+        Send data with GET method (base64 encoded 'data' query parameter)
+
+        :param url: Atom API url
+        :type url: str
+        :param data: Data that will be sent to Atom
+        :type data: str
+        :param headers: HTTP request headers
+        :type headers: dict
+        :param timeout: request timeout in seconds
+        :type timeout: float
+        :return: Response object from server
+        :rtype: Response
+        """
+        pass
+
+    @abc.abstractmethod
+    def post(self, url, data, headers, timeout):
+        """
+        Send data with POST method
+
+        :param url: Atom API url
+        :type url: str
+        :param data: Data that will be sent to Atom
+        :type data: str
+        :param headers: HTTP request headers
+        :type headers: dict
+        :param timeout: request timeout in seconds
+        :type timeout: float
+        :return: Response object from server
+        :rtype: Response
+        """
+        pass
+
+    def close(self):
+        """
+        Close the connections of the calling thread
+        """
+        pass
+
+    def after_fork(self):
+        """
+        Called in a forked child process - drop the connections inherited from the parent process
+        """
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+        Transport based on the 'requests' lib, keeps one session (connection pool) per thread.
+        The 'requests' lib is imported on the first request (it is slow to import).
+    """
+
+    def __init__(self, keep_raw_response=False):
+        """
+        :param keep_raw_response: Optional, keep the 'requests' response object in Response.raw_response
+        :type keep_raw_response: bool
+        """
+        super(RequestsTransport, self).__init__()
+        self._local = threading.local()
+        self._keep_raw_response = keep_raw_response
+
+    def get(self, url, data, headers, timeout):
+        from ironsource.atom.request import Request
+        return Request(url, data, self._get_session(), timeout, headers, self._keep_raw_response).get()
+
+    def post(self, url, data, headers, timeout):
+        from ironsource.atom.request import Request
+        return Request(url, data, self._get_session(), timeout, headers, self._keep_raw_response).post()
+
+    def close(self):
+        session = getattr(self._local, "session", None)
+        if session is not None:
+            session.close()
+            self._local.session = None
+
+    def after_fork(self):
+        self._local = threading.local()
+
+    def _get_session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+        return session
+
+
+class HttpClientTransport(Transport):
+    """
+        Lean transport based on the standard library http.client (httplib), keeps one persistent connection
+        per host for every thread. Response.raw_response is always None.
+    """
+
+    def __init__(self):
+        super(HttpClientTransport, self).__init__()
+        self._local = threading.local()
+
+    def get(self, url, data, headers, timeout):
+        base64_str = base64.b64encode(('%s' % data).encode()).decode()
+        return self._request("GET", url + "?" + urlencode({"data": base64_str}), None, headers, timeout)
+
+    def post(self, url, data, headers, timeout):
+        # A file-like body (StreamingBody) is read block by block by http.client
+        if not isinstance(data, bytes) and not hasattr(data, "read"):
+            data = data.encode("utf-8")
+        return self._request("POST", url, data, headers, timeout)
+
+    def close(self):
+        connections = getattr(self._local, "connections", {})
+        for connection in connections.values():
+            connection.close()
+        connections.clear()
+
+    def after_fork(self):
+        self._local = threading.local()
+
+    def _request(self, method, url, body, headers, timeout):
+        """
+        Send a request on the thread connection to the url host
+
+        A request that fails on a reused connection because the server closed it while idle (no response
+        was received) is sent again once on a new connection, timeouts are never retried.
+        """
+        parts = urlsplit(url)
+        path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        key = (parts.scheme, parts.netloc)
+        connections = self._local.__dict__.setdefault("connections", {})
+
+        while True:
+            connection = connections.get(key)
+            is_reused = connection is not None
+            if not is_reused:
+                connection_class = http_client.HTTPSConnection if parts.scheme == "https" \
+                    else http_client.HTTPConnection
+                connection = connections[key] = connection_class(parts.netloc, timeout=timeout)
+
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                content = response.read()
+            except socket.timeout as ex:
+                connection.close()
+                del connections[key]
+                return Response("No connection to server: {}".format(ex), None, 500, None)
+            except (socket.error, http_client.HTTPException) as ex:
+                connection.close()
+                del connections[key]
+                if is_reused and self._is_stale_connection_error(ex):
+                    # A file-like body (StreamingBody) may be partly read
+                    if hasattr(body, "seek"):
+                        body.seek(0)
+                    continue
+                return Response("No connection to server: {}".format(ex), None, 500, None)
+
+            if response.getheader("connection", "").lower() == "close":
+                connection.close()
+                del connections[key]
+
+            response_headers = dict(response.getheaders())
+            if 200 <= response.status < 400:
+                return Response(None, content, response.status, None, response_headers)
+            else:
+                return Response(content, None, response.status, None, response_headers)
+
+    @staticmethod
+    def _is_stale_connection_error(ex):
+        """
+        Check if an error means the server closed the (idle) connection before handling the request
+
+        :param ex: Connection error
+        :type ex: Exception
+        :rtype: bool
+        """
+        # RemoteDisconnected (python 3) is a BadStatusLine, python 2 raises BadStatusLine('')
+        if isinstance(ex, http_client.BadStatusLine):
+            return True
+        return getattr(ex, "errno", None) in (errno.EPIPE, errno.ECONNRESET)
@@ -0,0 +1,44 @@
+import unittest
+
+from ironsource.atom.aggregator import Aggregator, Histogram
+
+
+class TestAggregator(unittest.TestCase):
+    def setUp(self):
+        self.stream = "streamname"
+        self.aggregator = Aggregator()
+
+    def _summaries(self):
+        return dict((summary["key"], summary) for _, summary in self.aggregator.flush())
+
+    def test_counter_and_sum(self):
+        for _ in range(3):
+            self.aggregator.add(self.stream, "clicks")
+        self.aggregator.add(self.stream, "bytes", 10, kind="sum")
+        self.aggregator.add(self.stream, "bytes", 5, kind="sum")
+
+        summaries = self._summaries()
+        self.assertEqual(summaries["clicks"]["value"], 3)
+        self.assertEqual((summaries["bytes"]["count"], summaries["bytes"]["sum"]), (2, 15))
+        self.assertTrue(self.aggregator.is_empty())
+
+    def test_histogram(self):
+        for value in range(1, 101):
+            self.aggregator.add(self.stream, "latency", value, kind="histogram")
+
+        summary = self._summaries()["latency"]
+        self.assertEqual((summary["count"], summary["min"], summary["max"]), (100, 1, 100))
+        self.assertAlmostEqual(summary["p50"], 50, delta=1)
+        self.assertAlmostEqual(summary["p99"], 99, delta=2)
+        self.assertEqual(sum(summary["buckets"].values()), 100)
+
+    def test_invalid(self):
+        self.assertRaises(Exception, self.aggregator.add, self.stream, "clicks", 1, "average")
+        self.assertRaises(TypeError, self.aggregator.add, self.stream, "clicks", "1")
+
+    def test_zero_values(self):
+        histogram = Histogram()
+        for value in (0, 0, 3):
+            histogram.add(value)
+        self.assertEqual(histogram.quantile(0.5), 0)
+        self.assertEqual(histogram.to_dict()["buckets"]["zero"], 2)
@@ -1,19 +1,28 @@
 import responses
 import json
+import zlib
 import base64
 import unittest
+import errno
+import socket
+import threading
 
 try:
     # python 3
     from urllib.parse import urlparse, quote
     from unittest.mock import MagicMock
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
 except ImportError:
     # python 2
     from urlparse import urlparse
     from urllib import quote
     from mock import MagicMock
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
 
 from ironsource.atom import ironsource_atom
+from ironsource.atom.transport import HttpClientTransport
 
 
 class TestApiSetterGetter(unittest.TestCase):
@@ -124,3 +133,197 @@ class TestPutEvents(unittest.TestCase):
     def test_should_receive_data_list(self):
         responses.add(responses.POST, self.url, json=self.data, status=200)
         self.assertRaises(Exception, self.atom_client.put_events, stream=self.stream, data={"event": "name"})
+
+    @responses.activate
+    def test_put_prepared(self):
+        responses.add(responses.POST, self.url, json=self.data, status=200)
+        prepared_request = self.atom_client.prepare_events(self.stream, self.data, auth_key="key")
+        self.atom_client.put_prepared(prepared_request)
+        self.atom_client.put_prepared(prepared_request)
+
+        self.assertEqual(responses.calls[0].request.body, responses.calls[1].request.body)
+        request_data = json.loads(responses.calls[0].request.body)
+        self.assertEqual(request_data["auth"], prepared_request.signature)
+        self.assertEqual(prepared_request.get_events(), self.data)
+        self.assertRaises(AttributeError, setattr, prepared_request, "body", b"")
+
+    @responses.activate
+    def test_put_prepared_compressed(self):
+        responses.add(responses.POST, self.url, json=self.data, status=200)
+        prepared_request = self.atom_client.prepare_events(self.stream, self.data, compress=True)
+        self.atom_client.put_prepared(prepared_request)
+
+        request = responses.calls[0].request
+        self.assertEqual(request.headers["Content-Encoding"], "gzip")
+        self.assertEqual(zlib.decompress(request.body, 16 + zlib.MAX_WBITS), prepared_request.body)
+
+    @responses.activate
+    def test_put_prepared_streamed(self):
+        responses.add(responses.POST, self.url, json=self.data, status=200)
+        data = self.data + [u"caf\u00e9 \"quoted\""]
+        prepared_request = self.atom_client.prepare_events(self.stream, data, auth_key="key", streaming=True)
+        expected = json.loads(self.atom_client.prepare_events(self.stream, data, auth_key="key").body.decode())
+        self.assertTrue(prepared_request.is_streamed())
+        self.atom_client.put_prepared(prepared_request)
+
+        request = responses.calls[0].request
+        self.assertEqual(request.headers["Content-Length"], str(prepared_request.size))
+        body = request.body
+        if hasattr(body, "read"):
+            # Some versions of the 'responses' mock keep the file-like body
+            body.seek(0)
+            body = body.read(7) + body.read()
+        self.assertEqual(json.loads(body.decode()), expected)
+        self.assertEqual(prepared_request.get_events(), data)
+
+
+class TestPutEventsIter(unittest.TestCase):
+    def setUp(self):
+        self.url = "http://track.atom-data.io/bulk"
+        self.stream = "streamname"
+        self.atom_client = ironsource_atom.IronSourceAtom()
+
+    @responses.activate
+    def test_bulks(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        events = ({"id": index} for index in range(25))
+        result = self.atom_client.put_events_iter(self.stream, events, bulk_size=10, concurrency=2)
+
+        self.assertEqual(result, {"sent_bulks": 3, "sent_events": 25, "failed_bulks": 0, "failed_events": 0})
+        sent = [json.loads(event)["id"] for call in responses.calls
+                for event in json.loads(json.loads(call.request.body)["data"])]
+        self.assertEqual(sorted(sent), list(range(25)))
+
+    @responses.activate
+    def test_failed_bulks(self):
+        responses.add(responses.POST, self.url, json={"error": "unauthorized"}, status=401)
+        failed = []
+        result = self.atom_client.put_events_iter(self.stream, ('{"id": %d}' % index for index in range(5)),
+                                                  bulk_bytes_size=30,
+                                                  callback=lambda status, error, data: failed.append(data))
+
+        self.assertEqual(result["failed_events"], 5)
+        self.assertEqual(result["failed_bulks"], len(failed))
+        self.assertTrue(all(len(data) <= 3 for data in failed))
+
+
+class TestMultipleEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.urls = ["http://track-1.atom-data.io/", "http://track-2.atom-data.io/"]
+        self.data = [{"event_name": "test", "id": "2"}]
+        self.stream = "streamname"
+        self.atom_client = ironsource_atom.IronSourceAtom(endpoint=self.urls)
+
+    @responses.activate
+    def test_failover(self):
+        responses.add(responses.POST, self.urls[0] + "bulk", json={"error": "fail"}, status=503)
+        responses.add(responses.POST, self.urls[1] + "bulk", json={"Status": "Ok"}, status=200)
+        for _ in range(3):
+            res = self.atom_client.put_events(stream=self.stream, data=self.data)
+            self.assertEqual(res.status, 200)
+
+        # The failing endpoint is skipped after its first failure
+        self.assertEqual(len(responses.calls), 4)
+        stats = self.atom_client.get_endpoint_stats()
+        self.assertFalse(stats[self.urls[0]]["healthy"])
+        self.assertTrue(stats[self.urls[1]]["healthy"])
+
+    def test_empty_endpoints(self):
+        self.assertRaises(Exception, ironsource_atom.IronSourceAtom, endpoint=[])
+
+    @responses.activate
+    def test_all_endpoints_fail(self):
+        for url in self.urls:
+            responses.add(responses.POST, url + "bulk", json={"error": "fail"}, status=500)
+        res = self.atom_client.put_events(stream=self.stream, data=self.data)
+
+        self.assertEqual(res.status, 500)
+        self.assertEqual(len(responses.calls), 2)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    # Keep-alive connections are handled in their own threads, so shutdown() doesn't wait for them
+    daemon_threads = True
+
+
+class TestHttpClientTransport(unittest.TestCase):
+    def setUp(self):
+        requests_body = self.requests_body = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                requests_body.append(self.rfile.read(int(self.headers["Content-Length"])))
+                status = 401 if self.path == "/bulk" else 200
+                body = b'{"Status": "Ok"}'
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server_thread = threading.Thread(target=self.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+
+        self.stream = "streamname"
+        self.transport = HttpClientTransport()
+        self.atom_client = ironsource_atom.IronSourceAtom(
+            endpoint="http://127.0.0.1:{}/".format(self.server.server_port),
+            transport=self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_post(self):
+        for _ in range(2):
+            res = self.atom_client.put_event(stream=self.stream, data={"event_name": "test"})
+            self.assertEqual(res.status, 200)
+            self.assertEqual(res.data, b"{\"Status\": \"Ok\"}")
+            self.assertIsNone(res.raw_response)
+
+        self.assertEqual(json.loads(self.requests_body[0].decode())["table"], self.stream)
+
+    def test_post_streamed(self):
+        data = [{"event_name": "test", "id": index} for index in range(100)]
+        prepared_request = self.atom_client.prepare_events(self.stream, data, auth_key="key", streaming=True)
+        res = self.atom_client.put_prepared(prepared_request)
+        self.assertEqual(res.status, 401)
+
+        self.assertEqual(len(self.requests_body[0]), prepared_request.size)
+        self.assertEqual(json.loads(self.requests_body[0].decode())["auth"], prepared_request.signature)
+        self.assertEqual(prepared_request.get_events(), data)
+
+    def test_post_streamed_stale_connection(self):
+        class StaleConnection(object):
+            # The server closed the idle connection - fails after sending a part of the body
+            def request(self, method, path, body, headers):
+                body.read(10)
+                raise socket.error(errno.EPIPE, "Broken pipe")
+
+            def close(self):
+                pass
+
+        self.transport._local.connections = {("http", "127.0.0.1:{}".format(self.server.server_port)):
+                                             StaleConnection()}
+        data = [{"event_name": "test", "id": index} for index in range(100)]
+        prepared_request = self.atom_client.prepare_events(self.stream, data, streaming=True)
+        res = self.atom_client.put_prepared(prepared_request)
+        self.assertEqual(res.status, 401)
+        self.assertEqual(self.requests_body[0], prepared_request.get_body())
+
+    def test_error(self):
+        res = self.atom_client.put_events(stream=self.stream, data=[{"event_name": "test"}])
+        self.assertEqual(res.status, 401)
+        self.assertEqual(res.error, b"{\"Status\": \"Ok\"}")
+
+    def test_no_connection(self):
+        self.server.server_close()
+        res = self.atom_client.put_event(stream=self.stream, data={"event_name": "test"})
+        self.assertEqual(res.status, 500)
@@ -0,0 +1,54 @@
+import time
+import logging
+import unittest
+
+from ironsource.atom.atom_logger import RateLimitedLogger, DataPreview
+
+
+class MemoryHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestRateLimitedLogger(unittest.TestCase):
+    def setUp(self):
+        self.handler = MemoryHandler()
+        self.logger = logging.getLogger("TestRateLimitedLogger")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_suppression(self):
+        rate_limited_logger = RateLimitedLogger(self.logger, max_count=2, interval=0.2)
+        for index in range(5):
+            rate_limited_logger.error("key", "Error %s", index, extra={"atom_stream": "streamname"})
+        rate_limited_logger.error("other-key", "Other error")
+        self.assertEqual([record.getMessage() for record in self.handler.records],
+                         ["Error 0", "Error 1", "Other error"])
+        self.assertEqual(self.handler.records[0].atom_stream, "streamname")
+        self.assertEqual(rate_limited_logger.get_suppressed_count(), 3)
+
+        self.handler.records = []
+        time.sleep(0.25)
+        rate_limited_logger.error("key", "Error %s", 5)
+        self.assertEqual(self.handler.records[0].getMessage(), "Error 5; 3 similar messages were suppressed")
+
+    def test_disabled_level_is_not_formatted(self):
+        class Unformattable(object):
+            def __str__(self):
+                raise AssertionError("formatted")
+
+        rate_limited_logger = RateLimitedLogger(self.logger)
+        rate_limited_logger.log(logging.DEBUG, "key", "Data %s", Unformattable())
+        self.assertEqual(self.handler.records, [])
+
+    def test_data_preview(self):
+        self.assertEqual(str(DataPreview(['{"id": 1}', '{"id": 2}'], size=5)), '2 events, first: {"id"...')
+        self.assertEqual(str(DataPreview("x" * 100, size=3)), "xxx...")
@@ -0,0 +1,62 @@
+import json
+import shutil
+import tempfile
+import unittest
+
+import responses
+
+from ironsource.atom import ironsource_atom
+from ironsource.atom.dead_letter_spool import DeadLetterSpool
+from ironsource.atom.replay import DeadLetterReplay
+
+
+class TestDeadLetterSpool(unittest.TestCase):
+    def setUp(self):
+        self.url = "http://track.atom-data.io/bulk"
+        self.stream = "streamname"
+        self.path = tempfile.mkdtemp()
+        self.spool = DeadLetterSpool(self.path, max_bytes=100, backup_count=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_write(self):
+        self.spool.write(self.stream, 400, b"bad request", ['{"id": 1}'], 1000)
+        self.spool.close()
+
+        with open(self.spool.list_files()[0]) as spool_file:
+            record = json.loads(spool_file.readline())
+        self.assertEqual(record, {"stream": self.stream, "status": 400, "error": "bad request",
+                                  "timestamp": 1000, "data": ['{"id": 1}']})
+
+    def test_rotate(self):
+        for index in range(5):
+            self.spool.write(self.stream, 500, "error", ['{{"id": {}}}'.format(index)])
+        self.assertEqual(len(self.spool.list_files()), 3)
+
+    @responses.activate
+    def test_replay_resume(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        for index in range(4):
+            self.spool.write(self.stream, 500, "error", ['{{"id": {}}}'.format(index)])
+
+        # The oldest file was removed by the rotation (backup_count=3)
+        atom_client = ironsource_atom.IronSourceAtom()
+        self.assertEqual(DeadLetterReplay(self.path, atom_client, worker_count=2).run(), (3, 0))
+        self.assertEqual(len(responses.calls), 3)
+
+        self.spool.write(self.stream, 500, "error", ['{"id": 4}'])
+        self.assertEqual(DeadLetterReplay(self.path, atom_client).run(), (1, 0))
+        self.assertEqual(len(responses.calls), 4)
+
+    @responses.activate
+    def test_replay_malformed_line(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        spool = DeadLetterSpool(self.path, backup_count=3)
+        spool.write(self.stream, 500, "error", ['{"id": 0}'])
+        spool._file.write(b"not json\n")
+        spool.write(self.stream, 500, "error", ['{"id": 1}'])
+        spool.close()
+
+        atom_client = ironsource_atom.IronSourceAtom()
+        self.assertEqual(DeadLetterReplay(self.path, atom_client, worker_count=1).run(), (2, 1))
@@ -0,0 +1,51 @@
+import json
+import time
+import unittest
+
+from ironsource.atom.debug_log_writer import DebugLogWriter
+from ironsource.atom.response import Response
+
+
+class MemoryLogger:
+    def __init__(self):
+        self.records = []
+
+    def info(self, msg):
+        self.records.append(msg)
+
+    def lines(self):
+        return [json.loads(line) for record in self.records for line in record.split("\n")]
+
+
+class TestDebugLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.raw_logger = MemoryLogger()
+        self.request_data = '{"table": "streamname", "data": "{\\"id\\": 1}"}'
+
+    def test_capture(self):
+        writer = DebugLogWriter(self.raw_logger)
+        writer.capture(self.request_data, {"x-ironsource-atom-sdk-type": "python"},
+                       Response(None, '{"Status": "Ok"}', 200, None, {"content-type": "application/json"}), time.time())
+        writer.flush()
+
+        request_line, response_line = self.raw_logger.lines()
+        self.assertEqual(request_line["request"]["data"]["table"], "streamname")
+        self.assertEqual(request_line["request"]["id"], response_line["response"]["id"])
+        self.assertEqual(response_line["response"]["code"], 200)
+        self.assertEqual(writer.get_stats(), {"captured": 1, "dropped": 0, "queued": 0})
+
+    def test_sample_rate(self):
+        writer = DebugLogWriter(self.raw_logger, sample_rate=3)
+        for _ in range(9):
+            writer.capture(self.request_data, {}, Response(None, "ok", 200), time.time())
+        writer.flush()
+
+        self.assertEqual(len(self.raw_logger.lines()), 6)
+
+    def test_errors_only(self):
+        writer = DebugLogWriter(self.raw_logger, errors_only=True)
+        writer.capture(self.request_data, {}, Response(None, "ok", 200), time.time())
+        writer.capture(self.request_data, {}, Response("Service Unavailable", None, 503), time.time())
+        writer.flush()
+
+        self.assertEqual([line["response"]["code"] for line in self.raw_logger.lines() if "response" in line], [503])
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ironsource.atom.event import Event
+from ironsource.atom.hybrid_event_storage import HybridEventStorage
+
+
+class TestHybridEventStorage(unittest.TestCase):
+    def setUp(self):
+        self.stream = "streamname"
+        self.spill_path = tempfile.mkdtemp()
+        self.storage = HybridEventStorage(memory_bytes_size=20, segment_size=2, spill_path=self.spill_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.spill_path)
+
+    def _spilled_files(self):
+        return [name for _, _, files in os.walk(self.spill_path) for name in files]
+
+    def test_empty(self):
+        self.assertTrue(self.storage.is_empty())
+        self.assertIsNone(self.storage.get_event(self.stream))
+
+    def test_keeps_order_across_spill(self):
+        events = ['{{"id": {}}}'.format(index) for index in range(9)]
+        for data in events:
+            self.storage.add_event(Event(self.stream, data))
+
+        self.assertFalse(self.storage.is_empty())
+        self.assertTrue(len(self._spilled_files()) > 0)
+
+        drained = []
+        while not self.storage.is_empty():
+            drained.append(self.storage.get_event(self.stream).data)
+
+        self.assertEqual(drained, events)
+        self.assertEqual(self._spilled_files(), [])
+
+    def test_back_to_memory_after_drain(self):
+        for index in range(5):
+            self.storage.add_event(Event(self.stream, '{{"id": {}}}'.format(index)))
+        for _ in range(5):
+            self.storage.get_event(self.stream)
+
+        self.storage.add_event(Event(self.stream, '{"id": 5}'))
+        self.assertEqual(self._spilled_files(), [])
+        self.assertEqual(self.storage.get_event(self.stream).data, '{"id": 5}')
+
+    def test_partial_segments_are_bounded(self):
+        storage = HybridEventStorage(memory_bytes_size=80, segment_size=100, spill_path=self.spill_path)
+        for index in range(20):
+            storage.add_event(Event("stream-{}".format(index), '{"id": 1234}'))
+        self.assertTrue(len(self._spilled_files()) > 0)
+
+    def test_recover_after_close(self):
+        events = ['{{"id": {}}}'.format(index) for index in range(9)]
+        for data in events:
+            self.storage.add_event(Event(self.stream, data))
+        self.storage.close()
+
+        storage = HybridEventStorage(memory_bytes_size=20, segment_size=2, spill_path=self.spill_path)
+        self.assertEqual(storage.get_streams(), [self.stream])
+        self.assertEqual(storage.get_ready_streams(), [self.stream])
+        drained = []
+        while not storage.is_empty():
+            drained.append(storage.get_event(self.stream).data)
+        self.assertEqual(drained, events)
+
+    def test_recover_forked_segments(self):
+        self.storage.add_event(Event(self.stream, '{"id": 0}'))
+        # Child process - the inherited events are discarded, its events are spilled to the same spill_path
+        self.storage.after_fork()
+        events = ['{{"id": {}}}'.format(index) for index in range(1, 6)]
+        for data in events:
+            self.storage.add_event(Event(self.stream, data))
+        self.storage.close()
+        self.assertEqual(sorted(os.listdir(self.spill_path)), sorted(self._spilled_files()))
+
+        storage = HybridEventStorage(memory_bytes_size=20, segment_size=2, spill_path=self.spill_path)
+        drained = []
+        while not storage.is_empty():
+            drained.append(storage.get_event(self.stream).data)
+        self.assertEqual(drained, events)
+
+    def test_ready_streams(self):
+        for stream in ("stream-a", "stream-b"):
+            for index in range(3):
+                self.storage.add_event(Event(stream, '{{"id": {}}}'.format(index)))
+        self.assertEqual(sorted(self.storage.get_ready_streams()), ["stream-a", "stream-b"])
+
+        for _ in range(3):
+            self.storage.get_event("stream-a")
+        self.assertEqual(self.storage.get_ready_streams(), ["stream-b"])
@@ -0,0 +1,72 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+import responses
+
+from ironsource.atom import ironsource_atom
+from ironsource.atom.load import BulkLoader
+
+
+class TestBulkLoader(unittest.TestCase):
+    def setUp(self):
+        self.url = "http://track.atom-data.io/bulk"
+        self.stream = "streamname"
+        self.path = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.path, "events.json")
+        self.checkpoint_path = os.path.join(self.path, "checkpoint.json")
+        with open(self.input_path, "w") as input_file:
+            for index in range(5):
+                input_file.write('{{"id": {}}}\n'.format(index))
+        self.atom_client = ironsource_atom.IronSourceAtom()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _loader(self):
+        return BulkLoader(self.atom_client, self.stream, self.checkpoint_path, bulk_size=2, worker_count=2)
+
+    @responses.activate
+    def test_load(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        self.assertEqual(self._loader().load([self.input_path]), (5, 0))
+        self.assertEqual(len(responses.calls), 3)
+
+        events = []
+        for call in responses.calls:
+            request_data = json.loads(call.request.body)
+            self.assertTrue(request_data["bulk"])
+            events.extend(json.loads(request_data["data"]))
+        self.assertEqual(sorted(event["id"] for event in events), list(range(5)))
+
+    @responses.activate
+    def test_load_endpoints_failover(self):
+        responses.add(responses.POST, "http://proxy-a.example.com/bulk", json={"error": "unavailable"}, status=503)
+        responses.add(responses.POST, "http://proxy-b.example.com/bulk", json={"Status": "Ok"}, status=200)
+        atom_client = ironsource_atom.IronSourceAtom(endpoint=["http://proxy-a.example.com/",
+                                                               "http://proxy-b.example.com/"])
+        loader = BulkLoader(atom_client, self.stream, self.checkpoint_path, bulk_size=2, worker_count=1)
+
+        self.assertEqual(loader.load([self.input_path]), (5, 0))
+        self.assertEqual(len([call for call in responses.calls if "proxy-b" in call.request.url]), 3)
+
+    @responses.activate
+    def test_resume(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        self._loader().load([self.input_path])
+        with open(self.input_path, "a") as input_file:
+            input_file.write('{"id": 5}\n')
+
+        self.assertEqual(self._loader().load([self.input_path]), (1, 0))
+        self.assertEqual(len(responses.calls), 4)
+
+    @responses.activate
+    def test_invalid_line(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        with open(self.input_path, "wb") as input_file:
+            input_file.write(b'{"id": 0}\n{"id": "\xff"}\n{"id": 2}\n')
+        loader = BulkLoader(self.atom_client, self.stream, self.checkpoint_path, bulk_size=1, worker_count=1)
+
+        self.assertEqual(loader.load([self.input_path]), (2, 1))
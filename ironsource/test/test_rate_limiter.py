@@ -0,0 +1,36 @@
+import time
+import unittest
+
+from ironsource.atom.rate_limiter import RateLimiter, TokenBucket
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, burst=10)
+        now = time.time()
+        self.assertEqual(bucket.reserve(10, now), 0)
+        self.assertAlmostEqual(bucket.reserve(5, now), 0.5)
+        # Refilled by 10 tokens/sec
+        self.assertAlmostEqual(bucket.reserve(5, now + 1), 0)
+
+    def test_stream_and_global_limits(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.reserve("stream-a", 1000, 1000), 0)
+
+        limiter.set_limit("stream-a", events_per_second=100)
+        limiter.set_limit(bytes_per_second=1000)
+        self.assertEqual(limiter.reserve("stream-a", 100, 100), 0)
+        self.assertAlmostEqual(limiter.reserve("stream-a", 50, 100), 0.5, places=2)
+        # Global bytes limit
+        self.assertAlmostEqual(limiter.reserve("stream-b", 1, 1800), 1, places=2)
+
+        stats = limiter.get_stats()
+        self.assertEqual(stats["throttled_batches"], 2)
+        self.assertEqual(sorted(stats["throttled_seconds_per_stream"]), ["stream-a", "stream-b"])
+
+    def test_remove_limit(self):
+        limiter = RateLimiter()
+        limiter.set_limit("stream-a", events_per_second=1)
+        limiter.set_limit("stream-a")
+        self.assertEqual(limiter.reserve("stream-a", 1000, 1000), 0)
+        self.assertRaises(Exception, limiter.set_limit, "stream-a", 0)
@@ -0,0 +1,35 @@
+import unittest
+
+from ironsource.atom.sampler import Sampler
+
+
+class TestSampler(unittest.TestCase):
+    def setUp(self):
+        self.stream = "streamname"
+        self.sampler = Sampler()
+
+    def test_not_sampled(self):
+        data = {"id": 1}
+        self.assertIs(self.sampler.sample(self.stream, data), data)
+
+    def test_rate(self):
+        self.sampler.set_sampling(self.stream, 0.25)
+        kept = [self.sampler.sample(self.stream, {"id": index}) for index in range(4000)]
+        kept = [data for data in kept if data is not None]
+
+        self.assertTrue(800 < len(kept) < 1200)
+        self.assertEqual(kept[0]["_sample_rate"], 0.25)
+
+    def test_key_field(self):
+        self.sampler.set_sampling(self.stream, 0.5, key_field="user_id")
+        for user_id in range(100):
+            results = set(self.sampler.sample(self.stream, {"user_id": user_id, "index": index}) is None
+                          for index in range(5))
+            self.assertEqual(len(results), 1)
+
+    def test_runtime_change(self):
+        self.sampler.set_sampling(self.stream, 0)
+        self.assertIsNone(self.sampler.sample(self.stream, {"id": 1}))
+        self.sampler.set_sampling(self.stream, 1)
+        self.assertEqual(self.sampler.sample(self.stream, {"id": 1}), {"id": 1})
+        self.assertRaises(Exception, self.sampler.set_sampling, self.stream, 2)
@@ -0,0 +1,64 @@
+import json
+import unittest
+
+from ironsource.atom.schema import Schema, infer_field_type, to_columns
+
+
+class TestSchema(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema([("id", int), ("name", str), ("price", float), ("ok", bool), ("tags", list)])
+
+    def test_encode(self):
+        data = self.schema.encode((1, "a\"b%s", 2.5, True, ["x"]))
+        self.assertEqual(json.loads(data), {"id": 1, "name": "a\"b%s", "price": 2.5, "ok": True, "tags": ["x"]})
+
+    def test_encode_dict(self):
+        data = json.loads(self.schema.encode({"id": 1, "name": "a"}))
+        self.assertEqual(data, {"id": 1, "name": "a", "price": None, "ok": None, "tags": None})
+        self.assertRaises(TypeError, self.schema.encode, {"id": 1, "other": 2})
+
+        data = json.loads(self.schema.encode({"id": 1, "_sample_rate": 0.5}))
+        self.assertEqual((data["id"], data["_sample_rate"]), (1, 0.5))
+
+    def test_validation(self):
+        self.assertRaises(TypeError, self.schema.encode, ("1", "a", 2.5, True, []))
+        self.assertRaises(TypeError, self.schema.encode, (1, "a", 2.5, 1, []))
+        self.assertRaises(ValueError, self.schema.encode, (1, "a", float("nan"), True, []))
+        self.assertRaises(TypeError, self.schema.encode, (1, "a"))
+        self.assertRaises(Exception, Schema, [("id", set)])
+
+    def test_encode_columns(self):
+        events = self.schema.encode_columns(["name", "id"], [["a", None], [1, 2]], 2)
+        self.assertEqual([json.loads(data) for data in events],
+                         [{"id": 1, "name": "a", "price": None, "ok": None, "tags": None},
+                          {"id": 2, "name": None, "price": None, "ok": None, "tags": None}])
+        self.assertRaises(TypeError, self.schema.encode_columns, ["id"], [["1"]], 1)
+        self.assertRaises(TypeError, self.schema.encode_columns, ["other"], [[1]], 1)
+
+
+class TestColumns(unittest.TestCase):
+    def test_infer_field_type(self):
+        self.assertEqual([infer_field_type(column) for column in
+                          ([1, None], [True], [1.5], [u"a", "b"], [1, 1.5], [None], [{}])],
+                         [int, bool, float, str, object, object, object])
+
+    def test_to_columns(self):
+        class Column(list):
+            def tolist(self):
+                return list(self)
+
+        class StructuredArray(object):
+            # The NumPy structured array interface used by to_columns
+            class dtype(object):
+                names = ("id", "price")
+
+            def __getitem__(self, name):
+                return Column([1, 2] if name == "id" else [0.5, 1.5])
+
+            def __len__(self):
+                return 2
+
+        self.assertEqual(to_columns(StructuredArray()), (["id", "price"], [[1, 2], [0.5, 1.5]], 2))
+        self.assertEqual(to_columns({"id": Column([1, 2])}), (["id"], [[1, 2]], 2))
+        self.assertEqual(to_columns([{"id": 1}]), None)
+        self.assertRaises(ValueError, to_columns, {"id": [1, 2], "price": [0.5]})
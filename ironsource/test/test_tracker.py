@@ -0,0 +1,420 @@
+import os
+import json
+import time
+import functools
+import shutil
+import tempfile
+import unittest
+import signal
+import threading
+
+import responses
+
+from ironsource.atom.batch_event_pool import BatchEventPool, Full
+from ironsource.atom.partitioned_event_pool import PartitionedEventPool
+from ironsource.atom.dead_letter_spool import DeadLetterSpool
+from ironsource.atom.event import Event
+from ironsource.atom.queue_event_storage import QueueEventStorage
+from ironsource.atom.flight_recorder import FlightRecorder
+from ironsource.atom.callback_dispatcher import CallbackDispatcher
+from ironsource.atom.ironsource_atom_tracker import IronSourceAtomTracker
+from ironsource.atom.sender_runtime import SenderRuntime
+
+
+class TestBatchEventPool(unittest.TestCase):
+    def test_stop_unblocks_all_workers(self):
+        pool = BatchEventPool(thread_count=3, max_events=10)
+        done = []
+        pool.add_event(lambda: done.append(1))
+        self.assertTrue(pool.join(timeout=5))
+        pool.stop()
+
+        for worker in pool._workers:
+            worker.join(5)
+            self.assertFalse(worker.is_alive())
+        self.assertEqual(done, [1])
+
+    def test_stop_returns_not_started_tasks(self):
+        pool = BatchEventPool(thread_count=1, max_events=10)
+        release = threading.Event()
+        pool.add_event(release.wait)
+        time.sleep(0.1)
+        pool.add_event(lambda: None)
+
+        self.assertFalse(pool.join(timeout=0.1))
+        self.assertEqual(len(pool.stop()), 1)
+        release.set()
+
+
+    def test_autoscaling(self):
+        pool = BatchEventPool(thread_count=1, max_events=1, max_thread_count=3, idle_timeout=0.2)
+        release = threading.Event()
+        for _ in range(3):
+            pool.add_event(release.wait)
+        time.sleep(0.1)
+        self.assertEqual(pool.get_stats()["workers"], 3)
+        self.assertEqual(pool.get_stats()["busy_workers"], 3)
+
+        release.set()
+        self.assertTrue(pool.join(timeout=5))
+        time.sleep(0.6)
+        self.assertEqual(pool.get_stats()["workers"], 1)
+        pool.stop()
+
+
+class TestQueueEventStorage(unittest.TestCase):
+    def test_ready_streams(self):
+        storage = QueueEventStorage(queue_size=10)
+        self.assertTrue(storage.is_empty())
+        for stream in ("stream-a", "stream-b"):
+            storage.add_event(Event(stream, '{"id": 1}'))
+        self.assertEqual(sorted(storage.get_ready_streams()), ["stream-a", "stream-b"])
+
+        self.assertEqual(storage.get_event("stream-a").data, '{"id": 1}')
+        self.assertEqual(storage.get_ready_streams(), ["stream-b"])
+        storage.get_event("stream-b")
+        self.assertTrue(storage.is_empty())
+
+    @responses.activate
+    def test_full_blocking_backlog(self):
+        url = "http://track.atom-data.io/bulk"
+        responses.add(responses.POST, url, json={"Status": "Ok"}, status=200)
+        tracker = IronSourceAtomTracker(backlog_size=5, batch_size=5)
+
+        # track() blocks on the full backlog while the handler drains it
+        thread = threading.Thread(target=lambda: [tracker.track("streamname", {"id": index})
+                                                  for index in range(12)])
+        thread.daemon = True
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        tracker.stop(timeout=5)
+
+        bulks = [json.loads(json.loads(call.request.body)["data"]) for call in responses.calls]
+        self.assertEqual(sum(len(bulk) for bulk in bulks), 12)
+
+
+class TestPartitionedEventPool(unittest.TestCase):
+    def test_order_per_stream(self):
+        pool = PartitionedEventPool(lane_count=4, lane_size=2)
+        sent = dict((stream, []) for stream in ("stream-a", "stream-b", "stream-c"))
+        for index in range(20):
+            for stream in sent:
+                pool.add_event(functools.partial(sent[stream].append, index), key=stream)
+
+        self.assertTrue(pool.join(timeout=5))
+        self.assertTrue(pool.is_empty())
+        for events in sent.values():
+            self.assertEqual(events, list(range(20)))
+        self.assertEqual(pool.get_stats()["workers"], 4)
+        pool.stop()
+
+
+class TestTrackerLazyStart(unittest.TestCase):
+    def test_started_on_first_track(self):
+        tracker = IronSourceAtomTracker()
+        self.assertIsNone(tracker._handler_thread)
+        tracker.stop(timeout=1)
+
+        tracker = IronSourceAtomTracker()
+        tracker.track("streamname", {"id": 1})
+        self.assertTrue(tracker._handler_thread.is_alive())
+        tracker._event_backlog.get_event("streamname")
+        tracker.stop(timeout=1)
+
+
+class TestThreadlessTracker(unittest.TestCase):
+    def setUp(self):
+        self.url = "http://track.atom-data.io/bulk"
+        self.spool_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_path)
+
+    @responses.activate
+    def test_track_and_flush_sync(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        thread_count = threading.active_count()
+        tracker = IronSourceAtomTracker(is_threadless=True, batch_size=2)
+        for index in range(3):
+            tracker.track("stream-a", {"id": index})
+        tracker.track("stream-b", {"id": 0})
+        # The full batch is sent by track()
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(threading.active_count(), thread_count)
+
+        self.assertTrue(tracker.flush_sync(timeout=5))
+        self.assertEqual(len(responses.calls), 3)
+        tracker.stop(timeout=1)
+
+    @responses.activate
+    def test_flush_sync_deadline(self):
+        responses.add(responses.POST, self.url, json={"error": "unavailable"}, status=503)
+        tracker = IronSourceAtomTracker(is_threadless=True, shutdown_spool_path=self.spool_path)
+        tracker.track("streamname", {"id": 1})
+        start_time = time.time()
+        # Persisted - not sent
+        self.assertFalse(tracker.flush_sync(timeout=1))
+
+        self.assertTrue(time.time() - start_time < 1.5)
+        self.assertEqual(len(DeadLetterSpool.list_spool_files(self.spool_path)), 1)
+        tracker.stop(timeout=1)
+
+        # The leftovers are sent by the next tracker
+        responses.reset()
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        tracker = IronSourceAtomTracker(is_threadless=True, shutdown_spool_path=self.spool_path)
+        tracker.track("streamname", {"id": 2})
+        self.assertTrue(tracker.flush_sync(timeout=5))
+        events = [json.loads(event) for call in responses.calls
+                  for event in json.loads(json.loads(call.request.body)["data"])]
+        self.assertEqual(sorted(event["id"] for event in events), [1, 2])
+        self.assertEqual(DeadLetterSpool.list_spool_files(self.spool_path), [])
+        tracker.stop(timeout=1)
+
+    @responses.activate
+    def test_track_send_deadline(self):
+        responses.add(responses.POST, self.url, json={"error": "unavailable"}, status=503)
+        tracker = IronSourceAtomTracker(is_threadless=True, batch_size=1, shutdown_spool_path=self.spool_path)
+        tracker._get_duration = lambda attempt: 60
+        start_time = time.time()
+        # The full batch is persisted instead of retrying past the deadline
+        tracker.track("streamname", {"id": 1})
+        self.assertTrue(time.time() - start_time < 1)
+        self.assertEqual(len(DeadLetterSpool.list_spool_files(self.spool_path)), 1)
+        tracker.stop(timeout=1)
+
+
+class TestTrackerShutdown(unittest.TestCase):
+    def setUp(self):
+        self.url = "http://track.atom-data.io/bulk"
+        self.stream = "streamname"
+        self.spool_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_path)
+
+    def _tracker(self):
+        return IronSourceAtomTracker(batch_worker_count=2, shutdown_spool_path=self.spool_path)
+
+    @responses.activate
+    def test_stop_sends_partial_batches(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        tracker = self._tracker()
+        for index in range(3):
+            tracker.track(self.stream, {"id": index})
+        tracker.stop(timeout=5)
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(len(json.loads(json.loads(responses.calls[0].request.body)["data"])), 3)
+        self.assertEqual(DeadLetterSpool.list_spool_files(self.spool_path), [])
+
+    @responses.activate
+    def test_leftovers_are_sent_on_next_start(self):
+        responses.add(responses.POST, self.url, json={"error": "unavailable"}, status=503)
+        tracker = self._tracker()
+        for index in range(3):
+            tracker.track(self.stream, {"id": index})
+        tracker.stop(timeout=5)
+        self.assertEqual(len(DeadLetterSpool.list_spool_files(self.spool_path)), 1)
+
+        responses.reset()
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        tracker = self._tracker()
+        tracker._leftover_thread.join(5)
+        tracker.stop(timeout=5)
+
+        self.assertEqual(DeadLetterSpool.list_spool_files(self.spool_path), [])
+        events = json.loads(json.loads(responses.calls[0].request.body)["data"])
+        self.assertEqual(sorted(json.loads(event)["id"] for event in events), [0, 1, 2])
+
+    @responses.activate
+    def test_stop_persists_retrying_batches(self):
+        responses.add(responses.POST, self.url, json={"error": "unavailable"}, status=503)
+        tracker = IronSourceAtomTracker(batch_size=3, shutdown_spool_path=self.spool_path)
+        tracker._get_duration = lambda attempt: 60
+        for index in range(3):
+            tracker.track(self.stream, {"id": index})
+        while not responses.calls:
+            time.sleep(0.01)
+
+        start = time.time()
+        tracker.stop(timeout=2)
+        self.assertTrue(time.time() - start < 2)
+        self.assertEqual(len(DeadLetterSpool.list_spool_files(self.spool_path)), 1)
+
+    @responses.activate
+    def test_signal_while_tracking(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        tracker = self._tracker()
+        tracker.track(self.stream, {"id": 0})
+        tracker.aggregate(self.stream, "requests")
+        tracker._previous_signal_handlers[signal.SIGTERM] = lambda sig, frame: None
+
+        def interrupted_track():
+            # The signal interrupts track() while it holds the tracker lock
+            with tracker._data_lock:
+                tracker._graceful_kill(signal.SIGTERM, None)
+
+        thread = threading.Thread(target=interrupted_track)
+        thread.daemon = True
+        thread.start()
+        thread.join(3)
+        self.assertFalse(thread.is_alive())
+
+        events = [json.loads(event) for call in responses.calls
+                  for event in json.loads(json.loads(call.request.body)["data"])]
+        self.assertEqual(sorted(event.get("key", "") for event in events), ["", "requests"])
+
+
+class TestFlightRecorder(unittest.TestCase):
+    def test_ring_buffer(self):
+        recorder = FlightRecorder(size=2)
+        for stream in ("stream-a", "stream-b", "stream-c"):
+            recorder.record(stream, 1, 10)
+
+        records = json.loads(recorder.dump())
+        self.assertEqual([record["stream"] for record in records], ["stream-b", "stream-c"])
+        self.assertEqual(records[0]["state"], "queued")
+
+    @responses.activate
+    def test_tracker_records_batches(self):
+        url = "http://track.atom-data.io/bulk"
+        responses.add(responses.POST, url, json={"Status": "Ok"}, status=200)
+        tracker = IronSourceAtomTracker(batch_size=2)
+        for index in range(4):
+            tracker.track("streamname", {"id": index})
+        tracker.stop(timeout=5)
+
+        records = json.loads(tracker.dump_flight_recorder())
+        self.assertEqual(len(records), 2)
+        for record in records:
+            self.assertEqual((record["state"], record["status"], record["attempt"], record["count"]),
+                             ("sent", 200, 1, 2))
+            self.assertEqual(record["endpoint"], "http://track.atom-data.io/")
+            self.assertTrue(record["enqueue_time"] <= record["send_time"] <= record["ack_time"])
+
+
+class TestCallbackDispatcher(unittest.TestCase):
+    def test_coalesce(self):
+        calls = []
+        release = threading.Event()
+
+        def callback(unix_time, status, error_msg, data, stream):
+            release.wait(5)
+            calls.append((status, error_msg, data, stream))
+
+        dispatcher = CallbackDispatcher(callback, queue_size=3, is_coalesced=True)
+        # The first callback blocks the dispatcher thread, the next ones are queued
+        self.assertTrue(dispatcher.dispatch(0, 400, "full", "first", "stream-a"))
+        time.sleep(0.1)
+        for data in ("a", "b"):
+            self.assertTrue(dispatcher.dispatch(0, 400, "full", data, "stream-a"))
+        self.assertTrue(dispatcher.dispatch(0, 500, "error", "c", "stream-b"))
+        self.assertFalse(dispatcher.dispatch(0, 400, "full", "dropped", "stream-a"))
+        release.set()
+
+        self.assertTrue(dispatcher.join(5))
+        self.assertEqual(calls, [(400, "full", ["first"], "stream-a"),
+                                 (400, "full", ["a", "b"], "stream-a"),
+                                 (500, "error", ["c"], "stream-b")])
+        stats = dispatcher.get_stats()
+        self.assertEqual((stats["dispatched"], stats["dropped"], stats["coalesced"], stats["queued"]), (3, 1, 1, 0))
+        self.assertTrue(stats["max_lag"] > 0)
+
+    def test_tracker_async_callback(self):
+        calls = []
+
+        class FullBacklog(QueueEventStorage):
+            def add_event(self, event_object):
+                raise Full()
+
+        tracker = IronSourceAtomTracker(event_backlog=FullBacklog(1, block=False), is_callback_coalesced=True,
+                                        callback=lambda unix_time, status, error_msg, data, stream:
+                                        calls.append((status, data, threading.current_thread().name)))
+        for index in range(3):
+            tracker.track("streamname", {"id": index})
+        tracker._callback_dispatcher.join(5)
+
+        self.assertTrue(all(status == 400 and thread != threading.current_thread().name
+                            for status, _, thread in calls))
+        self.assertEqual(sum(len(data) for _, data, _ in calls), 3)
+        self.assertEqual(tracker.get_callback_stats()["dispatched"], len(calls))
+        tracker.stop(timeout=0)
+
+
+
+class TestTrackMany(unittest.TestCase):
+    @responses.activate
+    def test_track_many(self):
+        url = "http://track.atom-data.io/bulk"
+        responses.add(responses.POST, url, json={"Status": "Ok"}, status=200)
+        tracker = IronSourceAtomTracker(batch_size=2)
+        tracker.track_many("streamname", {"id": [1, 2, 3], "name": ["a", None, "c"]})
+        tracker.track_many("streamname", [{"id": 4}])
+        tracker.stop(timeout=5)
+
+        bulks = [json.loads(json.loads(call.request.body)["data"]) for call in responses.calls]
+        self.assertEqual(sorted(len(bulk) for bulk in bulks), [1, 1, 2])
+        self.assertEqual(sorted(json.loads(event)["id"] for bulk in bulks for event in bulk), [1, 2, 3, 4])
+        self.assertIn('{"id": 1, "name": "a"}', [event for bulk in bulks for event in bulk])
+
+    def test_invalid_records(self):
+        calls = []
+        tracker = IronSourceAtomTracker(callback=lambda unix_time, status, error_msg, data, stream:
+                                        calls.append((status, stream)))
+        tracker.track_many("streamname", "not records")
+        tracker.track_many("streamname", {"id": [1, 2], "name": ["a"]})
+        self.assertEqual(calls, [(400, "streamname"), (400, "streamname")])
+        tracker.stop(timeout=0)
+
+
+class TestSenderRuntime(unittest.TestCase):
+    def setUp(self):
+        self.url = "http://track.atom-data.io/bulk"
+        self.runtime = SenderRuntime(worker_count=2)
+
+    def tearDown(self):
+        self.runtime.stop()
+
+    @responses.activate
+    def test_shared_runtime(self):
+        responses.add(responses.POST, self.url, json={"Status": "Ok"}, status=200)
+        trackers = [IronSourceAtomTracker(runtime=self.runtime, auth_key="key-{}".format(index), batch_size=2)
+                    for index in range(2)]
+        for index, tracker in enumerate(trackers):
+            for event_index in range(4):
+                tracker.track("stream-{}".format(index), {"id": event_index})
+        for tracker in trackers:
+            tracker.stop(timeout=5)
+
+        tables = sorted(json.loads(call.request.body)["table"] for call in responses.calls)
+        self.assertEqual(tables, ["stream-0", "stream-0", "stream-1", "stream-1"])
+
+
+class TestTrackerFork(unittest.TestCase):
+    def test_after_fork(self):
+        tracker = IronSourceAtomTracker(flush_interval=60000)
+        tracker._event_backlog.add_event(Event("streamname", '{"id": 1}'))
+        forked = []
+        # Held by another thread of the parent at the fork
+        tracker._rate_limiter._lock.acquire()
+        tracker._error_logger._lock.acquire()
+
+        pid = os.fork()
+        if pid == 0:
+            # Child - the inherited event is discarded and the threads and locks are re-created
+            tracker._on_fork = forked.append
+            tracker.flush()
+            is_ok = tracker._event_backlog.is_empty() and tracker._events_buffer == {} \
+                and tracker._handler_thread.is_alive() and forked == [tracker] \
+                and tracker._rate_limiter._lock.acquire(False) and tracker._error_logger._lock.acquire(False)
+            os._exit(0 if is_ok else 1)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        tracker._rate_limiter._lock.release()
+        tracker._error_logger._lock.release()
+        tracker._event_backlog.after_fork()
+        tracker._events_buffer = {}
+        tracker.stop(timeout=1)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Import time and tracker startup benchmark (for CLI tools and cron jobs that embed the SDK):
+
+    python -m ironsource_example.startup_benchmark --runs 10
+"""
+import sys
+import argparse
+import subprocess
+
+# Runs in a fresh interpreter every time, prints: import time, construction time, first track time (ms),
+# threads after construction and whether 'requests' was imported before the first track
+MEASURE = """
+import sys, time, threading
+start = time.time()
+from ironsource.atom.ironsource_atom_tracker import IronSourceAtomTracker
+imported = time.time()
+tracker = IronSourceAtomTracker(endpoint="http://127.0.0.1:9/")
+constructed = time.time()
+threads = threading.active_count()
+is_requests_loaded = "requests" in sys.modules
+tracker.track("benchmark", {"id": 1})
+tracked = time.time()
+print("%f %f %f %d %d" % ((imported - start) * 1000, (constructed - imported) * 1000, (tracked - constructed) * 1000,
+                          threads, is_requests_loaded))
+tracker.stop(timeout=0)
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time and tracker startup benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Number of fresh interpreters to measure")
+    args = parser.parse_args(argv)
+
+    results = []
+    for _ in range(args.runs):
+        # The exit status is ignored - daemon threads may fail on interpreter shutdown (python 2)
+        process = subprocess.Popen([sys.executable, "-c", MEASURE], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, _ = process.communicate()
+        results.append([float(value) for value in output.decode("utf-8").strip().splitlines()[0].split()])
+
+    def median(index):
+        values = sorted(result[index] for result in results)
+        return values[len(values) // 2]
+
+    print("import: {:.1f}ms; construct: {:.2f}ms; first track: {:.2f}ms; threads after construct: {:.0f}; "
+          "requests imported before track: {}"
+          .format(median(0), median(1), median(2), median(3), bool(median(4))))
+
+
+if __name__ == "__main__":
+    main()